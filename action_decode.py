@@ -0,0 +1,71 @@
+"""
+分页解码模块 - 独立实现
+直接在响应的原始字节上解码 user_actions.json（省去 response.text 的字符集探测与整体转 str），
+可用时使用 orjson，并立即把每条记录投影为只含所需字段的紧凑字典，其余 20 多个字段随页面一起丢弃。
+"""
+
+import json
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple, Union
+
+from config import JSON_BACKEND
+
+# 统计、时间过滤与本地回复库用到的全部字段
+ACTION_FIELDS: Tuple[str, ...] = ('post_id', 'created_at', 'topic_id', 'title', 'cooked', 'excerpt')
+
+_loads = None
+_backend_name: Optional[str] = None
+
+
+def _resolve_backend():
+    """按 JSON_BACKEND 配置选择解码器：auto 时优先 orjson，未安装则回退标准库"""
+    global _loads, _backend_name
+    if JSON_BACKEND in ('auto', 'orjson'):
+        try:
+            import orjson
+
+            _loads, _backend_name = orjson.loads, 'orjson'
+            return
+        except ImportError:
+            if JSON_BACKEND == 'orjson':
+                print("未安装 orjson，回退为标准库 json")
+    _loads, _backend_name = json.loads, 'json'
+
+
+def json_backend() -> str:
+    """当前使用的 JSON 解码器名称"""
+    if _loads is None:
+        _resolve_backend()
+    return _backend_name
+
+
+def loads(data: Union[bytes, str]):
+    """解码 JSON（接受原始字节）"""
+    if _loads is None:
+        _resolve_backend()
+    return _loads(data)
+
+
+_pick_fields = itemgetter(*ACTION_FIELDS)
+
+
+def project_actions(actions: List[Dict]) -> List[Dict]:
+    """只保留所需字段（原记录中不存在的字段不补空值，保持 .get 默认值语义）"""
+    projected = []
+    for action in actions:
+        try:
+            projected.append(dict(zip(ACTION_FIELDS, _pick_fields(action))))
+        except KeyError:
+            projected.append({k: action[k] for k in ACTION_FIELDS if k in action})
+    return projected
+
+
+def decode_actions_page(content: Union[bytes, str]) -> List[Dict]:
+    """
+    解码一页 user_actions.json 响应体
+
+    Returns:
+        投影后的 user_actions 列表
+    """
+    data = loads(content)
+    return project_actions(data.get('user_actions') or [])
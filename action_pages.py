@@ -0,0 +1,251 @@
+"""
+回复分页模块 - 独立实现
+user_actions 的分页获取、页内时间窗口过滤、按时间定位页码，以及输出文件命名等共享工具。
+
+命令行脚本与批量调度、话题统计、抽样、断点、归档、按天索引等模块都从这里导入，
+本模块不从 user_emoji_stats 导入任何内容：以 python user_emoji_stats.py 运行时，
+功能模块若从脚本导入，脚本会以 __main__ 与 user_emoji_stats 两个名字各加载一次。
+"""
+
+import itertools
+import re
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import USER_ACTIONS_API, USER_PROFILE_API, ITEMS_PER_PAGE
+from action_decode import decode_actions_page, loads
+from http_utils import get_http_client
+import profiling
+
+_invalid_fname = re.compile(r"[^A-Za-z0-9._-]+")
+
+def safe_filename(name: str) -> str:
+    return _invalid_fname.sub("_", name.strip()) or "user"
+
+def window_suffix(since: Optional[str], until: Optional[str]) -> str:
+    def fmt(d: Optional[str]) -> Optional[str]:
+        if not d:
+            return None
+        dt = parse_iso_datetime(d)
+        if not dt:
+            return None
+        # 输出到日级即可
+        return dt.strftime('%Y%m%d')
+    s, u = fmt(since), fmt(until)
+    if s and u:
+        return f"_{s}_to_{u}"
+    if s:
+        return f"_{s}_to_"
+    if u:
+        return f"__to_{u}"
+    return ""
+
+
+def parse_iso_datetime(dt_str: str) -> Optional[datetime]:
+    try:
+        # Discourse 返回类似 2024-05-12T03:14:15.000Z
+        return datetime.strptime(dt_str.replace('Z', '+0000'), '%Y-%m-%dT%H:%M:%S.%f%z')
+    except Exception:
+        try:
+            return datetime.strptime(dt_str.replace('Z', '+0000'), '%Y-%m-%dT%H:%M:%S%z')
+        except Exception:
+            return None
+
+
+def fetch_actions_page(http_client, username: str, offset: int) -> Optional[List[Dict]]:
+    """
+    获取单页 user_actions
+    
+    Returns:
+        该页的 user_actions 列表（空列表表示已到末尾），失败返回 None
+    """
+    # filter=5 表示 replies (回复)
+    url = f"{USER_ACTIONS_API}?username={username}&filter=5&offset={offset}"
+    
+    try:
+        with profiling.stage('http'):
+            response = http_client.get(url)
+        profiling.count('requests')
+        
+        if not response or response.status_code != 200:
+            print(f"请求失败: {response.status_code if response else 'Network Error'}")
+            return None
+        
+        profiling.count('bytes', len(response.content))
+        with profiling.stage('json_decode'):
+            user_actions = decode_actions_page(response.content)
+        profiling.count('pages')
+        profiling.count('actions', len(user_actions))
+        return user_actions
+    except Exception as e:
+        print(f"获取 offset={offset} 的页面时出错: {e}")
+        return None
+
+
+def iter_action_pages(username: str, max_pages: Optional[int] = None,
+                       concurrency: int = 1,
+                       start_page: int = 1) -> Iterator[Tuple[int, Optional[List[Dict]]]]:
+    """
+    从 start_page 开始按 offset 顺序逐页产出 (页码, user_actions)
+    
+    concurrency > 1 时使用有界线程池预取后续页面，但产出顺序始终与 offset 顺序一致；
+    调用方停止迭代时，尚未开始的预取请求会被取消，并等待已发出的请求结束，
+    避免迭代结束后仍有后台线程写入 HTTP 缓存或占用限速配额。
+    """
+    concurrency = max(1, concurrency)
+    http_client = get_http_client(pool_size=concurrency)
+    pages = (range(start_page, start_page + max_pages) if max_pages
+             else itertools.count(start_page))
+    
+    def fetch(page: int) -> Optional[List[Dict]]:
+        return fetch_actions_page(http_client, username, (page - 1) * ITEMS_PER_PAGE)
+    
+    if concurrency == 1:
+        for page in pages:
+            yield page, fetch(page)
+        return
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = deque()
+    try:
+        for page in pages:
+            pending.append((page, executor.submit(fetch, page)))
+            if len(pending) >= concurrency:
+                done_page, future = pending.popleft()
+                yield done_page, future.result()
+        while pending:
+            done_page, future = pending.popleft()
+            yield done_page, future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def estimate_total_pages(username: str) -> Optional[int]:
+    """
+    根据用户资料中的发帖数估算回复总页数（用于显示进度与剩余时间）
+    
+    发帖数包含主题首帖，估算值略大于实际回复页数。
+    
+    Returns:
+        估算页数，获取失败时返回 None
+    """
+    try:
+        response = get_http_client().get(USER_PROFILE_API.format(username=username))
+        if not response or response.status_code != 200:
+            return None
+        post_count = (loads(response.content).get('user') or {}).get('post_count')
+    except Exception:
+        return None
+    if not isinstance(post_count, int):
+        return None
+    return max(1, -(-post_count // ITEMS_PER_PAGE))
+
+
+def search_first_page(username: str,
+                       predicate: Callable[[List[Dict]], bool],
+                       hint: Optional[int] = None,
+                       known_unsatisfied: int = 0) -> Tuple[Optional[int], int]:
+    """
+    指数探测 + 二分查找首个满足 predicate 的页码
+    
+    predicate 须单调：某页满足，则其后所有页都满足（空页视为满足）。
+    hint 为预估的满足页码（如按发帖数估算的末页之后一页），从它开始探测，
+    估计偏大时只需二分，偏小时继续指数探测。
+    known_unsatisfied 为调用方已确认不满足的最大页码，查找不再探测它及之前的页。
+    
+    Returns:
+        (页码, 探测请求数)，请求失败时页码为 None
+    """
+    http_client = get_http_client()
+    probes = 0
+    
+    def check(page: int) -> Optional[bool]:
+        nonlocal probes
+        probes += 1
+        user_actions = fetch_actions_page(http_client, username, (page - 1) * ITEMS_PER_PAGE)
+        if user_actions is None:
+            return None
+        return not user_actions or predicate(user_actions)
+    
+    # lo: 已知不满足的最大页码（0 表示尚无）；hi: 已知满足的页码
+    lo = known_unsatisfied
+    hi = max(lo + 1, hint or 1)
+    while True:
+        ok = check(hi)
+        if ok is None:
+            return None, probes
+        if ok:
+            break
+        lo, hi = hi, hi * 2
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        ok = check(mid)
+        if ok is None:
+            return None, probes
+        if ok:
+            hi = mid
+        else:
+            lo = mid
+    return hi, probes
+
+
+def seek_until_page(username: str, until_dt: datetime, estimate: Optional[int] = None) -> int:
+    """
+    利用 user_actions 按时间倒序的特点，定位首个包含 <= until_dt 回复的页码
+    
+    此前的页面全部晚于窗口终点，无需下载。定位失败时返回 1（从头翻页）。
+    先检查第 1 页：结束时间较近（如今天）时只需这一次请求。否则以按发帖数估算的
+    总页数（estimate，未提供时请求用户资料获取）为探测起点，目标页不会晚于它，通常只需二分。
+    """
+    def reaches_until(user_actions: List[Dict]) -> bool:
+        times = [parse_iso_datetime(ua['created_at']) for ua in user_actions if ua.get('created_at')]
+        times = [t for t in times if t]
+        # 无法解析时间时保守地视为已到达，避免跳过内容
+        return not times or min(times) <= until_dt
+    
+    first_page = fetch_actions_page(get_http_client(), username, 0)
+    if first_page is None:
+        print("定位结束时间所在页失败，从第 1 页开始翻页。")
+        return 1
+    if not first_page or reaches_until(first_page):
+        return 1
+    
+    if estimate is None:
+        estimate = estimate_total_pages(username)
+    page, probes = search_first_page(username, reaches_until, hint=estimate, known_unsatisfied=1)
+    probes += 1
+    if page is None:
+        print("定位结束时间所在页失败，从第 1 页开始翻页。")
+        return 1
+    if page > 1:
+        print(f"根据结束时间跳过前 {page - 1} 页（探测 {probes} 次请求），从第 {page} 页开始。")
+    return page
+
+
+def filter_actions_by_window(user_actions: List[Dict],
+                              since_dt: Optional[datetime] = None,
+                              until_dt: Optional[datetime] = None) -> Tuple[List[Dict], List[datetime]]:
+    """
+    过滤时间窗口（within-page）
+    
+    Returns:
+        (窗口内的 actions, 本页所有可解析的时间)
+    """
+    filtered_actions: List[Dict] = []
+    page_times: List[datetime] = []
+    for ua in user_actions:
+        c = ua.get('created_at')
+        cdt = parse_iso_datetime(c) if c else None
+        if cdt:
+            page_times.append(cdt)
+        # 应用窗口：since <= cdt <= until
+        if cdt:
+            if since_dt and cdt < since_dt:
+                continue
+            if until_dt and cdt > until_dt:
+                continue
+        filtered_actions.append(ua)
+    return filtered_actions, page_times
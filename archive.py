@@ -0,0 +1,212 @@
+"""
+离线归档模块 - 独立实现
+把获取到的原始回复记录（投影后的 user_actions）按用户写入只追加的压缩 JSONL 分片，
+之后可以完全离线（不需要 Cookie、不联网）地重放这些记录做统计。
+
+目录结构（每个用户一个目录）：
+    archive/{用户名}/shard-00000.jsonl.gz  分片：若干个独立的 gzip 块首尾相接
+    archive/{用户名}/index.json            偏移索引：每个块的 偏移 / 长度 / 记录数 / 时间范围
+
+- 每个块是一个完整的 gzip 成员，可以从其偏移处单独解压；整个分片也可以直接用 zcat 查看
+- 先追加写入块，再通过临时文件 + os.replace 原子替换索引；索引是提交点，
+  重新打开时把分片截断到索引记录的长度，丢弃中断时写了一半的块
+- 读取时用 mmap 映射分片，按索引跳过时间窗口之外的块，只解压需要的部分
+- 同一用户多次归档会有重复记录，读取时按 post_id 去重（保留先写入的一条）
+"""
+
+import json
+import mmap
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from config import ARCHIVE_DIR, ARCHIVE_BLOCK_RECORDS, ARCHIVE_SHARD_MB
+from action_decode import loads
+from action_pages import parse_iso_datetime, safe_filename
+import profiling
+
+ARCHIVE_VERSION = 1
+# gzip 格式（zlib 的 wbits 取 16 + 15）
+_GZIP_WBITS = 31
+
+
+def archive_dir(username: str, directory: str = ARCHIVE_DIR) -> str:
+    """用户归档目录"""
+    return os.path.join(directory, safe_filename(username))
+
+
+def _load_index(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取归档索引失败: {e}")
+        return None
+    return index if index.get('version') == ARCHIVE_VERSION else None
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    dt = parse_iso_datetime(value) if value else None
+    return dt.timestamp() if dt else None
+
+
+class ArchiveWriter:
+    """
+    单个用户的归档写入器
+
+    add() 缓冲记录，满 block_records 条时压缩为一个块写入；close() 写入剩余记录。
+    """
+
+    def __init__(self, username: str, directory: str = ARCHIVE_DIR,
+                 block_records: int = ARCHIVE_BLOCK_RECORDS, shard_mb: float = ARCHIVE_SHARD_MB):
+        self.username = username
+        self.directory = archive_dir(username, directory)
+        self.index_path = os.path.join(self.directory, 'index.json')
+        self.block_records = max(1, block_records)
+        self.shard_bytes = int(shard_mb * 1024 * 1024)
+        self.records_written = 0
+        self._buffer: List[Dict] = []
+        os.makedirs(self.directory, exist_ok=True)
+        self.index = _load_index(self.index_path) or {
+            'version': ARCHIVE_VERSION, 'username': username, 'shards': []}
+        self._truncate_uncommitted()
+
+    def _truncate_uncommitted(self):
+        """把最后一个分片截断到索引记录的长度"""
+        if not self.index['shards']:
+            return
+        shard = self.index['shards'][-1]
+        path = os.path.join(self.directory, shard['file'])
+        if os.path.exists(path) and os.path.getsize(path) > shard['bytes']:
+            with open(path, 'r+b') as f:
+                f.truncate(shard['bytes'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, records: List[Dict]):
+        self._buffer.extend(records)
+        while len(self._buffer) >= self.block_records:
+            block, self._buffer = self._buffer[:self.block_records], self._buffer[self.block_records:]
+            self._write_block(block)
+
+    def close(self):
+        if self._buffer:
+            self._write_block(self._buffer)
+            self._buffer = []
+
+    def _current_shard(self) -> Dict:
+        shards = self.index['shards']
+        if not shards or shards[-1]['bytes'] >= self.shard_bytes:
+            shards.append({'file': f"shard-{len(shards):05d}.jsonl.gz", 'bytes': 0, 'blocks': []})
+            # 索引中没有的同名文件是上次中断留下的，直接覆盖
+            open(os.path.join(self.directory, shards[-1]['file']), 'wb').close()
+        return shards[-1]
+
+    def _write_block(self, records: List[Dict]):
+        lines = b''.join(json.dumps(r, ensure_ascii=False).encode('utf-8') + b'\n' for r in records)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS)
+        payload = compressor.compress(lines) + compressor.flush()
+        stamps = [ts for ts in (_timestamp(r.get('created_at')) for r in records) if ts is not None]
+        if len(stamps) < len(records):
+            stamps = []  # 含无时间戳的记录（任何窗口都计入），该块不能按时间跳过
+
+        shard = self._current_shard()
+        with open(os.path.join(self.directory, shard['file']), 'ab') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        shard['blocks'].append({
+            'offset': shard['bytes'],
+            'length': len(payload),
+            'records': len(records),
+            'min_ts': min(stamps) if stamps else None,
+            'max_ts': max(stamps) if stamps else None,
+        })
+        shard['bytes'] += len(payload)
+        self.index['updated_at'] = datetime.now().isoformat(timespec='seconds')
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        self.records_written += len(records)
+
+
+class ArchiveReader:
+    """单个用户的归档读取器"""
+
+    def __init__(self, username: str, directory: str = ARCHIVE_DIR):
+        self.username = username
+        self.directory = archive_dir(username, directory)
+        self.index = _load_index(os.path.join(self.directory, 'index.json'))
+        self.blocks_read = 0
+        self.blocks_skipped = 0
+        self.duplicates = 0
+
+    def exists(self) -> bool:
+        return self.index is not None and any(s['blocks'] for s in self.index['shards'])
+
+    def summary(self) -> Dict:
+        """归档概况：分片数、块数、记录数（含重复）、压缩后字节数、时间范围"""
+        blocks = [b for s in self.index['shards'] for b in s['blocks']] if self.index else []
+        stamps = [b[k] for b in blocks for k in ('min_ts', 'max_ts') if b[k] is not None]
+        return {
+            'shards': len(self.index['shards']) if self.index else 0,
+            'blocks': len(blocks),
+            'records': sum(b['records'] for b in blocks),
+            'bytes': sum(b['length'] for b in blocks),
+            'oldest': datetime.fromtimestamp(min(stamps), timezone.utc).isoformat() if stamps else None,
+            'newest': datetime.fromtimestamp(max(stamps), timezone.utc).isoformat() if stamps else None,
+            'updated_at': self.index.get('updated_at') if self.index else None,
+        }
+
+    def iter_records(self, since_dt: Optional[datetime] = None,
+                     until_dt: Optional[datetime] = None) -> Iterator[List[Dict]]:
+        """
+        按写入顺序逐块产出记录（已按 post_id 去重）
+
+        时间范围完全落在 [since_dt, until_dt] 之外的块直接跳过，不解压；
+        块内的记录不做时间过滤，由调用方（EmojiAggregator）精确过滤。
+        """
+        if not self.exists():
+            return
+        since_ts = since_dt.timestamp() if since_dt else None
+        until_ts = until_dt.timestamp() if until_dt else None
+        seen = set()
+        for shard in self.index['shards']:
+            if not shard['blocks']:
+                continue
+            with open(os.path.join(self.directory, shard['file']), 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for block in shard['blocks']:
+                    if block['min_ts'] is not None and (
+                            (since_ts is not None and block['max_ts'] < since_ts)
+                            or (until_ts is not None and block['min_ts'] > until_ts)):
+                        self.blocks_skipped += 1
+                        continue
+                    start = block['offset']
+                    with profiling.stage('archive_read'):
+                        data = zlib.decompress(mm[start:start + block['length']], _GZIP_WBITS)
+                    profiling.count('bytes', block['length'])
+                    with profiling.stage('json_decode'):
+                        records = []
+                        for line in data.splitlines():
+                            record = loads(line)
+                            post_id = record.get('post_id')
+                            if post_id is not None:
+                                if post_id in seen:
+                                    self.duplicates += 1
+                                    continue
+                                seen.add(post_id)
+                            records.append(record)
+                    self.blocks_read += 1
+                    yield records
@@ -0,0 +1,233 @@
+"""
+批量调度模块 - 独立实现
+在同一个全局请求预算下并发爬取多个用户，按轮转方式公平分配请求
+
+- 全局同时在途的请求数不超过 budget
+- 每轮依次给每个未完成的用户派发一页，重度用户不会饿死其他用户
+- 每个用户的页面按 offset 顺序消费，停止条件与单用户翻页一致（空页 / since 阈值 / 最大页数）
+- 设置了结束时间时，与单用户翻页一样先定位每个用户首个包含窗口内回复的页，跳过更晚的页
+- 每个用户可带一个断点记录（CrawlCheckpoint），从断点恢复时先回放已获取的回复，再从中断的页码继续
+- 每个用户可带一个归档写入器（ArchiveWriter），按页写入时间窗口过滤前的原始记录
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from config import BATCH_CONCURRENCY, ITEMS_PER_PAGE
+from action_pages import fetch_actions_page, filter_actions_by_window, seek_until_page
+from checkpoint import CrawlCheckpoint
+from http_utils import get_http_client
+from user_emoji_stats import EmojiAggregator
+
+if TYPE_CHECKING:
+    from archive import ArchiveWriter
+
+
+class UserCrawl:
+    """单个用户的爬取状态"""
+
+    def __init__(self, username: str, max_pages: Optional[int],
+                 since_dt: Optional[datetime], until_dt: Optional[datetime],
+                 checkpoint: Optional[CrawlCheckpoint] = None,
+                 archive: Optional["ArchiveWriter"] = None):
+        self.username = username
+        self.max_pages = max_pages
+        self.since_dt = since_dt
+        self.aggregator = EmojiAggregator(since_dt, until_dt, workers=1)
+        self.checkpoint = checkpoint
+        self.archive = archive
+        self.next_page = 1        # 下一个待派发的页码
+        self.next_to_consume = 1  # 下一个待消费的页码
+        self.in_flight = 0
+        self.ready: Dict[int, Optional[List[Dict]]] = {}  # 已返回、等待按序消费的页
+        self.pages_done = 0
+        self.replies = 0
+        self.done = False
+        self.error = False
+
+        if checkpoint is not None and checkpoint.resumed:
+            for replies in checkpoint.iter_records():
+                self.aggregator.add_replies(replies)
+            self.next_page = self.next_to_consume = checkpoint.next_page
+            self.pages_done = checkpoint.pages_done
+            self.replies = checkpoint.replies
+        # 最后一个可派发的页码（从断点恢复时起始页不是 1）
+        self.last_page = self.next_page + max_pages - self.pages_done - 1 if max_pages else None
+        if max_pages and self.pages_done >= max_pages:
+            self.finish(complete=True)
+
+    @property
+    def needs_seek(self) -> bool:
+        """设置了结束时间且尚未完成任何页：可以跳过全部晚于窗口终点的页"""
+        return self.aggregator.until_dt is not None and not self.done and self.pages_done == 0
+
+    def start_at(self, page: int):
+        """从指定页码开始翻页"""
+        self.next_page = self.next_to_consume = page
+        if self.max_pages:
+            self.last_page = page + self.max_pages - 1
+
+    def can_dispatch(self, per_user_limit: int) -> bool:
+        if self.done or self.in_flight >= per_user_limit:
+            return False
+        return not (self.last_page and self.next_page > self.last_page)
+
+    def finish(self, complete: bool):
+        """停止该用户的翻页，并在断点中记录是否完整"""
+        self.done = True
+        self.ready.clear()
+        if self.checkpoint is not None:
+            self.checkpoint.close(complete)
+
+
+ProgressCallback = Callable[[UserCrawl, int, int], None]
+
+
+def _print_progress(crawl: UserCrawl, finished: int, total: int):
+    state = "完成" if crawl.done else f"第 {crawl.pages_done} 页"
+    print(f"[{finished}/{total} 已完成] @{crawl.username}: {state} (累计 {crawl.replies} 条)")
+
+
+class BatchScheduler:
+    """多用户公平调度器"""
+
+    def __init__(self, usernames: List[str], max_pages: Optional[int] = None,
+                 since_dt: Optional[datetime] = None,
+                 until_dt: Optional[datetime] = None,
+                 budget: Optional[int] = None,
+                 per_user_limit: int = 2,
+                 on_progress: Optional[ProgressCallback] = _print_progress,
+                 checkpoints: Optional[Dict[str, CrawlCheckpoint]] = None,
+                 archives: Optional[Dict[str, "ArchiveWriter"]] = None):
+        """
+        Args:
+            usernames: 用户名列表
+            max_pages: 每个用户的最大页数
+            since_dt / until_dt: 时间窗口
+            budget: 全局同时在途的请求数，None 表示使用 BATCH_CONCURRENCY
+            per_user_limit: 单个用户同时在途的请求数上限
+            on_progress: 进度回调 (crawl, 已完成用户数, 用户总数)
+            checkpoints: 用户名 -> 断点记录（已 load 的记录会从断点继续）
+            archives: 用户名 -> 归档写入器
+        """
+        checkpoints = checkpoints or {}
+        archives = archives or {}
+        self.crawls = [UserCrawl(name, max_pages, since_dt, until_dt,
+                                 checkpoints.get(name), archives.get(name))
+                       for name in dict.fromkeys(usernames)]
+        self.budget = max(1, budget or BATCH_CONCURRENCY)
+        self.per_user_limit = max(1, per_user_limit)
+        self.on_progress = on_progress
+        self._rotation = deque(self.crawls)
+
+    @property
+    def finished(self) -> int:
+        return sum(1 for c in self.crawls if c.done)
+
+    def _next_crawl(self) -> Optional[UserCrawl]:
+        """轮转选出下一个可以派发请求的用户"""
+        for _ in range(len(self._rotation)):
+            crawl = self._rotation[0]
+            self._rotation.rotate(-1)
+            if crawl.can_dispatch(self.per_user_limit):
+                return crawl
+        return None
+
+    def _finish(self, crawl: UserCrawl, complete: bool = True):
+        crawl.finish(complete)
+        if crawl in self._rotation:
+            self._rotation.remove(crawl)
+
+    def _consume(self, crawl: UserCrawl):
+        """按页码顺序消费已返回的页面"""
+        while not crawl.done and crawl.next_to_consume in crawl.ready:
+            page = crawl.next_to_consume
+            user_actions = crawl.ready.pop(page)
+            crawl.next_to_consume += 1
+
+            if user_actions is None:
+                print(f"⚠️  @{crawl.username} 第 {page} 页获取失败，停止该用户的翻页（结果不完整）")
+                crawl.error = True
+                if crawl.checkpoint is not None:
+                    crawl.checkpoint.fail(page, '请求失败')
+                self._finish(crawl, complete=False)
+                break
+            if not user_actions:
+                self._finish(crawl)
+                break
+
+            if crawl.archive is not None:
+                crawl.archive.add(user_actions)
+            filtered, page_times = filter_actions_by_window(
+                user_actions, crawl.since_dt, crawl.aggregator.until_dt)
+            if crawl.checkpoint is not None:
+                filtered = crawl.checkpoint.new_replies(filtered)
+            crawl.aggregator.add_replies(filtered)
+            crawl.pages_done += 1
+            crawl.replies += len(filtered)
+            if crawl.checkpoint is not None:
+                crawl.checkpoint.page_done(page, filtered)
+
+            # 与单用户翻页相同的提前停止条件
+            if crawl.since_dt and page_times and max(page_times) < crawl.since_dt:
+                self._finish(crawl)
+            elif crawl.max_pages and crawl.pages_done >= crawl.max_pages:
+                self._finish(crawl)
+
+            if self.on_progress and not crawl.done:
+                self.on_progress(crawl, self.finished, len(self.crawls))
+
+        if crawl.done and self.on_progress:
+            self.on_progress(crawl, self.finished, len(self.crawls))
+
+    def run(self) -> Dict[str, EmojiAggregator]:
+        """
+        运行调度直到所有用户完成
+
+        Returns:
+            用户名 -> 该用户的统计器
+        """
+        http_client = get_http_client(pool_size=self.budget)
+        executor = ThreadPoolExecutor(max_workers=self.budget)
+        pending = {}
+        try:
+            # 按结束时间定位各用户的起始页（各用户并发，每个用户内部串行探测）
+            seeking = [c for c in self.crawls if c.needs_seek]
+            pages = executor.map(lambda c: seek_until_page(c.username, c.aggregator.until_dt), seeking)
+            for crawl, page in zip(seeking, pages):
+                crawl.start_at(page)
+
+            while True:
+                # 填满全局预算
+                while len(pending) < self.budget:
+                    crawl = self._next_crawl()
+                    if crawl is None:
+                        break
+                    page = crawl.next_page
+                    crawl.next_page += 1
+                    crawl.in_flight += 1
+                    future = executor.submit(fetch_actions_page, http_client, crawl.username,
+                                             (page - 1) * ITEMS_PER_PAGE)
+                    pending[future] = (crawl, page)
+
+                if not pending:
+                    break
+
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    crawl, page = pending.pop(future)
+                    crawl.in_flight -= 1
+                    if crawl.done:
+                        continue  # 已停止的用户，丢弃多余的预取页
+                    crawl.ready[page] = future.result()
+                    self._consume(crawl)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # 中途退出（如 Ctrl+C）时保存未完成用户的进度
+            for crawl in self.crawls:
+                if not crawl.done and crawl.checkpoint is not None:
+                    crawl.checkpoint.close(False)
+
+        return {c.username: c.aggregator for c in self.crawls}
@@ -0,0 +1,76 @@
+"""
+离线归档基准脚本
+1. 把合成语料写入临时目录下的归档分片，测量写入速度与压缩比
+2. 从归档重放：只解压 + 解码，以及完整统计（提取 emoji + 计数）
+3. 核对重放统计与直接统计同一批记录的结果完全一致
+
+用法:
+    python benchmarks/archive_bench.py
+    python benchmarks/archive_bench.py --posts 200000 --workers 0
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SyntheticForum
+from archive import ArchiveReader, ArchiveWriter
+from user_emoji_stats import EmojiAggregator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线归档基准")
+    parser.add_argument("--posts", type=int, default=50000, help="合成回复总数")
+    parser.add_argument("--workers", type=int, default=1, help="完整统计的提取进程数，0 表示 CPU 核数")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    forum = SyntheticForum(users=1, posts_per_user=args.posts, seed=args.seed)
+    username = forum.usernames[0]
+    records = forum.actions(username)
+    raw_bytes = sum(len(json.dumps(r, ensure_ascii=False).encode("utf-8")) + 1 for r in records)
+    directory = tempfile.mkdtemp(prefix="archive_bench_")
+    try:
+        start = time.perf_counter()
+        with ArchiveWriter(username, directory=directory) as writer:
+            for i in range(0, len(records), 30):
+                writer.add(records[i:i + 30])
+        write = time.perf_counter() - start
+        reader = ArchiveReader(username, directory=directory)
+        summary = reader.summary()
+        print(f"归档: {summary['records']} 条，{summary['blocks']} 个块，{summary['shards']} 个分片，"
+              f"JSONL {raw_bytes / 2**20:.1f} MB -> 压缩后 {summary['bytes'] / 2**20:.1f} MB "
+              f"({raw_bytes / max(1, summary['bytes']):.1f}x)")
+        print(f"  写入          {write:7.2f}s  {raw_bytes / 2**20 / write:7.1f} MB/s")
+
+        start = time.perf_counter()
+        count = sum(len(block) for block in ArchiveReader(username, directory=directory).iter_records())
+        replay = time.perf_counter() - start
+        print(f"  解压 + 解码   {replay:7.2f}s  {count / replay:9.0f} 条/秒")
+
+        start = time.perf_counter()
+        aggregator = EmojiAggregator(workers=args.workers)
+        for block in ArchiveReader(username, directory=directory).iter_records():
+            aggregator.add_replies(block)
+        result = aggregator.to_result(username, None, None)
+        full = time.perf_counter() - start
+        print(f"  完整统计      {full:7.2f}s  {count / full:9.0f} 条/秒")
+
+        direct = EmojiAggregator(workers=args.workers)
+        direct.add_replies(records)
+        expected = direct.to_result(username, None, None)
+        assert json.dumps(result) == json.dumps(expected), "重放统计与直接统计不一致"
+        print("与直接统计结果一致")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
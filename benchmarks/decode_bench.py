@@ -0,0 +1,77 @@
+"""
+分页解码基准脚本
+比较原先的 json.loads(response.text) 全量解码与 action_decode 的 原始字节 + 字段投影 解码：
+- 每页 CPU 耗时
+- 保留全部页面结果时的内存占用（tracemalloc）
+
+用法:
+    python benchmarks/decode_bench.py
+    python benchmarks/decode_bench.py --posts 6000 --html-complexity 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from action_decode import ACTION_FIELDS, decode_actions_page, json_backend
+from synthetic import SyntheticForum
+
+
+def decode_text_full(content: bytes):
+    """原实现：先整体转 str，再构建全部字段"""
+    return json.loads(content.decode("utf-8")).get("user_actions", [])
+
+
+def per_page_us(func: Callable, pages: List[bytes], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    return (time.perf_counter() - start) / (repeat * len(pages)) * 1e6
+
+
+def retained_mb(func: Callable, pages: List[bytes]) -> float:
+    tracemalloc.start()
+    kept = [func(page) for page in pages]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分页解码基准")
+    parser.add_argument("--posts", type=int, default=3000, help="合成回复数")
+    parser.add_argument("--html-complexity", type=int, default=1, choices=[0, 1, 2])
+    parser.add_argument("--repeat", type=int, default=5, help="计时重复次数")
+    args = parser.parse_args()
+
+    forum = SyntheticForum(users=1, posts_per_user=args.posts, html_complexity=args.html_complexity)
+    username = forum.usernames[0]
+    pages = [forum.page_json(username, p * forum.page_size).encode("utf-8")
+             for p in range(forum.total_pages(username))]
+
+    # 两种解码在所需字段上必须一致
+    for page in pages:
+        full = decode_text_full(page)
+        projected = decode_actions_page(page)
+        assert [{k: a[k] for k in ACTION_FIELDS if k in a} for a in full] == projected
+
+    size_mb = sum(len(p) for p in pages) / 1024 / 1024
+    print(f"语料: {len(pages)} 页，{size_mb:.1f} MB，解码器: {json_backend()}")
+    old_us = per_page_us(decode_text_full, pages, args.repeat)
+    new_us = per_page_us(decode_actions_page, pages, args.repeat)
+    print(f"每页耗时: 原实现 {old_us:8.1f} µs   投影解码 {new_us:8.1f} µs   ({old_us / new_us:.1f}x)")
+    old_mb = retained_mb(decode_text_full, pages)
+    new_mb = retained_mb(decode_actions_page, pages)
+    print(f"保留内存: 原实现 {old_mb:8.1f} MB   投影解码 {new_mb:8.1f} MB   ({old_mb / new_mb:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
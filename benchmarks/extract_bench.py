@@ -0,0 +1,108 @@
+"""
+Emoji 提取引擎对照与基准脚本
+1. 对照（golden）：逐帖比较 fast 引擎与 bs4 引擎的输出，必须完全一致
+2. 基准：分别统计两种引擎的 posts/sec
+
+用法:
+    python benchmarks/extract_bench.py                      # 使用内置语料
+    python benchmarks/extract_bench.py --corpus dump.json   # 使用导出的 cooked 语料
+    python benchmarks/extract_bench.py --store username     # 使用本地回复库中的真实回复
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from emoji_extract import extract_emoji_bs4, extract_emoji_fast
+
+FIXTURE_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "fixtures", "cooked_corpus.json")
+
+
+def load_corpus(path: str) -> List[str]:
+    """
+    读取语料文件，支持以下格式：
+    - 字符串列表
+    - {"cooked": ...} / {"excerpt": ...} 对象列表
+    - user_actions.json 原始响应（{"user_actions": [...]}）
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("user_actions", [])
+    posts = []
+    for item in data:
+        if isinstance(item, str):
+            posts.append(item)
+        else:
+            posts.append(item.get("cooked") or item.get("excerpt") or "")
+    return posts
+
+
+def load_store_corpus(username: str) -> List[str]:
+    """从本地回复库读取某用户的回复 HTML"""
+    from reply_store import ReplyStore
+
+    with ReplyStore() as store:
+        return [r.get("cooked") or r.get("excerpt") or "" for r in store.iter_replies(username)]
+
+
+def check_golden(posts: List[str]) -> int:
+    """逐帖比较两种引擎的输出，返回不一致的帖子数"""
+    mismatches = 0
+    for i, html_content in enumerate(posts):
+        expected = extract_emoji_bs4(html_content)
+        actual = extract_emoji_fast(html_content)
+        if expected != actual:
+            mismatches += 1
+            print(f"[不一致] #{i}: bs4={expected} fast={actual}")
+            print(f"    {html_content[:200]!r}")
+    return mismatches
+
+
+def bench(func, posts: List[str]) -> float:
+    """返回 posts/sec"""
+    start = time.perf_counter()
+    for html_content in posts:
+        func(html_content)
+    elapsed = time.perf_counter() - start
+    return len(posts) / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emoji 提取引擎对照与基准")
+    parser.add_argument("--corpus", type=str, default=FIXTURE_CORPUS, help="语料 JSON 文件")
+    parser.add_argument("--store", type=str, default=None, help="使用本地回复库中该用户的回复作为语料")
+    parser.add_argument("--min-posts", type=int, default=20000, help="基准测试的最少帖子数（语料不足时重复）")
+    parser.add_argument("--skip-bench", action="store_true", help="只做对照，不做基准")
+    args = parser.parse_args()
+
+    posts = load_store_corpus(args.store) if args.store else load_corpus(args.corpus)
+    if not posts:
+        print("语料为空")
+        sys.exit(1)
+
+    mismatches = check_golden(posts)
+    print(f"对照: {len(posts)} 帖，不一致 {mismatches} 帖")
+    if mismatches:
+        sys.exit(1)
+
+    if args.skip_bench:
+        return
+
+    repeat = max(1, -(-args.min_posts // len(posts)))
+    bench_posts = posts * repeat
+    bs4_rate = bench(extract_emoji_bs4, bench_posts)
+    fast_rate = bench(extract_emoji_fast, bench_posts)
+    print(f"基准: {len(bench_posts)} 帖")
+    print(f"  bs4 : {bs4_rate:10.0f} posts/sec")
+    print(f"  fast: {fast_rate:10.0f} posts/sec ({fast_rate / bs4_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+命令行启动开销预算检查
+1. 用 python -X importtime 测量 import user_emoji_stats 的累计导入耗时（多次取中位数），超出预算则失败
+2. 检查命令行路径没有提前加载重量级依赖（GUI、图表、HTML 解析、HTTP、NumPy、进程池）
+3. 报告 `user_emoji_stats.py --help` 的端到端耗时与空解释器的差值
+
+用法:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 25 --runs 9
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "user_emoji_stats"
+# 只导入主模块时不应出现的模块（应在真正用到时才加载）
+HEAVY_MODULES = (
+    "tkinter", "tkcalendar", "webbrowser",
+    "matplotlib", "PIL", "numpy",
+    "bs4", "requests", "urllib3",
+    "concurrent.futures.process",
+)
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def run_importtime() -> List[Tuple[str, int, int, int]]:
+    """返回 [(模块, 自身微秒, 累计微秒, 嵌套层级)]"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def module_cumulative_ms(rows) -> float:
+    for name, _, cumulative_us, level in rows:
+        if name == MODULE and level == 0:
+            return cumulative_us / 1000
+    raise RuntimeError(f"importtime 输出中没有 {MODULE}")
+
+
+def loaded_modules() -> List[str]:
+    code = f"import json, sys, {MODULE}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout)
+
+
+def wall_ms(args: List[str], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT, capture_output=True, check=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行启动开销预算检查")
+    parser.add_argument("--budget-ms", type=float, default=30.0,
+                        help=f"import {MODULE} 的累计导入耗时预算（毫秒）")
+    parser.add_argument("--runs", type=int, default=5, help="测量次数（取中位数）")
+    parser.add_argument("--top", type=int, default=10, help="列出耗时最多的直接依赖数")
+    args = parser.parse_args()
+
+    samples = []
+    last_rows = []
+    for _ in range(args.runs):
+        last_rows = run_importtime()
+        samples.append(module_cumulative_ms(last_rows))
+    median = statistics.median(samples)
+
+    # 只看主模块之下的直接依赖（解释器启动阶段 site 的导入不计入）
+    children: Dict[str, int] = {}
+    inside = False
+    for name, _, cumulative_us, level in reversed(last_rows):
+        if name == MODULE and level == 0:
+            inside = True
+            continue
+        if inside:
+            if level == 0:
+                break
+            if level == 1:
+                children[name] = cumulative_us
+    print(f"import {MODULE}: {median:.1f} ms（{args.runs} 次中位数，预算 {args.budget_ms:.0f} ms）")
+    for name, cumulative_us in sorted(children.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:7.1f} ms  {name}")
+
+    loaded = set(loaded_modules())
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+    if heavy:
+        print(f"❌ 导入 {MODULE} 时提前加载了: {', '.join(heavy)}")
+
+    baseline = wall_ms(["-c", "pass"], args.runs)
+    help_ms = wall_ms([f"{MODULE}.py", "--help"], args.runs)
+    print(f"`{MODULE}.py --help` 端到端: {help_ms:.0f} ms（空解释器 {baseline:.0f} ms，差值 {help_ms - baseline:.0f} ms）")
+
+    if median > args.budget_ms or heavy:
+        print("❌ 超出启动预算")
+        sys.exit(1)
+    print("✅ 启动开销在预算内")
+
+
+if __name__ == "__main__":
+    main()
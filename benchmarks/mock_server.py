@@ -0,0 +1,410 @@
+"""
+本地模拟 Discourse 服务器
+在本机提供 user_actions.json?username=&filter=5&offset=、u/{username}.json（发帖数）、
+t/{id}.json（帖子流）与 t/{id}/posts.json?post_ids[]=（按 id 批量取帖）接口，数据来自合成语料或导出的语料文件，
+可配置延迟、抖动、429 注入、Retry-After 与每页条数，用于不联网地调优并发与退避策略。
+200 响应带 ETag（If-None-Match 相同时返回 304），客户端接受 gzip 时压缩响应体，用于测量条件请求缓存与压缩传输的效果。
+
+用法:
+    # 启动服务器，然后让主程序指向它
+    python benchmarks/mock_server.py --port 8765 --latency 0.2 --jitter 0.05 --throttle-rate 0.05
+    SHUIYUAN_BASE=http://127.0.0.1:8765/ python user_emoji_stats.py bench_user_0 -c 4
+    SHUIYUAN_BASE=http://127.0.0.1:8765/ python user_emoji_stats.py --topic 10000 -c 4
+
+    # 端到端压测：在后台线程启动服务器，用真实的 HTTPClient 与翻页逻辑依次测试多个并发数
+    python benchmarks/mock_server.py --load-test -c 1 2 4 8 --max-rps 20
+
+    # 重复拉取测试：同一批用户拉两遍，比较首次与第二次（条件请求）的传输字节数与耗时
+    python benchmarks/mock_server.py --load-test -c 4 --repeat 2
+
+语料文件格式（--corpus）:
+    {"用户名": [user_action, ...], ...}，或单个 {"user_actions": [...]}（任意用户名都返回这组数据）
+"""
+
+import argparse
+import contextlib
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SyntheticForum
+
+_TOPIC_PATH = re.compile(r"^/t/(\d+)(/posts)?\.json$")
+
+
+class MockDiscourse:
+    """模拟服务器的数据源、故障注入配置与请求统计"""
+
+    def __init__(self, forum: Optional[SyntheticForum] = None,
+                 corpus: Optional[Dict[str, List[Dict]]] = None,
+                 page_size: int = 30, latency: float = 0.0, jitter: float = 0.0,
+                 throttle_rate: float = 0.0, max_rps: float = 0.0,
+                 retry_after: Optional[float] = 1.0, retry_after_date: bool = False,
+                 etag: bool = True, compress: bool = True, seed: int = 0):
+        """
+        Args:
+            forum: 合成语料（corpus 为空时使用）
+            corpus: 用户名 -> 回复列表；键 "*" 表示任意用户名
+            page_size: 每页条数
+            latency / jitter: 每个请求的延迟（秒）及其均匀抖动幅度
+            throttle_rate: 随机返回 429 的概率
+            max_rps: 服务端限速（每秒请求数），超出时返回 429，0 表示不限
+            retry_after: 429 响应的 Retry-After 秒数，None 表示不带该头
+            retry_after_date: 以 HTTP 日期格式发送 Retry-After
+            etag: 200 响应是否带 ETag 并支持 If-None-Match（304）
+            compress: 客户端接受 gzip 时是否压缩响应体
+        """
+        self.forum = forum
+        self.corpus = corpus
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.retry_after_date = retry_after_date
+        self.etag = etag
+        self.compress = compress
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = max_rps
+        self._last_refill = time.monotonic()
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "not_modified": 0, "bytes": 0}
+        self._topics: Optional[Dict[int, List[Dict]]] = None
+
+    def actions(self, username: str) -> List[Dict]:
+        if self.corpus is not None:
+            return self.corpus.get(username, self.corpus.get("*", []))
+        if self.forum is not None and username in self.forum.usernames:
+            return self.forum.actions(username)
+        return []
+
+    def topic_posts(self, topic_id: int) -> List[Dict]:
+        """话题中的全部帖子（由所有用户的回复按话题汇总，按时间正序编号）"""
+        with self._lock:
+            if self._topics is None:
+                if self.corpus is not None:
+                    usernames = [u for u in self.corpus if u != "*"]
+                else:
+                    usernames = self.forum.usernames if self.forum else []
+                topics: Dict[int, List[Dict]] = {}
+                for username in usernames:
+                    for action in self.actions(username):
+                        topics.setdefault(action.get("topic_id"), []).append(action)
+                self._topics = {}
+                for tid, actions in topics.items():
+                    actions.sort(key=lambda a: a.get("created_at") or "")
+                    self._topics[tid] = [{
+                        "id": tid * 1_000_000 + number,
+                        "post_number": number,
+                        "username": a.get("username"),
+                        "created_at": a.get("created_at"),
+                        "cooked": a.get("cooked", ""),
+                        "title": a.get("title"),
+                    } for number, a in enumerate(actions, 1)]
+            return self._topics.get(topic_id, [])
+
+    def topic_json(self, topic_id: int) -> Optional[Dict]:
+        posts = self.topic_posts(topic_id)
+        if not posts:
+            return None
+        return {"id": topic_id, "title": posts[0]["title"], "posts_count": len(posts),
+                "post_stream": {"posts": posts[:20], "stream": [p["id"] for p in posts]}}
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _should_throttle(self) -> bool:
+        with self._lock:
+            if self.throttle_rate and self._rng.random() < self.throttle_rate:
+                return True
+            if self.max_rps > 0:
+                now = time.monotonic()
+                self._tokens = min(self.max_rps, self._tokens + (now - self._last_refill) * self.max_rps)
+                self._last_refill = now
+                if self._tokens < 1:
+                    return True
+                self._tokens -= 1
+            return False
+
+    def _delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def retry_after_header(self) -> Optional[str]:
+        if self.retry_after is None:
+            return None
+        if self.retry_after_date:
+            return formatdate(time.time() + self.retry_after, usegmt=True)
+        return f"{self.retry_after:g}"
+
+    def handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # 静默，避免压测时刷屏
+
+            def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+                mock._count("bytes", len(body))
+
+            def _send_json(self, data: Dict):
+                """发送 200 JSON 响应，处理 ETag 条件请求与 gzip 压缩"""
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                headers = {}
+                if mock.etag:
+                    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+                    headers["ETag"] = etag
+                    if self.headers.get("If-None-Match") == etag:
+                        mock._count("not_modified")
+                        self._send(304, b"", headers)
+                        return
+                if mock.compress and len(body) > 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, 5)
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Vary"] = "Accept-Encoding"
+                mock._count("ok")
+                self._send(200, body, headers)
+
+            def do_GET(self):
+                mock._count("requests")
+                parsed = urlparse(self.path)
+                path = parsed.path.rstrip("/")
+                if path.startswith("/u/") and path.endswith(".json"):
+                    username = path[len("/u/"):-len(".json")]
+                    self._send_json({"user": {"username": username,
+                                              "post_count": len(mock.actions(username))}})
+                    return
+                topic_match = _TOPIC_PATH.match(path)
+                if path != "/user_actions.json" and not topic_match:
+                    self._send(404, b'{"errors": ["not found"]}')
+                    return
+
+                time.sleep(mock._delay())
+                if mock._should_throttle():
+                    mock._count("throttled")
+                    header = mock.retry_after_header()
+                    self._send(429, b'{"errors": ["rate limited"]}',
+                               {"Retry-After": header} if header else None)
+                    return
+
+                query = parse_qs(parsed.query)
+                if topic_match:
+                    topic_id = int(topic_match.group(1))
+                    if topic_match.group(2):
+                        wanted = {int(i) for i in query.get("post_ids[]", [])}
+                        body = {"post_stream": {"posts": [p for p in mock.topic_posts(topic_id)
+                                                          if p["id"] in wanted]}}
+                    else:
+                        body = mock.topic_json(topic_id)
+                        if body is None:
+                            self._send(404, b'{"errors": ["not found"]}')
+                            return
+                    self._send_json(body)
+                    return
+                username = query.get("username", [""])[0]
+                offset = int(query.get("offset", ["0"])[0] or 0)
+                page = mock.actions(username)[offset:offset + mock.page_size]
+                self._send_json({"user_actions": page})
+
+        return Handler
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer((host, port), self.handler_class())
+        server.daemon_threads = True
+        return server
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    import socket
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def start_in_thread(mock: MockDiscourse, host: str = "127.0.0.1", port: int = 0):
+    """在后台线程启动服务器，返回 (server, base_url)；port=0 表示随机空闲端口"""
+    server = mock.serve(host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def load_corpus(path: str) -> Dict[str, List[Dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("user_actions"), list):
+        return {"*": data["user_actions"]}
+    if isinstance(data, list):
+        return {"*": data}
+    return data
+
+
+def load_test(mock: MockDiscourse, usernames: List[str], concurrencies: List[int],
+              port: int, repeat: int = 1, http_cache: bool = True) -> List[Dict]:
+    """
+    用真实的 HTTPClient 与翻页逻辑，依次以不同并发数拉取全部用户
+    
+    每个并发数使用独立的临时 HTTP 缓存目录，同一并发数下重复 repeat 遍
+    （第二遍起可由条件请求得到 304）。
+    调用前须已把 SHUIYUAN_BASE 环境变量设为 http://127.0.0.1:<port>/、SHUIYUAN_PAGE_SIZE 设为
+    mock.page_size（config 在首次导入时读取）。
+    """
+    import shutil
+    import tempfile
+
+    server, base_url = start_in_thread(mock, port=port)
+    import config
+    import http_utils
+    import user_emoji_stats
+    from http_cache import HTTPCache
+
+    if not config.USER_ACTIONS_API.startswith(base_url):
+        server.shutdown()
+        raise RuntimeError(f"config 已指向 {config.USER_ACTIONS_API}，请先设置 SHUIYUAN_BASE={base_url}")
+    if config.ITEMS_PER_PAGE != mock.page_size:
+        server.shutdown()
+        raise RuntimeError(f"config 的每页条数为 {config.ITEMS_PER_PAGE}，与模拟服务器的 {mock.page_size} 不一致，"
+                           f"请先设置 SHUIYUAN_PAGE_SIZE={mock.page_size}")
+
+    rows = []
+    try:
+        for concurrency in concurrencies:
+            cache_dir = tempfile.mkdtemp(prefix="mock_http_cache_") if http_cache else None
+            try:
+                for round_no in range(1, repeat + 1):
+                    # 每轮使用全新的客户端与限速器（缓存目录在同一并发数的各轮之间保留）
+                    http_utils._http_client = http_utils.HTTPClient(
+                        concurrency, cache=HTTPCache(cache_dir) if cache_dir else None)
+                    with mock._lock:
+                        mock.stats = {key: 0 for key in mock.stats}
+                    replies = 0
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        for username in usernames:
+                            replies += len(user_emoji_stats.get_user_replies(username, concurrency=concurrency))
+                    elapsed = time.perf_counter() - start
+                    client_stats = http_utils.get_http_client().stats()
+                    pages = mock.stats["ok"] + mock.stats["not_modified"]
+                    row = {
+                        "concurrency": concurrency,
+                        "round": round_no,
+                        "seconds": round(elapsed, 3),
+                        "replies": replies,
+                        "pages_per_sec": round(pages / elapsed, 1) if elapsed else None,
+                        "server": dict(mock.stats),
+                        "client": client_stats,
+                    }
+                    rows.append(row)
+                    label = f"并发 {concurrency:>3}" + (f" 第 {round_no} 遍" if repeat > 1 else "")
+                    print(f"  {label}: {elapsed:7.2f}s  {replies:>7} 条  "
+                          f"{row['pages_per_sec']:>7} 页/秒  429 {mock.stats['throttled']:>4} 次  "
+                          f"客户端重试 {client_stats['retries']}  最终限速 {client_stats['rate'] or '不限'}  "
+                          f"下载 {http_utils.format_bytes(client_stats['bytes_wire'])} "
+                          f"(解压后 {http_utils.format_bytes(client_stats['bytes_body'])}, "
+                          f"304 {client_stats['not_modified']} 次)")
+            finally:
+                if cache_dir:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+    finally:
+        server.shutdown()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 Discourse 服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--corpus", type=str, default=None, help="语料 JSON 文件（默认使用合成语料）")
+    parser.add_argument("--users", type=int, default=2, help="合成语料的用户数（bench_user_0 ...）")
+    parser.add_argument("--posts", type=int, default=1500, help="合成语料每个用户的回复数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--page-size", type=int, default=30, help="每页条数")
+    parser.add_argument("--latency", type=float, default=0.05, help="每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟的均匀抖动幅度（秒）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="随机返回 429 的概率")
+    parser.add_argument("--max-rps", type=float, default=0.0, help="服务端限速（请求/秒），0 表示不限")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="429 响应的 Retry-After 秒数，负数表示不带该头")
+    parser.add_argument("--retry-after-date", action="store_true", help="以 HTTP 日期格式发送 Retry-After")
+    parser.add_argument("--no-etag", action="store_true", help="响应不带 ETag（不支持条件请求）")
+    parser.add_argument("--no-compress", action="store_true", help="不压缩响应体")
+    parser.add_argument("--load-test", action="store_true", help="端到端压测而不是常驻服务")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="压测时每个并发数重复拉取的遍数（第二遍起测量条件请求缓存）")
+    parser.add_argument("--no-http-cache", action="store_true", help="压测时客户端不使用 HTTP 缓存")
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="压测的并发数列表")
+    parser.add_argument("--output", type=str, default=None, help="压测结果 JSON 路径")
+    args = parser.parse_args()
+
+    if args.load_test:
+        # 先确定端口并设置环境变量，之后导入的 config 才会指向模拟服务器、按相同的每页条数翻页
+        args.port = free_port(args.host)
+        os.environ["SHUIYUAN_BASE"] = f"http://{args.host}:{args.port}/"
+        os.environ["SHUIYUAN_PAGE_SIZE"] = str(args.page_size)
+
+    corpus = load_corpus(args.corpus) if args.corpus else None
+    forum = None if corpus else SyntheticForum(users=args.users, posts_per_user=args.posts,
+                                               seed=args.seed, page_size=args.page_size)
+    mock = MockDiscourse(forum=forum, corpus=corpus, page_size=args.page_size,
+                         latency=args.latency, jitter=args.jitter,
+                         throttle_rate=args.throttle_rate, max_rps=args.max_rps,
+                         retry_after=args.retry_after if args.retry_after >= 0 else None,
+                         retry_after_date=args.retry_after_date,
+                         etag=not args.no_etag, compress=not args.no_compress, seed=args.seed)
+
+    if args.load_test:
+        usernames = [u for u in corpus if u != "*"] if corpus else forum.usernames
+        print(f"压测: 用户 {usernames}，延迟 {args.latency}s±{args.jitter}s，"
+              f"429 概率 {args.throttle_rate}，服务端限速 {args.max_rps or '不限'}")
+        rows = load_test(mock, usernames or ["mock_user"], args.concurrency, args.port,
+                         repeat=max(1, args.repeat), http_cache=not args.no_http_cache)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+            print(f"结果已保存: {args.output}")
+        return
+
+    server = mock.serve(args.host, args.port)
+    print(f"模拟服务器已启动: http://{args.host}:{server.server_address[1]}/ （Ctrl+C 退出）")
+    print(f"客户端需设置 SHUIYUAN_BASE=http://{args.host}:{server.server_address[1]}/ "
+          f"SHUIYUAN_PAGE_SIZE={args.page_size}")
+    if forum:
+        print(f"合成用户: {', '.join(forum.usernames)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"请求统计: {mock.stats}")
+
+
+if __name__ == "__main__":
+    main()
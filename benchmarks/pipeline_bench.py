@@ -0,0 +1,201 @@
+"""
+全流程基准脚本（合成 Discourse 数据，不联网）
+分阶段计时并记录峰值内存，结果写为 JSON，便于在不同提交之间比较性能回归。
+
+阶段:
+    fetch       iter_user_replies 翻页（进程内合成客户端，测的是解码 / 过滤 / 翻页逻辑）
+    extract     extract_emoji_from_html 逐帖提取
+    aggregate   EmojiAggregator 统计（含提取）
+    to_result   生成统计结果字典
+    save        save_results（图表 + JSON + Markdown）
+    compare     generate_comparison_report
+
+用法:
+    python benchmarks/pipeline_bench.py
+    python benchmarks/pipeline_bench.py --users 4 --posts 5000 --emoji-density 3 --html-complexity 2
+    python benchmarks/pipeline_bench.py --compare benchmarks/results/pipeline_abc1234.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import http_utils
+import user_emoji_stats
+from synthetic import SyntheticClient, SyntheticForum
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程峰值常驻内存（MB），平台不支持时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+class StageTimer:
+    """记录各阶段耗时、处理量与阶段结束时的峰值内存"""
+
+    def __init__(self, quiet: bool = True):
+        self.quiet = quiet
+        self.stages: Dict[str, Dict] = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str, unit: str):
+        record = {"items": 0, "unit": unit}
+        sink = io.StringIO()
+        redirect = contextlib.redirect_stdout(sink) if self.quiet else contextlib.nullcontext()
+        start = time.perf_counter()
+        with redirect:
+            yield record
+        elapsed = time.perf_counter() - start
+        record["seconds"] = round(elapsed, 4)
+        record["rate"] = round(record["items"] / elapsed, 1) if elapsed > 0 else None
+        record["peak_rss_mb"] = peak_rss_mb()
+        self.stages[name] = record
+        rate = f"{record['rate']:>10.1f} {unit}/s" if record["rate"] is not None else ""
+        print(f"  {name:<10} {elapsed:8.3f}s  {record['items']:>8} {unit:<6} {rate}")
+
+
+def run(forum: SyntheticForum, workers: int, concurrency: int, quiet: bool) -> Dict:
+    timer = StageTimer(quiet)
+
+    with timer.stage("generate", "posts") as rec:
+        for username in forum.usernames:
+            for page in range(forum.total_pages(username) + 1):
+                forum.page_json(username, page * forum.page_size)
+            rec["items"] += forum.posts_per_user
+
+    client = SyntheticClient(forum)
+    http_utils._http_client = client
+
+    replies: Dict[str, List[Dict]] = {}
+    with timer.stage("fetch", "pages") as rec:
+        for username in forum.usernames:
+            replies[username] = user_emoji_stats.get_user_replies(username, concurrency=concurrency)
+        rec["items"] = client.requests
+
+    with timer.stage("extract", "posts") as rec:
+        for username in forum.usernames:
+            for reply in replies[username]:
+                user_emoji_stats.extract_emoji_from_html(reply.get("cooked", "") or reply.get("excerpt", ""))
+                rec["items"] += 1
+
+    aggregators = {}
+    with timer.stage("aggregate", "posts") as rec:
+        for username in forum.usernames:
+            aggregator = user_emoji_stats.EmojiAggregator(workers=workers)
+            aggregator.add_replies(replies[username])
+            aggregator.finish()
+            aggregators[username] = aggregator
+            rec["items"] += len(replies[username])
+
+    results = {}
+    with timer.stage("to_result", "users") as rec:
+        for username, aggregator in aggregators.items():
+            results[username] = aggregator.to_result(username)
+            rec["items"] += 1
+
+    with timer.stage("save", "users") as rec:
+        for result in results.values():
+            user_emoji_stats.save_results(result)
+            rec["items"] += 1
+
+    with timer.stage("compare", "users") as rec:
+        user_emoji_stats.generate_comparison_report(results)
+        rec["items"] = len(results)
+
+    return timer.stages
+
+
+def compare(current: Dict, baseline_path: str):
+    """打印与基线结果的耗时对比"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("params") != current.get("params"):
+        print("⚠️  基线与本次的合成数据参数不同，对比仅供参考")
+    print(f"\n对比基线 {baseline.get('commit') or baseline_path}:")
+    print(f"  {'阶段':<10} {'基线(s)':>10} {'本次(s)':>10} {'变化':>8}")
+    for name, stage in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("seconds"):
+            continue
+        change = (stage["seconds"] - old["seconds"]) / old["seconds"] * 100
+        flag = "  ⚠️" if change > 10 else ""
+        print(f"  {name:<10} {old['seconds']:>10.3f} {stage['seconds']:>10.3f} {change:>+7.1f}%{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全流程基准（合成数据）")
+    parser.add_argument("--users", type=int, default=3, help="用户数")
+    parser.add_argument("--posts", type=int, default=3000, help="每个用户的回复数")
+    parser.add_argument("--emoji-density", type=float, default=1.5, help="每帖平均 emoji 数")
+    parser.add_argument("--html-complexity", type=int, default=1, choices=[0, 1, 2],
+                        help="HTML 复杂度：0 纯段落 / 1 链接引用代码块 / 2 再加 onebox 等")
+    parser.add_argument("--topics", type=int, default=200, help="话题数")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="emoji 提取进程数")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="分页请求并发数")
+    parser.add_argument("--output", type=str, default=None,
+                        help="结果 JSON 路径（默认: benchmarks/results/pipeline_<commit>.json）")
+    parser.add_argument("--compare", type=str, default=None, help="与之前的结果 JSON 比较")
+    parser.add_argument("--verbose", action="store_true", help="显示各阶段的原始输出")
+    args = parser.parse_args()
+
+    forum = SyntheticForum(users=args.users, posts_per_user=args.posts,
+                           emoji_density=args.emoji_density, html_complexity=args.html_complexity,
+                           topics=args.topics, seed=args.seed)
+
+    # 报告与图表写入临时目录，不污染正式输出
+    with tempfile.TemporaryDirectory(prefix="emoji_bench_") as out_dir:
+        user_emoji_stats.OUTPUT_DIR = out_dir
+        print(f"合成数据: {forum.params()}")
+        stages = run(forum, args.workers, args.concurrency, quiet=not args.verbose)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {**forum.params(), "workers": args.workers, "concurrency": args.concurrency},
+        "stages": stages,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline_{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
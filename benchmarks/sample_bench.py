@@ -0,0 +1,112 @@
+"""
+抽样估计基准脚本
+在带时间漂移的合成账号上（越早的回复 emoji 越少、常用表情不同）比较：
+1. 完整统计（真实值）
+2. -p 只看最近的页：请求数相同，但结果偏向近期
+3. --sample 分层抽样：多次重复（不同随机种子），统计置信区间对真实值的覆盖率与平均请求数
+
+用法:
+    python benchmarks/sample_bench.py
+    python benchmarks/sample_bench.py --posts 60000 --sample 60 --runs 50 --drift 0.8
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SyntheticClient, SyntheticForum
+import http_utils
+from sampling import analyze_user_sample
+from user_emoji_stats import EmojiAggregator
+
+
+def _aggregate(records):
+    aggregator = EmojiAggregator(workers=1)
+    aggregator.add_replies(records)
+    frequency = aggregator.emoji_frequency()
+    total = sum(c for _, c in frequency)
+    return {
+        'rate': aggregator.replies_with_emoji / aggregator.total_replies,
+        'total_emojis': total,
+        'shares': {e: c / total for e, c in frequency},
+        'top': [e for e, _ in frequency[:10]],
+    }
+
+
+def _percent(text: str) -> float:
+    return float(text.rstrip('%')) / 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="抽样估计基准")
+    parser.add_argument("--posts", type=int, default=30000, help="合成账号的回复总数")
+    parser.add_argument("--drift", type=float, default=0.6, help="使用习惯随时间漂移的程度（0-1）")
+    parser.add_argument("--sample", type=int, default=40, help="抽样页数（-p 基线使用相同页数）")
+    parser.add_argument("--runs", type=int, default=30, help="重复抽样次数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    forum = SyntheticForum(users=1, posts_per_user=args.posts, drift=args.drift, seed=args.seed)
+    username = forum.usernames[0]
+    records = forum.actions(username)
+    client = SyntheticClient(forum)
+    http_utils._http_client = client
+    print(f"合成账号: {len(records)} 条回复，{forum.total_pages(username)} 页，漂移 {args.drift}")
+
+    truth = _aggregate(records)
+    recent = _aggregate(records[:args.sample * forum.page_size])
+    print(f"\n{'':14s}{'使用率':>10s}{'Top1 占比':>12s}  Top 5")
+    print(f"{'完整统计':12s}{truth['rate'] * 100:9.2f}%{truth['shares'][truth['top'][0]] * 100:11.2f}%  "
+          f"{', '.join(truth['top'][:5])}")
+    print(f"{f'-p {args.sample}':14s}{recent['rate'] * 100:9.2f}%{recent['shares'][recent['top'][0]] * 100:11.2f}%  "
+          f"{', '.join(recent['top'][:5])}")
+
+    covered = {'rate': 0, 'total_emojis': 0, 'shares': 0}
+    share_checks = 0
+    top1_hits = 0
+    top1_misses_claimed = 0  # Top 1 判断错误，却标记为与第二名差异显著
+    requests = []
+    start = time.perf_counter()
+    for run in range(args.runs):
+        before = client.requests
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = analyze_user_sample(username, args.sample, seed=run, save=False)
+        requests.append(client.requests - before)
+        low, high = (_percent(v) for v in result['emoji_usage_rate_ci'])
+        covered['rate'] += low <= truth['rate'] <= high
+        low, high = result['total_emojis_ci']
+        covered['total_emojis'] += low <= truth['total_emojis'] <= high
+        estimates = {e['emoji']: e for e in result['emoji_estimates']}
+        for emoji in truth['top']:
+            share_checks += 1
+            entry = estimates.get(emoji)
+            if entry and entry['share_ci'][0] <= truth['shares'][emoji] * 100 <= entry['share_ci'][1]:
+                covered['shares'] += 1
+        top1 = result['emoji_estimates'][0]
+        top1_hits += top1['emoji'] == truth['top'][0]
+        top1_misses_claimed += top1['emoji'] != truth['top'][0] and bool(top1.get('ahead_of_next'))
+        if run == 0:
+            print(f"{'--sample':14s}{_percent(result['emoji_usage_rate']) * 100:9.2f}%"
+                  f"{result['emoji_estimates'][0]['share']:11.2f}%  "
+                  f"{', '.join(e['emoji'] for e in result['emoji_estimates'][:5])}  （种子 0）")
+    elapsed = time.perf_counter() - start
+
+    level = result['confidence'] * 100
+    print(f"\n抽样 {args.runs} 次（每次 {args.sample} 页），平均 {sum(requests) / len(requests):.1f} 次请求，"
+          f"每次 {elapsed / args.runs:.2f} 秒；完整统计需要 {forum.total_pages(username) + 1} 次请求")
+    print(f"{level:g}% 置信区间覆盖率:")
+    print(f"  使用率          {covered['rate'] / args.runs * 100:6.1f}%")
+    print(f"  Emoji 总数      {covered['total_emojis'] / args.runs * 100:6.1f}%")
+    print(f"  Top 10 占比     {covered['shares'] / share_checks * 100:6.1f}%")
+    print(f"  Top 1 判断正确  {top1_hits / args.runs * 100:6.1f}%"
+          f"（判断错误但标记为显著领先: {top1_misses_claimed} 次）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+用户相似度基准脚本
+1. 小规模群体上与逐对计算的纯 Python 实现逐项核对（top-k 顺序、相似度、特色 emoji）
+2. 大规模群体（默认 3000 个用户）上测量构建矩阵、top-k 与特色 emoji 的耗时
+
+用法:
+    python benchmarks/similarity_bench.py
+    python benchmarks/similarity_bench.py --users 5000 --vocab 3000 --metric jaccard
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity import SIMILARITY_METRICS, UserEmojiMatrix, _SMOOTHING, _scipy_sparse
+
+
+def synthetic_results(users: int, vocab: int, emojis_per_user: int, seed: int) -> Dict[str, Dict]:
+    """每个用户按 Zipf 分布从词表中挑选 emoji，次数也呈长尾"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(vocab)]
+    results = {}
+    for u in range(users):
+        picked = set(rng.choices(range(vocab), weights=weights, k=rng.randint(1, emojis_per_user)))
+        results[f"user_{u}"] = {'emoji_frequency': {f":e{e}:": int(rng.paretovariate(1.2)) for e in picked}}
+    return results
+
+
+def naive_similarity(a: Dict[str, int], b: Dict[str, int], metric: str) -> float:
+    if metric == "cosine":
+        dot = sum(c * b.get(e, 0) for e, c in a.items())
+        norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+        return dot / norm if norm else 0.0
+    union = len(set(a) | set(b))
+    return len(set(a) & set(b)) / union if union else 0.0
+
+
+def verify(results: Dict[str, Dict], metric: str, k: int, top_n: int):
+    matrix = UserEmojiMatrix.from_results(results)
+    neighbours, scores = matrix.top_similar(k, metric)
+    freqs = [results[u]['emoji_frequency'] for u in matrix.usernames]
+    for i, a in enumerate(freqs):
+        sims = [(naive_similarity(a, b, metric), j) for j, b in enumerate(freqs) if j != i]
+        for rank, j in enumerate(neighbours[i]):
+            assert abs(scores[i][rank] - sims[j - (j > i)][0]) < 1e-4
+        # 逐对相似度用 float64 计算，与 float32 的并列判定可能不同，只核对 top-k 的相似度序列
+        expected = sorted(sims, key=lambda t: (-t[0], t[1]))[:k]
+        assert all(abs(s - e) < 1e-4 for s, (e, _) in zip(scores[i], expected))
+
+    distinctive = matrix.distinctive(top_n)
+    total = sum(sum(f.values()) for f in freqs)
+    column = {}
+    for f in freqs:
+        for e, c in f.items():
+            column[e] = column.get(e, 0) + c
+    for i, f in enumerate(freqs):
+        row_total = sum(f.values())
+        scored = []
+        for e, c in f.items():
+            p = c / row_total
+            q = (column[e] - c + _SMOOTHING) / (total - row_total + _SMOOTHING * len(column))
+            scored.append((p * math.log(p / q), e, c))
+        expected = [(e, c) for s, e, c in sorted(scored, key=lambda t: -t[0]) if s > 0][:top_n]
+        assert [(e, c) for e, c, _ in distinctive[i]] == expected, (i, distinctive[i], expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户相似度基准")
+    parser.add_argument("--users", type=int, default=3000, help="用户数")
+    parser.add_argument("--vocab", type=int, default=2000, help="emoji 种类数")
+    parser.add_argument("--emojis-per-user", type=int, default=120, help="每个用户最多使用的 emoji 种类")
+    parser.add_argument("--metric", choices=SIMILARITY_METRICS, default=None, help="只测一种相似度")
+    parser.add_argument("-k", type=int, default=5, help="每个用户的相似用户数")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    metrics = [args.metric] if args.metric else list(SIMILARITY_METRICS)
+
+    small = synthetic_results(150, 200, 40, args.seed)
+    for metric in metrics:
+        verify(small, metric, args.k, 5)
+    print(f"与逐对计算结果一致（150 个用户，{', '.join(metrics)}）")
+
+    results = synthetic_results(args.users, args.vocab, args.emojis_per_user, args.seed)
+    start = time.perf_counter()
+    matrix = UserEmojiMatrix.from_results(results)
+    build = time.perf_counter() - start
+    print(f"群体: {matrix.shape[0]} 个用户 × {matrix.shape[1]} 种 emoji，非零 {len(matrix.data)}，"
+          f"后端 {'scipy' if _scipy_sparse() else 'numpy'}")
+    print(f"  构建矩阵      {build:7.3f}s")
+    for metric in metrics:
+        start = time.perf_counter()
+        matrix.top_similar(args.k, metric)
+        print(f"  top-{args.k} {metric:<8} {time.perf_counter() - start:7.3f}s")
+    start = time.perf_counter()
+    matrix.distinctive(5)
+    print(f"  特色 emoji    {time.perf_counter() - start:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
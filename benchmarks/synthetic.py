@@ -0,0 +1,250 @@
+"""
+合成 Discourse 数据
+按给定规模生成确定性的 user_actions.json 分页数据（相同参数 + 种子 -> 完全相同的输出），
+供基准脚本与本地模拟服务器使用。
+
+- emoji_density: 每帖平均 emoji 数（泊松分布），混合 <img class="emoji">、自定义表情与 :code: 文本
+- html_complexity: 0 = 纯段落，1 = 加入链接 / 引用 / 代码块，2 = 再加入 onebox、嵌套列表、图片灯箱
+- topics: 话题数量，帖子按 Zipf 分布落在各话题中
+- drift: 使用习惯随时间漂移的程度，0 表示不漂移；越早的回复 emoji 越少、常用表情的排名越靠后
+"""
+
+import json
+import math
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 目录不可用时使用的后备表情名
+_FALLBACK_EMOJIS = [
+    "smile", "joy", "heart", "thumbsup", "laughing", "sob", "thinking", "fire",
+    "rocket", "eyes", "tada", "pray", "clap", "ok_hand", "sweat_smile", "rofl",
+]
+_CUSTOM_EMOJIS = ["shuiyuan_doge", "jiaoda_cat", "xiaoyuan_ok", "kexue_shangwang"]
+_WORDS = ("水源 社区 今天 食堂 选课 考试 图书馆 宿舍 实验 论文 导师 组会 "
+          "lorem ipsum dolor sit amet consectetur adipiscing elit").split()
+
+
+def _emoji_names(limit: int = 300) -> List[str]:
+    try:
+        from emoji_catalog import get_catalog
+
+        names = [n for n in get_catalog().names() if n.replace("_", "").isalpha()]
+        if names:
+            return names[:limit]
+    except Exception:
+        pass
+    return list(_FALLBACK_EMOJIS)
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    """Knuth 算法（lam 较小时足够快）"""
+    if lam <= 0:
+        return 0
+    threshold = math.exp(-lam)
+    k, p = 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= threshold:
+            return k
+        k += 1
+
+
+class SyntheticForum:
+    """合成论坛：每个用户一组按时间倒序排列的回复"""
+
+    def __init__(self, users: int = 1, posts_per_user: int = 3000,
+                 emoji_density: float = 1.5, html_complexity: int = 1,
+                 topics: int = 200, seed: int = 42,
+                 start: Optional[datetime] = None, page_size: Optional[int] = None,
+                 drift: float = 0.0):
+        self.usernames = [f"bench_user_{i}" for i in range(users)]
+        self.posts_per_user = posts_per_user
+        self.emoji_density = emoji_density
+        self.html_complexity = html_complexity
+        self.topics = max(1, topics)
+        self.seed = seed
+        self.drift = max(0.0, min(1.0, drift))
+        self.start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+        if page_size is None:
+            # 延迟导入：模拟服务器需要先设置 SHUIYUAN_BASE 环境变量，再让 config 读取
+            from config import ITEMS_PER_PAGE
+            page_size = ITEMS_PER_PAGE
+        self.page_size = page_size
+        self._emojis = _emoji_names()
+        # Zipf 权重：少数表情 / 话题占大多数
+        self._emoji_weights = [1.0 / (i + 1) for i in range(len(self._emojis))]
+        self._emoji_ranks = range(len(self._emojis))
+        self._topic_weights = [1.0 / (i + 1) ** 0.8 for i in range(self.topics)]
+        self._actions: Dict[str, List[Dict]] = {}
+        self._pages: Dict = {}
+
+    def params(self) -> Dict:
+        return {
+            "users": len(self.usernames),
+            "posts_per_user": self.posts_per_user,
+            "emoji_density": self.emoji_density,
+            "html_complexity": self.html_complexity,
+            "topics": self.topics,
+            "seed": self.seed,
+            "page_size": self.page_size,
+            "drift": self.drift,
+        }
+
+    def _emoji_html(self, rng: random.Random, shift: int = 0) -> str:
+        kind = rng.random()
+        if kind < 0.08:
+            name = rng.choice(_CUSTOM_EMOJIS)
+            return (f'<img src="//shuiyuan.s3.jcloud.sjtu.edu.cn/original/4X/a/b/c/{name}.png" '
+                    f'title=":{name}:" class="emoji emoji-custom" alt=":{name}:" loading="lazy" '
+                    f'width="20" height="20">')
+        rank = rng.choices(self._emoji_ranks, self._emoji_weights)[0]
+        name = self._emojis[(rank + shift) % len(self._emojis)]
+        if kind < 0.2:
+            return f":{name}:"
+        return (f'<img src="/images/emoji/twitter/{name}.png?v=12" title=":{name}:" '
+                f'class="emoji" alt=":{name}:" loading="lazy" width="20" height="20">')
+
+    def _paragraph(self, rng: random.Random, emojis: int, shift: int = 0) -> str:
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(5, 40))]
+        for _ in range(emojis):
+            words.insert(rng.randint(0, len(words)), self._emoji_html(rng, shift))
+        return "<p>" + " ".join(words) + "</p>"
+
+    def _decoration(self, rng: random.Random) -> str:
+        level = self.html_complexity
+        choices = []
+        if level >= 1:
+            choices += [
+                '<p><a href="https://shuiyuan.sjtu.edu.cn/t/topic/1" class="inline-onebox">链接 :not_emoji:</a></p>',
+                '<aside class="quote no-group" data-username="someone" data-post="3" data-topic="1">'
+                '<div class="title"><img alt="" width="24" height="24" src="/user_avatar/a.png" class="avatar">'
+                ' someone:</div><blockquote><p>引用内容 :quoted:</p></blockquote></aside>',
+                '<pre><code class="lang-python">x = {":a:": 1}  # :code_comment:\n</code></pre>',
+            ]
+        if level >= 2:
+            choices += [
+                '<aside class="onebox allowlistedgeneric" data-onebox-src="https://example.com">'
+                '<header class="source"><img src="/favicon.ico" class="site-icon" width="16" height="16">'
+                '<a href="https://example.com">example.com</a></header><article class="onebox-body">'
+                '<h3><a href="https://example.com">标题</a></h3><p>摘要 ::</p></article></aside>',
+                '<ul><li>一<ul><li>二 <code>:inline_code:</code></li><li>三</li></ul></li></ul>',
+                '<div class="lightbox-wrapper"><a class="lightbox" href="/uploads/x.jpeg" '
+                'data-download-href="/uploads/x" title="image"><img src="/uploads/x_690x388.jpeg" '
+                'alt="image" data-base62-sha1="abc" width="690" height="388">'
+                '<div class="meta"><span class="filename">image</span></div></a></div>',
+                '<!-- :html_comment: -->',
+            ]
+        return rng.choice(choices) if choices else ""
+
+    def _cooked(self, rng: random.Random, age: float = 0.0) -> str:
+        """age 为回复在历史中的位置（0 最新，1 最早），决定漂移量"""
+        emojis = _poisson(rng, self.emoji_density * (1 - 0.8 * self.drift * age))
+        shift = int(self.drift * age * 20)
+        paragraphs = rng.randint(1, 1 + self.html_complexity * 2)
+        split = sorted(rng.randint(0, emojis) for _ in range(paragraphs - 1))
+        counts = [b - a for a, b in zip([0] + split, split + [emojis])]
+        parts = []
+        for n in counts:
+            parts.append(self._paragraph(rng, n, shift))
+            if self.html_complexity and rng.random() < 0.4:
+                parts.append(self._decoration(rng))
+        return "\n".join(parts)
+
+    def actions(self, username: str) -> List[Dict]:
+        """用户的全部回复（按时间倒序）"""
+        if username in self._actions:
+            return self._actions[username]
+        rng = random.Random(f"{self.seed}:{username}")
+        result = []
+        t = self.start
+        for i in range(self.posts_per_user):
+            t -= timedelta(minutes=rng.randint(5, 60 * 30))
+            topic_id = 10000 + rng.choices(range(self.topics), self._topic_weights)[0]
+            cooked = self._cooked(rng, i / self.posts_per_user)
+            result.append({
+                "excerpt": cooked[:300],
+                "action_type": 5,
+                "created_at": t.strftime("%Y-%m-%dT%H:%M:%S.") + f"{rng.randint(0, 999):03d}Z",
+                "avatar_template": "/user_avatar/shuiyuan.sjtu.edu.cn/" + username + "/{size}/1_2.png",
+                "acting_avatar_template": "/user_avatar/shuiyuan.sjtu.edu.cn/" + username + "/{size}/1_2.png",
+                "slug": f"topic-{topic_id}",
+                "topic_id": topic_id,
+                "target_user_id": rng.randint(1, 50000),
+                "target_name": None,
+                "target_username": f"user{rng.randint(1, 50000)}",
+                "post_number": rng.randint(2, 3000),
+                "post_id": 5_000_000 - i,
+                "reply_to_post_number": rng.choice([None, rng.randint(1, 100)]),
+                "username": username,
+                "name": "",
+                "user_id": 1000 + self.usernames.index(username) if username in self.usernames else 999,
+                "acting_username": username,
+                "acting_name": "",
+                "acting_user_id": 1000,
+                "title": f"合成话题 #{topic_id}",
+                "deleted": False,
+                "hidden": False,
+                "post_type": 1,
+                "action_code": None,
+                "category_id": rng.randint(1, 40),
+                "closed": False,
+                "archived": False,
+                "cooked": cooked,
+            })
+        self._actions[username] = result
+        return result
+
+    def page_json(self, username: str, offset: int) -> str:
+        """单页 user_actions.json 响应体"""
+        key = (username, offset)
+        if key not in self._pages:
+            actions = self.actions(username) if username in self.usernames else []
+            page = actions[offset:offset + self.page_size]
+            self._pages[key] = json.dumps({"user_actions": page}, ensure_ascii=False)
+        return self._pages[key]
+
+    def total_pages(self, username: str) -> int:
+        return -(-len(self.actions(username)) // self.page_size)
+
+
+class SyntheticResponse:
+    """与 requests.Response 兼容的最小响应对象"""
+
+    def __init__(self, text: str, status_code: int = 200):
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {"Content-Type": "application/json; charset=utf-8"}
+
+
+class SyntheticClient:
+    """进程内的 HTTP 客户端替身：按 URL 中的 username / offset 返回合成分页，不走网络"""
+
+    def __init__(self, forum: SyntheticForum):
+        self.forum = forum
+        self.pool_size = 1
+        self.requests = 0
+
+    def ensure_pool_size(self, pool_size: int):
+        self.pool_size = max(self.pool_size, pool_size)
+
+    def get(self, url: str, use_cookie: bool = True) -> SyntheticResponse:
+        self.requests += 1
+        parsed = urlparse(url)
+        if parsed.path.startswith("/u/") and parsed.path.endswith(".json"):
+            username = parsed.path[len("/u/"):-len(".json")]
+            actions = self.forum.actions(username) if username in self.forum.usernames else []
+            return SyntheticResponse(json.dumps({"user": {"username": username, "post_count": len(actions)}}))
+        query = parse_qs(parsed.query)
+        username = query.get("username", [""])[0]
+        offset = int(query.get("offset", ["0"])[0])
+        return SyntheticResponse(self.forum.page_json(username, offset))
+
+    def stats(self) -> Dict:
+        return {"requests": self.requests, "throttled": 0, "retries": 0, "rate": None}
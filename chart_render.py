@@ -0,0 +1,275 @@
+"""
+图表渲染模块 - 独立实现
+使用非交互式后端（Agg）生成 Top10 柱状图，适合无界面的批量服务器
+
+- emoji 图片预缩放为 100px 高的缩略图，缓存在 CACHE_DIR/thumbs 下，源图片变化时自动失效
+- 可选：把 emoji/ 目录全部缩略图打包为一张精灵图（.npy，按内存映射读取），省去逐个读文件
+- 同一进程内复用同一个 Figure，批量渲染多个用户时只初始化一次
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import CACHE_DIR, EMOJI_DIR
+from emoji_catalog import get_catalog
+
+THUMB_HEIGHT = 100
+_THUMB_DIR = os.path.join(CACHE_DIR, "thumbs")
+_SPRITE_PATH = os.path.join(CACHE_DIR, "emoji_sprite.npy")
+_SPRITE_INDEX_PATH = os.path.join(CACHE_DIR, "emoji_sprite.json")
+# 精灵图每行的最大宽度（像素）
+_SPRITE_ROW_WIDTH = 4096
+
+
+def _make_thumbnail(path: str):
+    """读取图片并缩放为 THUMB_HEIGHT 高的 RGBA 数组"""
+    import numpy as np
+    from PIL import Image
+
+    # 预处理图片：调整大小、背景透明等
+    with Image.open(path) as img:
+        img = img.convert("RGBA")
+        original_width, original_height = img.size
+        ratio = THUMB_HEIGHT / original_height
+        new_width = max(1, int(original_width * ratio))
+        img = img.resize((new_width, THUMB_HEIGHT), Image.Resampling.LANCZOS)
+        return np.asarray(img)
+
+
+def _thumb_cache_path(path: str) -> str:
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{THUMB_HEIGHT}"
+    return os.path.join(_THUMB_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npy")
+
+
+def _emoji_dir_stamp() -> List:
+    stamp = []
+    for path in (EMOJI_DIR, os.path.join(EMOJI_DIR, "original")):
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def build_sprite_sheet() -> int:
+    """
+    把 emoji/ 目录中所有已知表情的缩略图打包为一张精灵图
+
+    Returns:
+        打包的表情数量
+    """
+    import numpy as np
+
+    catalog = get_catalog()
+    names = set(catalog.names())
+    if os.path.isdir(EMOJI_DIR):
+        names.update(f[:-4] for f in os.listdir(EMOJI_DIR) if f.endswith(".png"))
+
+    thumbs: List[Tuple[str, object]] = []
+    # 图片路径 -> 首个使用该图片的表情名（同一图片只打包一次）
+    path_owner: Dict[str, str] = {}
+    aliases: Dict[str, str] = {}
+    for name in sorted(names):
+        path = catalog.image_path(name)
+        if not path:
+            continue
+        if path in path_owner:
+            aliases[name] = path_owner[path]
+            continue
+        try:
+            thumbs.append((name, _make_thumbnail(path)))
+            path_owner[path] = name
+        except Exception as e:
+            print(f"无法加载 {path}: {e}")
+
+    # 简单的按行装箱：每行高 THUMB_HEIGHT，超出行宽则换行
+    index: Dict[str, List[int]] = {}
+    x = y = 0
+    for name, thumb in thumbs:
+        width = thumb.shape[1]
+        if x and x + width > _SPRITE_ROW_WIDTH:
+            x, y = 0, y + THUMB_HEIGHT
+        index[name] = [x, y, width]
+        x += width
+    sheet = np.zeros((y + THUMB_HEIGHT, _SPRITE_ROW_WIDTH, 4), dtype=np.uint8)
+    for name, thumb in thumbs:
+        sx, sy, width = index[name]
+        sheet[sy:sy + THUMB_HEIGHT, sx:sx + width] = thumb
+    for name, owner in aliases.items():
+        index[name] = index[owner]
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    np.save(_SPRITE_PATH, sheet)
+    with open(_SPRITE_INDEX_PATH, "w", encoding="utf-8") as f:
+        json.dump({"stamp": _emoji_dir_stamp(), "height": THUMB_HEIGHT, "index": index}, f)
+    print(f"精灵图已生成: {_SPRITE_PATH}（{len(index)} 个表情）")
+    return len(index)
+
+
+class ChartRenderer:
+    """Top10 柱状图渲染器（非交互式后端，复用 Figure 与缩略图）"""
+
+    def __init__(self):
+        self._fig = None
+        self._ax = None
+        self._thumbs: Dict[str, object] = {}
+        self._sprite = None
+        self._sprite_index: Optional[Dict[str, List[int]]] = None
+        self._lock = threading.Lock()
+        self._load_sprite()
+
+    def _load_sprite(self):
+        """加载精灵图（存在且与 emoji/ 目录一致时）"""
+        try:
+            with open(_SPRITE_INDEX_PATH, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("stamp") != _emoji_dir_stamp() or meta.get("height") != THUMB_HEIGHT:
+                return
+            import numpy as np
+
+            self._sprite = np.load(_SPRITE_PATH, mmap_mode="r")
+            self._sprite_index = meta["index"]
+        except Exception:
+            self._sprite = None
+            self._sprite_index = None
+
+    def thumbnail(self, emoji: str):
+        """获取 emoji 缩略图（RGBA 数组），没有本地图片时返回 None"""
+        if emoji in self._thumbs:
+            return self._thumbs[emoji]
+
+        thumb = None
+        if self._sprite_index and emoji in self._sprite_index:
+            import numpy as np
+
+            x, y, width = self._sprite_index[emoji]
+            thumb = np.array(self._sprite[y:y + THUMB_HEIGHT, x:x + width])
+        else:
+            path = get_catalog().image_path(emoji)
+            if path:
+                thumb = self._cached_thumbnail(path)
+        self._thumbs[emoji] = thumb
+        return thumb
+
+    def _cached_thumbnail(self, path: str):
+        """从磁盘缩略图缓存读取，缺失时生成并写回"""
+        import numpy as np
+
+        try:
+            cache_path = _thumb_cache_path(path)
+            if os.path.exists(cache_path):
+                return np.load(cache_path)
+        except Exception:
+            cache_path = None
+
+        try:
+            thumb = _make_thumbnail(path)
+        except Exception as e:
+            print(f"无法加载logo {path}: {e}")
+            return None
+        if cache_path:
+            try:
+                os.makedirs(_THUMB_DIR, exist_ok=True)
+                np.save(cache_path, thumb)
+            except Exception:
+                pass
+        return thumb
+
+    def _ensure_figure(self):
+        if self._fig is not None:
+            return
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib import pyplot as plt
+
+        plt.rcParams["font.sans-serif"] = ["Microsoft YaHei"]
+        plt.rcParams["axes.unicode_minus"] = False
+        self._fig, self._ax = plt.subplots(figsize=(16, 9))
+
+    def render_top10(self, username: str, top10: List[Tuple[str, int]], chart_path: str,
+                     title: Optional[str] = None) -> bool:
+        """
+        渲染 Top10 柱状图（title 为空时标题为 "Top 10 Emojis for @用户名"）
+
+        Returns:
+            是否生成了图片（top10 为空时不生成）
+        """
+        if not top10:
+            return False
+        from matplotlib.offsetbox import AnnotationBbox, OffsetImage
+
+        with self._lock:
+            self._ensure_figure()
+            ax = self._ax
+            ax.clear()
+
+            emojis = [e for e, _ in top10]
+            counts = [c for _, c in top10]
+            ax.bar(range(len(emojis)), counts, color='#1DA1F2', alpha=0.75)
+
+            ax.set_ylabel('Counts')
+            ax.set_title(title or f'Top 10 Emojis for @{username}')
+            ax.set_ylim(0, max(counts) * 1.1)
+            ax.set_xticks([])
+
+            for i, (emoji, count) in enumerate(zip(emojis, counts)):
+                thumb = self.thumbnail(emoji)
+                if thumb is not None:
+                    imagebox = OffsetImage(thumb, zoom=0.25)
+                    ab = AnnotationBbox(imagebox, (i, 0),
+                                        xycoords='data',
+                                        frameon=False,
+                                        box_alignment=(0.5, 1))
+                    ax.add_artist(ab)
+
+                # 添加两行文字
+                # 第一行：表情符号
+                ax.text(i, -0.07 * max(counts), emoji,
+                        ha='center', va='top', fontsize=8)
+
+                # 第二行：计数
+                ax.text(i, -0.1 * max(counts), f"{count}",
+                        ha='center', va='top', fontsize=11, color='gray')
+
+            self._fig.savefig(chart_path, dpi=150)
+        return True
+
+    def close(self):
+        """释放 Figure"""
+        if self._fig is not None:
+            from matplotlib import pyplot as plt
+
+            plt.close(self._fig)
+            self._fig = None
+            self._ax = None
+
+
+_renderer: Optional[ChartRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_chart_renderer() -> ChartRenderer:
+    """获取全局图表渲染器实例"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = ChartRenderer()
+    return _renderer
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="图表渲染工具")
+    parser.add_argument('--build-sprite', action='store_true',
+                        help='把 emoji/ 目录的缩略图打包为精灵图')
+    args = parser.parse_args()
+    if args.build_sprite:
+        build_sprite_sheet()
+    else:
+        parser.print_help()
@@ -0,0 +1,220 @@
+"""
+断点续爬模块 - 独立实现
+长时间翻页时定期把进度写入磁盘，进程中断或请求失败后可用 --resume 从中断处继续
+
+每个 (用户, 时间窗口) 对应两个文件：
+1. {名称}.jsonl  已获取的窗口内回复，每行一条，只追加
+2. {名称}.json   进度：下一页页码、已完成页数、已提交的 .jsonl 字节数等
+
+每完成 CHECKPOINT_EVERY 页，先把缓冲的回复追加写入 .jsonl 并 fsync，再通过临时文件 + os.replace
+原子替换进度文件。进度文件是提交点：恢复时把 .jsonl 截断到其中记录的字节数，丢弃最后一次提交
+之后写入的内容，因此无论在哪一刻中断，读到的都是一致的“已完成页数 + 对应回复”。
+
+两次运行之间用户若发了新回复，同一 offset 上的内容会整体后移，续爬的前几页会与已获取的回复重叠；
+回放时记下已获取的 post_id，续爬得到的重复回复由 new_replies 过滤。
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set
+
+from config import CHECKPOINT_DIR, CHECKPOINT_EVERY
+from action_decode import loads
+from action_pages import safe_filename, window_suffix
+
+CHECKPOINT_VERSION = 1
+# 恢复时每批回放给统计器的回复数
+_REPLAY_BATCH = 500
+
+
+def checkpoint_name(username: str, since: Optional[str], until: Optional[str]) -> str:
+    """断点文件名（不含扩展名），与结果文件同样按用户与时间窗口区分"""
+    return f"{safe_filename(username)}{window_suffix(since, until)}"
+
+
+class CrawlCheckpoint:
+    """
+    单次翻页的进度
+
+    由 iter_user_replies 在每页处理完后调用 page_done，翻页结束时调用 close；
+    every 为 0 时只在内存中记录进度（仍可用于判断结果是否完整），不写磁盘。
+    """
+
+    def __init__(self, username: str, since: Optional[str] = None, until: Optional[str] = None,
+                 max_pages: Optional[int] = None, every: Optional[int] = None,
+                 directory: str = CHECKPOINT_DIR):
+        self.username = username
+        self.since = since
+        self.until = until
+        self.max_pages = max_pages
+        self.every = CHECKPOINT_EVERY if every is None else max(0, every)
+        base = os.path.join(directory, checkpoint_name(username, since, until))
+        self.state_path = base + '.json'
+        self.records_path = base + '.jsonl'
+
+        self.next_page = 1       # 下一个要获取的页码
+        self.pages_done = 0      # 已完成的页数
+        self.replies = 0         # 已获取的窗口内回复数
+        self.complete = False    # 是否正常翻到末尾（或达到页数上限、时间阈值）
+        self.exhausted = False   # 是否因没有更多内容而停止（末页、已存储的回复或时间阈值），而非页数上限
+        self.error: Optional[str] = None
+        self.resumed = False
+        self._buffer: List[Dict] = []
+        self._buffered_pages = 0
+        self._committed_bytes = 0
+        self._seen: Set[int] = set()  # 回放过的 post_id
+
+    def exists(self) -> bool:
+        return os.path.exists(self.state_path)
+
+    def load(self) -> bool:
+        """
+        读取已保存的进度，并把回复文件截断到最后一次提交的位置
+
+        Returns:
+            是否可以从该进度继续（不存在、参数不一致或文件损坏时返回 False）
+        """
+        if not self.every or not self.exists():
+            return False
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取断点失败: {e}")
+            return False
+        if state.get('version') != CHECKPOINT_VERSION:
+            return False
+        if (state.get('username'), state.get('since'), state.get('until'), state.get('max_pages')) != \
+                (self.username, self.since, self.until, self.max_pages):
+            print("⚠️  断点的用户、时间窗口或页数上限与本次不一致，无法继续")
+            return False
+
+        committed = state.get('records_bytes', 0)
+        try:
+            size = os.path.getsize(self.records_path) if os.path.exists(self.records_path) else 0
+            if size < committed:
+                print("⚠️  断点的回复文件不完整，无法继续")
+                return False
+            if size > committed:
+                # 最后一次提交之后追加的内容不属于任何已完成的页面
+                with open(self.records_path, 'r+b') as f:
+                    f.truncate(committed)
+        except OSError as e:
+            print(f"读取断点失败: {e}")
+            return False
+
+        self.next_page = state['next_page']
+        self.pages_done = state['pages_done']
+        self.replies = state['replies']
+        self.error = state.get('error')
+        self._committed_bytes = committed
+        self.resumed = True
+        return True
+
+    def reset(self):
+        """丢弃已保存的进度，从第一页开始"""
+        self.discard()
+        self.next_page, self.pages_done, self.replies = 1, 0, 0
+        self.complete, self.exhausted, self.error, self.resumed = False, False, None, False
+        self._buffer, self._buffered_pages, self._committed_bytes = [], 0, 0
+        self._seen = set()
+
+    def iter_records(self) -> Iterator[List[Dict]]:
+        """按批产出已提交的回复（恢复时回放给统计器）"""
+        if not self._committed_bytes:
+            return
+        batch: List[Dict] = []
+        with open(self.records_path, 'rb') as f:
+            for line in f:
+                reply = loads(line)
+                self._seen.add(reply.get('post_id'))
+                batch.append(reply)
+                if len(batch) >= _REPLAY_BATCH:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def new_replies(self, replies: List[Dict]) -> List[Dict]:
+        """去掉恢复前已获取过的回复"""
+        if not self._seen:
+            return replies
+        return [r for r in replies if r.get('post_id') not in self._seen]
+
+    def page_done(self, page: int, replies: List[Dict]):
+        """记录完成的一页及其中窗口内的回复，每 every 页提交一次"""
+        self.next_page = page + 1
+        self.pages_done += 1
+        self.replies += len(replies)
+        if not self.every:
+            return
+        self._buffer.extend(replies)
+        self._buffered_pages += 1
+        if self._buffered_pages >= self.every:
+            self.flush()
+
+    def fail(self, page: int, reason: str):
+        """记录获取失败的页面（该页未完成，恢复时从它重新开始）"""
+        self.error = f"第 {page} 页获取失败: {reason}"
+
+    def close(self, complete: bool, exhausted: bool = False):
+        """翻页结束：完整时删除断点，否则提交剩余进度"""
+        self.complete = complete
+        self.exhausted = exhausted
+        if complete:
+            self.discard()
+        else:
+            self.flush()
+
+    def flush(self):
+        """追加写入缓冲的回复，再原子替换进度文件"""
+        if not self.every:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        if self._buffer or not os.path.exists(self.records_path):
+            # load 已把文件截断到提交位置，追加写入即从提交位置开始
+            with open(self.records_path, 'ab') as f:
+                for reply in self._buffer:
+                    f.write(json.dumps(reply, ensure_ascii=False).encode('utf-8'))
+                    f.write(b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+                self._committed_bytes = f.tell()
+        self._buffer, self._buffered_pages = [], 0
+
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'username': self.username,
+            'since': self.since,
+            'until': self.until,
+            'max_pages': self.max_pages,
+            'next_page': self.next_page,
+            'pages_done': self.pages_done,
+            'replies': self.replies,
+            'records_bytes': self._committed_bytes,
+            'error': self.error,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    def discard(self):
+        for path in (self.state_path, self.records_path, self.state_path + '.tmp'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def partial_info(self) -> Dict:
+        """结果不完整时写入统计结果的标记"""
+        return {
+            'partial': True,
+            'partial_reason': self.error or '翻页被中断',
+            'pages_done': self.pages_done,
+            'resume_from_page': self.next_page,
+        }
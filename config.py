@@ -3,19 +3,97 @@
 包含 API 端点和常量定义
 """
 
-# 水源社区 API 端点
-SHUIYUAN_BASE = "https://shuiyuan.sjtu.edu.cn/"
+import os
+
+# 水源社区 API 端点（可用环境变量 SHUIYUAN_BASE 指向本地模拟服务器，例如 http://127.0.0.1:8765/）
+SHUIYUAN_BASE = os.environ.get("SHUIYUAN_BASE", "https://shuiyuan.sjtu.edu.cn/").rstrip("/") + "/"
 USER_ACTIONS_API = SHUIYUAN_BASE + "user_actions.json"
+USER_PROFILE_API = SHUIYUAN_BASE + "u/{username}.json"
+TOPIC_API = SHUIYUAN_BASE + "t/{topic_id}.json"
+TOPIC_POSTS_API = SHUIYUAN_BASE + "t/{topic_id}/posts.json"
 
 # HTTP 配置
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
 
+# 限速配置（自适应令牌桶：收到 429/503 之前不限速；之后每次限流减半，持续健康时按倍数提速，
+# 最多提速到被限流前最后一个健康的速率）
+RATE_LIMIT_MIN_RPS = 0.5    # 降速下限
+RATE_LIMIT_MAX_RPS = 20.0   # 首次限流时的基准速率上限
+RATE_LIMIT_GROWTH = 1.5     # 每约一秒的健康响应后速率乘以该倍数
+THROTTLE_MAX_RETRIES = 5    # 429/503 的最大重试次数
+THROTTLE_BACKOFF = 1.0      # 无 Retry-After 时的初始退避秒数（指数增长）
+
 # Cookie 文件路径
 COOKIE_FILE = "./cookies.txt"
 
 # 输出目录
 OUTPUT_DIR = "./emoji_stats_output"
 
+# 缓存目录（emoji 索引等可重建的数据）
+CACHE_DIR = OUTPUT_DIR + "/.cache"
+
+# Emoji 目录与本地图片
+EMOJI_JSON = "emojis.json"
+EMOJI_DIR = "emoji"
+
+# 本地回复库（SQLite），用于增量刷新
+REPLY_STORE_PATH = OUTPUT_DIR + "/replies.sqlite3"
+
+# HTTP 条件请求缓存：保存响应体与 ETag/Last-Modified，再次请求时由服务端确认未变化（304）则直接使用本地副本
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = CACHE_DIR + "/http"
+HTTP_CACHE_MAX_MB = 512  # 超出时按最近使用时间淘汰
+
+# 离线归档（--archive 写入，--from-archive 读取）：每个用户一组只追加的 gzip 压缩 JSONL 分片 + 偏移索引
+ARCHIVE_DIR = OUTPUT_DIR + "/archive"
+ARCHIVE_BLOCK_RECORDS = 300  # 每个压缩块的记录数（块是读取与按时间跳过的最小单位）
+ARCHIVE_SHARD_MB = 64        # 单个分片文件的大小上限，超出后写入新分片
+
+# 断点续爬：每获取 CHECKPOINT_EVERY 页保存一次进度（0 表示不保存），--resume 时从保存处继续
+CHECKPOINT_DIR = OUTPUT_DIR + "/.checkpoints"
+CHECKPOINT_EVERY = 10
+
 # 分页配置
-ITEMS_PER_PAGE = 30  # Discourse API 默认每页30条
+ITEMS_PER_PAGE = int(os.environ.get("SHUIYUAN_PAGE_SIZE", 30))  # Discourse API 默认每页30条
+
+# JSON 解码器：auto（已安装 orjson 时使用，否则标准库）、orjson 或 json
+JSON_BACKEND = "auto"
+
+# Emoji 提取引擎：fast（单遍正则扫描）或 bs4（BeautifulSoup 回退实现）
+EMOJI_EXTRACTOR = "fast"
+
+# 并行提取配置
+EXTRACT_WORKERS = 1  # 提取进程数，1 表示串行，0 表示 CPU 核数
+EXTRACT_CHUNK_SIZE = 500  # 每次分发给 worker 的帖子数
+PARALLEL_EXTRACT_MIN_POSTS = 2000  # 帖子数少于该值时不启用进程池
+
+# 话题模式：每个请求按 id 批量获取的帖子数（与 Discourse 默认的 posts_chunksize 一致，避免单个响应过大）
+TOPIC_POST_CHUNK_SIZE = 20
+# 话题报告 Markdown 中列出的参与者数（JSON 中保留全部参与者）
+TOPIC_REPORT_PARTICIPANTS = 50
+
+# 并发翻页配置
+FETCH_CONCURRENCY = 1  # 同时在途的分页请求数，1 表示逐页顺序获取
+BATCH_CONCURRENCY = 4  # 批量模式（-b）所有用户共享的同时在途请求数（单个用户最多 2 个）
+
+# 抽样模式（--sample）：在全部历史页中分层随机抽页，估计 emoji 频率与使用率及其置信区间
+SAMPLE_PAGES = 40         # 抽取的页数（每层 2 页）；窗口内总页数不超过该值时全部获取，结果精确
+SAMPLE_CONFIDENCE = 0.95  # 置信水平
+SAMPLE_TOP_N = 10         # 报告中列出置信区间与名次是否可靠的 Top N
+
+# 多用户对比报告：相似度（cosine 或 jaccard）、每个用户列出的相似用户数与特色 emoji 数
+SIMILARITY_METRIC = "cosine"
+SIMILARITY_TOP_K = 5
+DISTINCTIVE_EMOJIS = 5
 
+# 服务模式（--serve）：本地 HTTP/JSON 接口，结果缓存在内存中
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8780
+SERVICE_CACHE_SIZE = 256        # 缓存的 (用户, 时间窗口) 结果数上限，超出时淘汰最久未读取的
+SERVICE_CACHE_TTL = 600         # 结果有效期（秒），过期后先返回旧结果，同时在后台重新获取
+SERVICE_PARTIAL_TTL = 30        # 翻页中途失败的不完整结果的有效期（秒），过期后尽快重新获取
+SERVICE_MAX_STALE = 86400       # 旧结果最多再返回多久（秒），更旧的视为未缓存
+SERVICE_REFRESH_INTERVAL = 30   # 后台刷新线程的扫描间隔（秒）
+SERVICE_HOT_WINDOW = 1800       # 最近该时长内被读取过的结果视为热点，在过期前主动刷新
+SERVICE_CRAWL_WORKERS = 2       # 同时进行的获取任务数（共享同一个限速器）
+SERVICE_WAIT_TIMEOUT = 120      # 未缓存时读请求最多等待的秒数，超时返回 202，获取继续进行
@@ -0,0 +1,343 @@
+"""
+按天直方图索引模块 - 独立实现
+把一次完整统计得到的 每天 × emoji 计数持久化为 .npz（与输出文件放在一起），
+并预先计算前缀和，任意时间窗口的 Top N、总数、使用率都可以在毫秒级直接从索引得出，
+无需联网，也无需重新解析 HTML。
+
+- 时间粒度为 UTC 自然日：窗口按 since / until 所在的日期整天计入，因此只有两端落在日界上的窗口
+  （since 为 00:00:00、until 为 23:59:59 及之后，见 day_aligned）结果才与在线统计一致，
+  其余窗口由 analyze_from_index 改为在线统计
+- 索引不含话题信息，查询结果带 from_index 标记，单独保存，不覆盖在线统计的结果文件
+- 没有时间戳的回复记在第 0 天，任何窗口都计入（与在线统计的过滤规则一致）
+- 不限结束时间的完整索引可以增量更新：只翻比索引中最新回复更新的页，合并进索引（merged），
+  之后截至现在的窗口（如 GUI 中以今天结束的快捷范围）也能从索引查询
+- 次数相同的 emoji 按窗口内首次出现的先后排序，与在线统计完全一致
+"""
+
+import json
+import os
+from datetime import datetime, time, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import OUTPUT_DIR
+from action_pages import parse_iso_datetime, safe_filename
+from emoji_counts import UNDATED_DAY, day_ordinal, most_common_order, split_keys
+
+# 索引格式版本，结构变化时递增
+_INDEX_VERSION = 1
+
+
+def index_path(username: str) -> str:
+    """用户索引文件路径"""
+    return os.path.join(OUTPUT_DIR, f"{safe_filename(username)}_day_index.npz")
+
+
+def day_aligned(since_dt: Optional[datetime], until_dt: Optional[datetime]) -> bool:
+    """窗口两端是否落在 UTC 日界上：since 为当天 00:00:00，until 为当天 23:59:59 及之后"""
+    if since_dt is not None and since_dt.astimezone(timezone.utc).timetz().replace(tzinfo=None) != time.min:
+        return False
+    if until_dt is not None and until_dt.astimezone(timezone.utc).timetz().replace(tzinfo=None) < time(23, 59, 59):
+        return False
+    return True
+
+
+class DayIndex:
+    """单个用户的按天直方图索引"""
+
+    def __init__(self, username: str, days: np.ndarray, names: List[str],
+                 cum_counts: np.ndarray, cum_replies: np.ndarray, cum_with_emoji: np.ndarray,
+                 cell_day: np.ndarray, cell_emoji: np.ndarray, cell_first: np.ndarray,
+                 meta: Dict):
+        """
+        Args:
+            days: 升序的日期序号（长度 D）
+            names: emoji 名称（长度 V）
+            cum_counts: (D+1, V) 的 emoji 计数前缀和
+            cum_replies / cum_with_emoji: (D+1,) 的回复数 / 含 emoji 回复数前缀和
+            cell_day / cell_emoji / cell_first: 非零格子的 (日期下标, emoji 下标, 首次出现序号)
+            meta: 覆盖范围等元数据
+        """
+        self.username = username
+        self.days = days
+        self.names = names
+        self.cum_counts = cum_counts
+        self.cum_replies = cum_replies
+        self.cum_with_emoji = cum_with_emoji
+        self.cell_day = cell_day
+        self.cell_emoji = cell_emoji
+        self.cell_first = cell_first
+        self.meta = meta
+
+    @classmethod
+    def from_aggregator(cls, username: str, aggregator,
+                        since: Optional[str] = None, until: Optional[str] = None,
+                        complete: bool = True) -> "DayIndex":
+        """
+        从统计器的按天计数构建索引
+
+        Args:
+            since / until: 统计时使用的时间窗口，即索引的覆盖范围
+            complete: 统计是否覆盖了窗口内的全部回复（受最大页数限制时为 False）
+        """
+        aggregator.finish()
+        keys, counts, first = aggregator.day_emoji_counts.arrays()
+        key_days, ids = split_keys(keys)
+        days = np.array(sorted(aggregator.day_replies), dtype=np.int64)
+
+        emoji_ids, cell_emoji = np.unique(ids, return_inverse=True)
+        cell_day = np.searchsorted(days, key_days)
+
+        dense = np.zeros((len(days), len(emoji_ids)), dtype=np.int64)
+        np.add.at(dense, (cell_day, cell_emoji), counts)
+        replies = np.array([aggregator.day_replies[d] for d in days.tolist()],
+                           dtype=np.int64).reshape(-1, 2)
+        newest = aggregator.newest_dt
+        meta = {
+            'version': _INDEX_VERSION,
+            'username': username,
+            'since': since,
+            'until': until,
+            'complete': complete,
+            'built_at': _utc_now(),
+            'newest': newest.astimezone(timezone.utc).isoformat() if newest else None,
+        }
+        return cls._from_dense(username, days, aggregator.vocab.names(emoji_ids.tolist()),
+                               dense, replies, cell_day, cell_emoji, first, meta)
+
+    @classmethod
+    def _from_dense(cls, username: str, days: np.ndarray, names: List[str],
+                    dense: np.ndarray, replies: np.ndarray,
+                    cell_day: np.ndarray, cell_emoji: np.ndarray, cell_first: np.ndarray,
+                    meta: Dict) -> "DayIndex":
+        """由每天的计数 (D, V) 与回复数 (D, 2) 计算前缀和"""
+        cum_counts = np.zeros((len(days) + 1, len(names)), dtype=np.int64)
+        np.cumsum(dense, axis=0, out=cum_counts[1:])
+        cum_replies = np.concatenate([[0], np.cumsum(replies[:, 0])])
+        cum_with_emoji = np.concatenate([[0], np.cumsum(replies[:, 1])])
+        return cls(username, days, names, cum_counts, cum_replies, cum_with_emoji,
+                   cell_day, cell_emoji, cell_first, meta)
+
+    def can_update(self, since_dt: Optional[datetime] = None) -> bool:
+        """能否把索引生成之后的新回复补进来，使其覆盖截至现在、从 since_dt 开始的窗口"""
+        if not self.meta.get('complete') or self.meta.get('until') or not self.meta.get('newest'):
+            return False
+        own_since = self.declared_window()[0]
+        return not own_since or (since_dt is not None and since_dt >= own_since)
+
+    def newest(self) -> Optional[datetime]:
+        """索引中最新一条回复的时间（增量更新只需获取比它更新的回复）"""
+        newest = self.meta.get('newest')
+        return parse_iso_datetime(newest) if newest else None
+
+    def merged(self, newer: "DayIndex") -> "DayIndex":
+        """
+        合并只含更新回复的索引 newer（全部晚于本索引中的回复），生成时间取 newer 的
+
+        在线统计从最新的回复翻起，newer 中的 emoji 先出现，因此本索引的首次出现序号整体后移。
+        """
+        days = np.union1d(self.days, newer.days)
+        names = list(self.names)
+        columns = {name: i for i, name in enumerate(names)}
+        for name in newer.names:
+            if name not in columns:
+                columns[name] = len(names)
+                names.append(name)
+
+        dense = np.zeros((len(days), len(names)), dtype=np.int64)
+        replies = np.zeros((len(days), 2), dtype=np.int64)
+        cells = []
+        shift = int(newer.cum_counts[-1].sum())
+        for part, offset in ((newer, 0), (self, shift)):
+            rows = np.searchsorted(days, part.days)
+            cols = np.array([columns[name] for name in part.names], dtype=np.int64)
+            dense[np.ix_(rows, cols)] += np.diff(part.cum_counts, axis=0)
+            replies[rows, 0] += np.diff(part.cum_replies)
+            replies[rows, 1] += np.diff(part.cum_with_emoji)
+            cells.append((rows[part.cell_day] * len(names) + cols[part.cell_emoji],
+                          part.cell_first + offset))
+
+        # 同一天同一 emoji 在两部分中都出现时合并为一个格子，保留较早的首次出现序号
+        keys, inverse = np.unique(np.concatenate([c[0] for c in cells]), return_inverse=True)
+        first = np.full(len(keys), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, inverse, np.concatenate([c[1] for c in cells]))
+
+        meta = dict(self.meta)
+        meta['built_at'] = newer.meta['built_at']
+        meta['newest'] = newer.meta.get('newest') or self.meta.get('newest')
+        return self._from_dense(self.username, days, names, dense, replies,
+                                keys // max(1, len(names)), keys % max(1, len(names)), first, meta)
+
+    def save(self, path: Optional[str] = None) -> str:
+        """原子写入 .npz 文件"""
+        path = path or index_path(self.username)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                days=self.days,
+                names=np.array(self.names, dtype=str),
+                cum_counts=self.cum_counts,
+                cum_replies=self.cum_replies,
+                cum_with_emoji=self.cum_with_emoji,
+                cell_day=self.cell_day,
+                cell_emoji=self.cell_emoji,
+                cell_first=self.cell_first,
+                meta=np.array(json.dumps(self.meta, ensure_ascii=False)),
+            )
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, username: str, path: Optional[str] = None) -> Optional["DayIndex"]:
+        """读取索引，不存在或格式不符时返回 None"""
+        path = path or index_path(username)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('version') != _INDEX_VERSION:
+                    return None
+                return cls(username, data['days'], data['names'].tolist(),
+                           data['cum_counts'], data['cum_replies'], data['cum_with_emoji'],
+                           data['cell_day'], data['cell_emoji'], data['cell_first'], meta)
+        except Exception as e:
+            print(f"读取索引 {path} 失败: {e}")
+            return None
+
+    def declared_window(self):
+        """统计时使用的时间窗口 (since_dt, until_dt)，None 表示不限（比较两个索引的范围用）"""
+        own_since = self.meta.get('since')
+        own_until = self.meta.get('until')
+        return (parse_iso_datetime(own_since) if own_since else None,
+                parse_iso_datetime(own_until) if own_until else None)
+
+    def coverage(self):
+        """
+        索引覆盖的时间窗口 (since_dt, until_dt)，since_dt 为 None 表示不限
+
+        索引生成之后的回复不在其中，until_dt 取统计窗口终点与生成时间中较早的一个。
+        """
+        since_dt, until_dt = self.declared_window()
+        built_at = parse_iso_datetime(self.meta['built_at'])
+        return since_dt, min(until_dt, built_at) if until_dt else built_at
+
+    def covers(self, since_dt: Optional[datetime], until_dt: Optional[datetime],
+               up_to_date: bool = False) -> bool:
+        """
+        索引的覆盖范围是否包含给定窗口（until_dt 为 None 即截至现在，总是晚于索引生成时间）
+
+        up_to_date 为 True 表示不限结束时间的索引刚刚增量更新到现在，生成时间之后还没有回复，
+        不再以生成时间限制窗口终点。
+        """
+        if not self.meta.get('complete'):
+            return False
+        own_since, own_until = self.coverage()
+        if up_to_date and not self.meta.get('until'):
+            own_until = None
+        if own_since and (since_dt is None or since_dt < own_since):
+            return False
+        if own_until and (until_dt is None or until_dt > own_until):
+            return False
+        return True
+
+    def serves(self, since_dt: Optional[datetime], until_dt: Optional[datetime],
+               up_to_date: bool = False) -> bool:
+        """能否直接从索引给出与在线统计一致的结果：覆盖该窗口且两端落在日界上"""
+        return self.covers(since_dt, until_dt, up_to_date) and day_aligned(since_dt, until_dt)
+
+    def _day_range(self, since_dt: Optional[datetime], until_dt: Optional[datetime]):
+        """窗口 -> 日期下标区间 [lo, hi)，不含第 0 天"""
+        dated_lo = int(np.searchsorted(self.days, UNDATED_DAY, side='right'))
+        lo = dated_lo if since_dt is None else max(
+            dated_lo, int(np.searchsorted(self.days, day_ordinal(since_dt), side='left')))
+        hi = len(self.days) if until_dt is None else int(
+            np.searchsorted(self.days, day_ordinal(until_dt), side='right'))
+        return lo, max(lo, hi), dated_lo
+
+    def query(self, since_dt: Optional[datetime] = None,
+              until_dt: Optional[datetime] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+        """
+        查询任意时间窗口的统计结果
+
+        Returns:
+            与 EmojiAggregator.to_result 相同结构的结果，另带 from_index 与 index_built_at；
+            emoji_by_topic 为空（索引不含话题信息）
+        """
+        lo, hi, dated_lo = self._day_range(since_dt, until_dt)
+
+        def window_sum(cum: np.ndarray):
+            # 区间和 + 无时间戳回复（下标 [0, dated_lo)）
+            return cum[hi] - cum[lo] + cum[dated_lo] - cum[0]
+
+        counts = window_sum(self.cum_counts)
+        total_replies = int(window_sum(self.cum_replies))
+        replies_with_emoji = int(window_sum(self.cum_with_emoji))
+
+        # 窗口内每个 emoji 的首次出现序号，用于还原同次数时的先后顺序
+        in_window = ((self.cell_day >= lo) & (self.cell_day < hi)) | (self.cell_day < dated_lo)
+        first = np.full(len(self.names), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, self.cell_emoji[in_window], self.cell_first[in_window])
+
+        used = np.flatnonzero(counts)
+        order = used[most_common_order(counts[used], first[used])]
+        frequency = [(self.names[i], int(counts[i])) for i in order.tolist()]
+        return {
+            'username': self.username,
+            'total_replies': total_replies,
+            'replies_with_emoji': replies_with_emoji,
+            'emoji_usage_rate': f"{replies_with_emoji / total_replies * 100:.2f}%" if total_replies else "0%",
+            'total_emojis': int(counts.sum()),
+            'unique_emojis': len(frequency),
+            'emoji_frequency': dict(frequency),
+            'top_10_emojis': frequency[:10],
+            'emoji_by_topic': {},
+            'since': since,
+            'until': until,
+            'from_index': True,
+            'index_built_at': self.meta.get('built_at'),
+        }
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _contains(outer, inner) -> bool:
+    """时间窗口 outer 是否包含 inner（均为 (since_dt, until_dt)，None 表示不限）"""
+    outer_since, outer_until = outer
+    inner_since, inner_until = inner
+    if outer_since and (inner_since is None or inner_since < outer_since):
+        return False
+    if outer_until and (inner_until is None or inner_until > outer_until):
+        return False
+    return True
+
+
+def save_day_index(username: str, aggregator, since: Optional[str] = None,
+                   until: Optional[str] = None, complete: bool = True) -> Optional[str]:
+    """
+    保存统计器的按天索引
+
+    已有的完整索引覆盖范围更大时保留旧索引（例如完整统计后又做了一次窗口统计）。
+
+    Returns:
+        写入的路径，未写入时返回 None
+    """
+    try:
+        index = DayIndex.from_aggregator(username, aggregator, since, until, complete)
+        existing = DayIndex.load(username)
+        if existing is not None and existing.meta.get('complete'):
+            if not complete:
+                return None
+            old_window, new_window = existing.declared_window(), index.declared_window()
+            if _contains(old_window, new_window) and not _contains(new_window, old_window):
+                return None
+        return index.save()
+    except Exception as e:
+        print(f"保存按天索引失败: {e}")
+        return None
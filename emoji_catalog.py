@@ -0,0 +1,168 @@
+"""
+Emoji 目录模块 - 独立实现
+一次性加载 emojis.json 与本地 emoji/ 目录，建立 名称 -> 条目/图片路径 索引
+
+索引以紧凑形式缓存到磁盘，emojis.json 或 emoji/ 目录的 mtime 变化时自动重建；
+图表渲染、短代码校验等所有查询共享同一个进程内实例。
+"""
+
+import json
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import CACHE_DIR, EMOJI_DIR, EMOJI_JSON
+
+# 缓存格式版本，索引结构变化时递增
+_CACHE_VERSION = 1
+_CACHE_PATH = os.path.join(CACHE_DIR, "emoji_catalog.pickle")
+
+
+def _source_stamp() -> Tuple:
+    """索引依赖的源文件标识（mtime + 大小），用于判断缓存是否失效"""
+    stamp = []
+    for path in (EMOJI_JSON, EMOJI_DIR, os.path.join(EMOJI_DIR, "original")):
+        try:
+            st = os.stat(path)
+            stamp.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append((path, None, None))
+    return tuple(stamp)
+
+
+def _local_path_for_url(name: str, url: str) -> str:
+    """把 emojis.json 中的 url 映射为 emoji/ 目录下的本地路径"""
+    if url.startswith("//"):
+        # 自定义表情：//shuiyuan.s3.jcloud.sjtu.edu.cn/original/4X/... -> emoji/original/4X/...
+        _, _, rel = url[2:].partition("/")
+        return os.path.join(EMOJI_DIR, *rel.split("/"))
+    # 标准表情：/images/emoji/noto/<name>.png?v=14 -> emoji/<name>.png
+    return os.path.join(EMOJI_DIR, f"{name}.png")
+
+
+def _build_index() -> Dict:
+    """从源文件构建紧凑索引"""
+    # name -> (group, url)
+    entries: Dict[str, Tuple[str, str]] = {}
+    # alias -> (name, ...)
+    aliases: Dict[str, List[str]] = {}
+    # name -> 本地图片路径（只收录确实存在的文件）
+    paths: Dict[str, str] = {}
+
+    if os.path.isdir(EMOJI_DIR):
+        for fname in os.listdir(EMOJI_DIR):
+            if fname.endswith(".png"):
+                paths[fname[:-4]] = os.path.join(EMOJI_DIR, fname)
+
+    try:
+        with open(EMOJI_JSON, "r", encoding="UTF-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"读取 {EMOJI_JSON} 失败: {e}")
+        data = {}
+
+    for group, items in data.items():
+        for item in items:
+            name = item.get("name")
+            if not name:
+                continue
+            url = str(item.get("url", ""))
+            entries.setdefault(name, (group, url))
+            for alias in item.get("search_aliases", []):
+                alias_names = aliases.setdefault(alias.lower(), [])
+                if name not in alias_names:
+                    alias_names.append(name)
+            if name not in paths:
+                candidate = _local_path_for_url(name, url)
+                if os.path.exists(candidate):
+                    paths[name] = candidate
+
+    return {
+        "entries": entries,
+        "aliases": {alias: tuple(names) for alias, names in aliases.items()},
+        "paths": paths,
+    }
+
+
+class EmojiCatalog:
+    """Emoji 目录索引"""
+
+    def __init__(self, index: Dict):
+        self._entries: Dict[str, Tuple[str, str]] = index["entries"]
+        self._aliases: Dict[str, Tuple[str, ...]] = index["aliases"]
+        self._paths: Dict[str, str] = index["paths"]
+
+    @classmethod
+    def load(cls, use_cache: bool = True) -> "EmojiCatalog":
+        """加载索引：优先读取未失效的磁盘缓存，否则重建并写回缓存"""
+        stamp = _source_stamp()
+        if use_cache:
+            try:
+                with open(_CACHE_PATH, "rb") as f:
+                    cached = pickle.load(f)
+                if cached.get("version") == _CACHE_VERSION and cached.get("stamp") == stamp:
+                    return cls(cached["index"])
+            except Exception:
+                pass  # 缓存缺失或损坏时重建
+
+        index = _build_index()
+        if use_cache:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                tmp_path = _CACHE_PATH + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    pickle.dump({"version": _CACHE_VERSION, "stamp": stamp, "index": index},
+                                f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, _CACHE_PATH)
+            except Exception as e:
+                print(f"写入 emoji 索引缓存失败: {e}")
+        return cls(index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries or name in self._paths
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def names(self) -> List[str]:
+        """emojis.json 中的全部表情名（按文件顺序）"""
+        return list(self._entries)
+
+    def get(self, name: str) -> Optional[Dict]:
+        """获取表情条目，不存在返回 None"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        group, url = entry
+        return {"name": name, "group": group, "url": url}
+
+    def is_known(self, name: str) -> bool:
+        """短代码校验：名称是否为已知表情（目录中有条目或本地有图片）"""
+        return name in self
+
+    def search(self, alias: str) -> List[str]:
+        """按名称或搜索别名查找表情名"""
+        result = [alias] if alias in self._entries else []
+        for name in self._aliases.get(alias.lower(), ()):
+            if name not in result:
+                result.append(name)
+        return result
+
+    def image_path(self, name: str) -> str:
+        """本地图片路径，未找到返回空字符串"""
+        return self._paths.get(name, "")
+
+
+_catalog: Optional[EmojiCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> EmojiCatalog:
+    """获取全局 Emoji 目录实例（首次调用时加载）"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = EmojiCatalog.load()
+    return _catalog
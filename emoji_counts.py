@@ -0,0 +1,176 @@
+"""
+Emoji 计数模块 - 独立实现
+- EmojiVocabulary: 把短代码驻留为整数 id（以 emojis.json 目录为种子，未知的自定义表情按需追加）
+- SparseCounts: 以 int64 键累计次数，批量用 NumPy 归并，并记录每个键首次出现的序号，
+  从而能复现 Counter.most_common 在次数相同时按首次出现排序的行为
+
+NumPy 在首次归并时才导入，只导入本模块不会拖慢命令行启动。
+"""
+
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from emoji_catalog import get_catalog
+
+# 复合键的低 32 位存放 emoji id，高位存放话题序号 / 日期序号等分组
+KEY_SHIFT = 32
+ID_MASK = (1 << KEY_SHIFT) - 1
+# 没有时间戳的回复所在的"日期"（date.toordinal() 从 1 开始，不会冲突）
+UNDATED_DAY = 0
+
+
+def day_ordinal(dt: datetime) -> int:
+    """时间 -> UTC 日期序号（按天分组的复合键高位）"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).toordinal()
+
+
+class EmojiVocabulary:
+    """短代码 <-> 整数 id 的双向映射（线程安全，只增不减）"""
+
+    def __init__(self, seed: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+        for name in seed:
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        """获取名称对应的 id，不存在时追加"""
+        emoji_id = self._ids.get(name)
+        if emoji_id is not None:
+            return emoji_id
+        with self._lock:
+            emoji_id = self._ids.get(name)
+            if emoji_id is None:
+                emoji_id = len(self._names)
+                self._names.append(name)
+                self._ids[name] = emoji_id
+            return emoji_id
+
+    def intern_all(self, names: Iterable[str]) -> List[int]:
+        """批量驻留"""
+        ids = self._ids
+        return [ids[n] if n in ids else self.intern(n) for n in names]
+
+    def get(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def name(self, emoji_id: int) -> str:
+        return self._names[emoji_id]
+
+    def names(self, ids: Iterable[int]) -> List[str]:
+        names = self._names
+        return [names[i] for i in ids]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+_vocabulary: Optional[EmojiVocabulary] = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_vocabulary() -> EmojiVocabulary:
+    """获取全局词表（以 emojis.json 目录中的表情名为种子）"""
+    global _vocabulary
+    if _vocabulary is None:
+        with _vocabulary_lock:
+            if _vocabulary is None:
+                _vocabulary = EmojiVocabulary(get_catalog().names())
+    return _vocabulary
+
+
+class SparseCounts:
+    """
+    稀疏计数：int64 键 -> (次数, 首次出现序号)
+
+    新增的键先追加到紧凑的 array 缓冲区，累计到一定数量后用 np.unique + np.add.at 批量归并，
+    内存占用只与不同键的数量有关。
+    """
+
+    def __init__(self, compact_every: int = 1 << 20):
+        self.compact_every = compact_every
+        self._pending_keys = array('q')
+        self._pending_weights = array('q')
+        self._pending_pos = array('q')
+        self._pending_arrays: List[Tuple] = []  # add_arrays 追加的 (键, 次数, 序号) 数组
+        self._pending_size = 0
+        self._keys = self._counts = self._first = None  # 首次归并时创建
+
+    def add_many(self, keys: List[int], pos: int):
+        """每个键计 1 次，首次出现序号依次为 pos, pos+1, ..."""
+        n = len(keys)
+        self._pending_keys.extend(keys)
+        self._pending_weights.extend([1] * n)
+        self._pending_pos.extend(range(pos, pos + n))
+        if len(self._pending_keys) >= self.compact_every:
+            self.compact()
+
+    def add(self, key: int, weight: int, pos: int):
+        """单个键计 weight 次"""
+        self._pending_keys.append(key)
+        self._pending_weights.append(weight)
+        self._pending_pos.append(pos)
+        if len(self._pending_keys) >= self.compact_every:
+            self.compact()
+
+    def add_arrays(self, keys: "np.ndarray", pos: "np.ndarray"):
+        """批量追加：每个键计 1 次，首次出现序号由 pos 给出（均为 int64 数组）"""
+        import numpy as np
+
+        self._pending_arrays.append((keys, np.ones(len(keys), dtype=np.int64), pos))
+        self._pending_size += len(keys)
+        if self._pending_size >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """把缓冲区归并进已汇总的数组"""
+        import numpy as np
+
+        if self._keys is None:
+            self._keys = np.empty(0, dtype=np.int64)
+            self._counts = np.empty(0, dtype=np.int64)
+            self._first = np.empty(0, dtype=np.int64)
+        if not self._pending_keys and not self._pending_arrays:
+            return
+        chunks = [(self._keys, self._counts, self._first)] + self._pending_arrays
+        chunks.append((np.array(self._pending_keys, dtype=np.int64),
+                       np.array(self._pending_weights, dtype=np.int64),
+                       np.array(self._pending_pos, dtype=np.int64)))
+        keys, weights, pos = (np.concatenate(column) for column in zip(*chunks))
+        self._pending_keys = array('q')
+        self._pending_weights = array('q')
+        self._pending_pos = array('q')
+        self._pending_arrays, self._pending_size = [], 0
+
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        counts = np.zeros(len(uniq), dtype=np.int64)
+        np.add.at(counts, inverse, weights)
+        first = np.full(len(uniq), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, inverse, pos)
+        self._keys, self._counts, self._first = uniq, counts, first
+
+    def arrays(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """返回 (键, 次数, 首次出现序号)，键按升序排列"""
+        self.compact()
+        return self._keys, self._counts, self._first
+
+    def __len__(self) -> int:
+        self.compact()
+        return len(self._keys)
+
+
+def split_keys(keys: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """复合键 -> (分组序号, emoji id)"""
+    return keys >> KEY_SHIFT, keys & ID_MASK
+
+
+def most_common_order(counts: "np.ndarray", first: "np.ndarray") -> "np.ndarray":
+    """与 Counter.most_common 一致的排序：次数降序，次数相同按首次出现先后"""
+    import numpy as np
+
+    return np.lexsort((first, -counts))
@@ -0,0 +1,270 @@
+"""
+Emoji 提取模块 - 独立实现
+从帖子 HTML 中提取 emoji 短代码
+
+提供两种引擎：
+- fast: 基于预编译正则的扫描，按 html.parser 的规则识别 img 标签，不构建文档树（默认）
+- bs4: 原始的 正则 + BeautifulSoup 三遍扫描实现（作为回退与对照基准）
+
+两者输出完全一致（包括顺序）：先是 title/alt 属性中的短代码，
+再是全文中的短代码，最后是 <img class="emoji"> 标签的 title/alt。
+"""
+
+import re
+from html import unescape
+from typing import List
+
+# 全文短代码：只包含小写英文字母和下划线，长度 2-50
+_SHORTCODE_RE = re.compile(r':([a-z_]{2,50}):')
+# title/alt 属性中的短代码，例如 title=":yaoming:" 或 alt=":smiling_face_with_three_hearts:"
+_ATTR_SHORTCODE_RE = re.compile(r'(?:title|alt)="(:([a-z_]+):)"')
+_EMOJI_NAME_RE = re.compile(r'[a-z_]{2,50}')
+_FINAL_FILTER_RE = re.compile(r'^:[a-z_]{2,50}:$')
+_LEGACY_NAME_RE = re.compile(r'^[a-z_]+$')
+
+# 以下正则照搬 Python 3.11 的 html.parser / _markupbase（bs4 引擎使用的 'html.parser' 后端），
+# 使 fast 引擎认定的 <img> 标签与 BeautifulSoup 完全相同
+
+# 跳过文本、结束标签和不带属性的普通开始标签，停在需要逐个解析的 < 或 &# 处
+_SKIP_RE = re.compile(
+    r'(?:[^<&]+|&(?!#)|</[^>]*>|<(?!(?i:img|script|style)>)[a-zA-Z][^\t\n\r\f />\x00]*>)*'
+)
+_CHARREF_RE = re.compile(r'&#(?:[0-9]+|[xX][0-9a-fA-F]+)[^0-9a-fA-F]')
+_STARTTAG_OPEN_RE = re.compile(r'<[a-zA-Z]')
+_STARTTAG_END_RE = re.compile(r"""
+  <[a-zA-Z][^\t\n\r\f />\x00]*       # 标签名
+  (?:[\s/]*                          # 属性名前的空白
+    (?:(?<=['"\s/])[^\s/>][^\s/=>]*  # 属性名
+      (?:\s*=+\s*                    # 等号
+        (?:'[^']*'                   # 单引号属性值
+          |"[^"]*"                   # 双引号属性值
+          |(?!['"])[^>\s]*           # 无引号属性值
+         )
+        \s*
+       )?(?:\s|/(?!>))*
+     )*
+   )?
+  \s*
+""", re.VERBOSE)
+_TAGFIND_RE = re.compile(r'([a-zA-Z][^\t\n\r\f />\x00]*)(?:\s|/(?!>))*')
+_ATTRFIND_RE = re.compile(
+    r'((?<=[\'"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*'
+    r'(\'[^\']*\'|"[^"]*"|(?![\'"])[^>\s]*))?(?:\s|/(?!>))*'
+)
+_COMMENT_CLOSE_RE = re.compile(r'--\s*>')
+_DECLNAME_RE = re.compile(r'[a-zA-Z][-_.a-zA-Z0-9]*\s*')
+# <![CDATA[...]]> 等标记段以 ]]> 结束，MS Office 的 <![if ...]> 以 ]> 结束；其他关键字 html.parser 拒绝解析
+_MARKED_SECTION_CLOSE = dict.fromkeys(('temp', 'cdata', 'ignore', 'include', 'rcdata'),
+                                      re.compile(r']\s*]\s*>'))
+_MARKED_SECTION_CLOSE.update(dict.fromkeys(('if', 'else', 'endif'), re.compile(r']\s*>')))
+# 内容按原始文本处理、直到对应结束标签为止的元素
+_RAWTEXT_END_RE = {
+    'script': re.compile(r'</\s*script\s*>', re.I),
+    'style': re.compile(r'</\s*style\s*>', re.I),
+}
+_ATTR_START_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ=/')
+
+
+class _RejectedMarkup(Exception):
+    """html.parser 拒绝解析的标记（BeautifulSoup 会整篇放弃）"""
+
+
+def _start_tag_end(html_content: str, i: int) -> int:
+    """开始标签的结束位置，标签不完整时返回 -1（html.parser.check_for_whole_start_tag）"""
+    j = _STARTTAG_END_RE.match(html_content, i).end()
+    next_char = html_content[j:j + 1]
+    if next_char == '>':
+        return j + 1
+    if next_char == '/':
+        return j + 2 if html_content.startswith('/>', j) else -1
+    if not next_char or next_char in _ATTR_START_CHARS:
+        return -1
+    return j if j > i else i + 1
+
+
+def _start_tag_attrs(html_content: str, k: int, endpos: int):
+    """解析 [k, endpos) 内的属性，返回 (属性字典, 属性之后的结尾)；结尾不是 > 或 /> 时不算标签"""
+    attrs = {}
+    while k < endpos:
+        m = _ATTRFIND_RE.match(html_content, k)
+        if not m:
+            break
+        name, rest, value = m.group(1, 2, 3)
+        if not rest:
+            value = ''
+        elif value[:1] == "'" == value[-1:] or value[:1] == '"' == value[-1:]:
+            value = value[1:-1]
+        # 重复属性以最后一次出现为准（与 BeautifulSoup 一致）
+        attrs[name.lower()] = unescape(value) if value else value
+        k = m.end()
+    return attrs, html_content[k:endpos].strip()
+
+
+def _markup_end(html_content: str, i: int) -> int:
+    """< 开头的注释、结束标签、声明、处理指令或标记段的结束位置，不完整时返回 -1"""
+    if html_content.startswith('<!--', i):
+        m = _COMMENT_CLOSE_RE.search(html_content, i + 4)
+        return m.end() if m else -1
+    if html_content.startswith('<![', i):
+        m = _DECLNAME_RE.match(html_content, i + 3)
+        if i + 3 == len(html_content) or (m and m.end() == len(html_content)):
+            return -1
+        close_re = _MARKED_SECTION_CLOSE.get(m.group().strip().lower()) if m else None
+        if close_re is None:
+            raise _RejectedMarkup(html_content[i:i + 20])
+        m = close_re.search(html_content, i + 3)
+        return m.end() if m else -1
+    # 结束标签、<!DOCTYPE ...>、<!...> 与 <?...> 都到下一个 > 为止
+    gt = html_content.find('>', i + 2)
+    return gt + 1 if gt >= 0 else -1
+
+
+def _img_attrs_emoji_name(attrs: dict) -> str:
+    """从 <img> 标签属性中取 emoji 名称，不是 emoji 图片时返回空字符串"""
+    classes = attrs.get('class', '')
+    if classes != 'emoji' and 'emoji' not in classes.split():
+        return ''
+    emoji_name = attrs.get('title') or attrs.get('alt')
+    if not emoji_name:
+        return ''
+    emoji_clean = emoji_name.strip(':')
+    return emoji_clean if _EMOJI_NAME_RE.fullmatch(emoji_clean) else ''
+
+
+def _img_emoji_names(html_content: str) -> List[str]:
+    """
+    按 html.parser 的规则扫描标签，返回 <img class="emoji"> 的 emoji 名称
+
+    只有 html.parser 认作开始标签的 <img> 才计入：注释（包括未闭合的注释）、
+    <!DOCTYPE>、CDATA 标记段、<script>/<style> 的内容，以及 <div <img ...>>
+    这种写在其他标签属性里的 <img 都会跳过。html.parser 拒绝解析的标记整篇不计。
+    """
+    names = []
+    n = len(html_content)
+    closing = False  # BeautifulSoup 先 feed 再 close，close 阶段遇到无效的 &# 会停止解析
+    i = 0
+    try:
+        while True:
+            i = _SKIP_RE.match(html_content, i).end()
+            if i == n:
+                break
+
+            if html_content[i] == '&':
+                ref = _CHARREF_RE.match(html_content, i)
+                if ref:
+                    i = ref.end() if html_content[ref.end() - 1] == ';' else ref.end() - 1
+                    continue
+                if closing or html_content.find(';', i) < 0:
+                    break
+                closing = True
+                i += 2
+                continue
+
+            if _STARTTAG_OPEN_RE.match(html_content, i):
+                k = _start_tag_end(html_content, i)
+                if k >= 0:
+                    tag_match = _TAGFIND_RE.match(html_content, i + 1)
+                    tag = tag_match.group(1).lower()
+                    if tag == 'img' or tag in _RAWTEXT_END_RE:
+                        attrs, tag_end = _start_tag_attrs(html_content, tag_match.end(), k)
+                        if tag_end == '>' and tag in _RAWTEXT_END_RE:
+                            end = _RAWTEXT_END_RE[tag].search(html_content, k)
+                            if end is None:
+                                break
+                            k = end.end()
+                        elif tag_end in ('>', '/>') and tag == 'img':
+                            name = _img_attrs_emoji_name(attrs)
+                            if name:
+                                names.append(name)
+            elif html_content.startswith('</', i) or html_content.startswith('<!', i) \
+                    or html_content.startswith('<?', i):
+                k = _markup_end(html_content, i)
+            elif i + 1 < n:
+                k = i + 1
+            else:
+                break
+
+            if k < 0:
+                # 不完整的结构：close 阶段把它到下一个 > 为止的内容当作文本
+                closing = True
+                k = html_content.find('>', i + 1)
+                if k < 0:
+                    k = html_content.find('<', i + 1)
+                    if k < 0:
+                        k = i + 1
+                else:
+                    k += 1
+            i = k
+    except _RejectedMarkup:
+        return []
+    return names
+
+
+def extract_emoji_fast(html_content: str) -> List[str]:
+    """
+    正则扫描提取 emoji（默认引擎）
+
+    Args:
+        html_content: HTML 内容
+
+    Returns:
+        emoji 名称列表（不含冒号）
+    """
+    if not html_content:
+        return []
+
+    # 1. title/alt 属性中的短代码；2. 全文短代码（与 bs4 引擎相同的整篇正则）
+    emojis = [name for _, name in _ATTR_SHORTCODE_RE.findall(html_content) if 2 <= len(name) <= 50]
+    emojis.extend(_SHORTCODE_RE.findall(html_content))
+    # 3. <img class="emoji"> 标签
+    if '<' in html_content:
+        emojis.extend(_img_emoji_names(html_content))
+    return emojis
+
+
+def extract_emoji_bs4(html_content: str) -> List[str]:
+    """
+    正则 + BeautifulSoup 三遍扫描提取 emoji（回退引擎）
+
+    Args:
+        html_content: HTML 内容
+
+    Returns:
+        emoji 名称列表（不含冒号）
+    """
+    emojis = []
+
+    if not html_content:
+        return emojis
+
+    # 1. 从 HTML 标签的 title 或 alt 属性中提取短代码，只保留长度在 2-50 之间的
+    img_emojis = _ATTR_SHORTCODE_RE.findall(html_content)
+    emojis.extend(match[0] for match in img_emojis if 2 <= len(match[1]) <= 50)
+
+    # 2. 直接从文本中严格匹配形如 :lowercase_with_underscores: 的短代码
+    emojis.extend(f':{code}:' for code in _SHORTCODE_RE.findall(html_content))
+
+    # 3. 提取 HTML img 标签中的 emoji（作为补充）
+    try:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+        for img in soup.find_all('img', class_='emoji'):
+            emoji_name = img.get('title') or img.get('alt')
+            if emoji_name:
+                # 去掉冒号，提取 emoji 名称
+                emoji_clean = emoji_name.strip(':')
+                # 严格过滤：只保留小写字母和下划线组成的名称
+                if emoji_clean and _LEGACY_NAME_RE.match(emoji_clean) and 2 <= len(emoji_clean) <= 50:
+                    emojis.append(f':{emoji_clean}:')
+    except Exception:
+        pass  # HTML 解析失败不影响整体
+
+    # 最终统一严格过滤，避免任何非规范内容混入
+    return [e[1:-1] for e in emojis if _FINAL_FILTER_RE.match(e)]
+
+
+EXTRACTORS = {
+    'fast': extract_emoji_fast,
+    'bs4': extract_emoji_bs4,
+}
@@ -0,0 +1,433 @@
+"""
+图形界面模块 - 独立实现
+Tkinter 图形界面（按天选择时间窗口），仅在 --gui 时导入，
+命令行运行不会加载 tkinter / tkcalendar / webbrowser。
+
+分析在后台线程中进行，进度经队列回传、由 root.after 定时轮询刷新界面，
+窗口在获取过程中保持响应，可随时取消，也可连续加入多个用户名排队分析。
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+import webbrowser
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+try:
+    from tkcalendar import DateEntry
+    _tkcalendar_ok = True
+except Exception:
+    _tkcalendar_ok = False
+
+from config import OUTPUT_DIR
+from action_pages import estimate_total_pages, parse_iso_datetime
+from day_index import DayIndex, day_aligned
+from http_utils import CookieManager
+from user_emoji_stats import analyze_from_index, analyze_user_emojis
+
+# 界面轮询事件队列的间隔（毫秒）
+POLL_INTERVAL_MS = 100
+# 计算吞吐量时使用的最近页数（滑动窗口，限速变化后能较快反映）
+RATE_WINDOW_PAGES = 20
+
+
+class AnalysisWorker:
+    """
+    后台分析线程
+    
+    按提交顺序逐个分析用户名；进度、完成与错误以元组事件放入 events 队列，
+    由界面线程读取（后台线程不直接操作 Tk 控件）。
+    """
+
+    def __init__(self):
+        self.events: "queue.Queue[tuple]" = queue.Queue()
+        self._jobs: "queue.Queue[Dict]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = []  # 已提交且未结束的任务（含正在运行的）
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, username: str, max_pages: Optional[int] = None,
+               since: Optional[str] = None, until: Optional[str] = None,
+               use_index: bool = True):
+        """加入分析队列"""
+        job = {'username': username, 'max_pages': max_pages, 'since': since, 'until': until,
+               'use_index': use_index, 'cancel': threading.Event()}
+        with self._lock:
+            self._pending.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._jobs.put(job)
+
+    def pending_usernames(self):
+        """排队中与正在分析的用户名"""
+        with self._lock:
+            return [job['username'] for job in self._pending if not job['cancel'].is_set()]
+
+    def cancel_all(self):
+        """取消正在进行的分析并清空队列"""
+        with self._lock:
+            for job in self._pending:
+                job['cancel'].set()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job['cancel'].is_set():
+                    self.events.put(('cancelled', job['username']))
+                else:
+                    self._run_job(job)
+            except Exception as e:
+                self.events.put(('error', job['username'], str(e)))
+            finally:
+                with self._lock:
+                    self._pending.remove(job)
+                self.events.put(('queue',))
+
+    def _run_job(self, job: Dict):
+        username, since, until = job['username'], job['since'], job['until']
+        if job['use_index']:
+            since_dt = parse_iso_datetime(since) if since else None
+            until_dt = parse_iso_datetime(until) if until else None
+            index = DayIndex.load(username)
+            # 以今天结束的快捷范围晚于索引生成时间：有 Cookie 时先把新回复补进索引
+            update = (index is not None and day_aligned(since_dt, until_dt)
+                      and index.can_update(since_dt) and bool(CookieManager.read_cookie()))
+            if index is not None and (update or index.serves(since_dt, until_dt)):
+                self.events.put(('start', username, None))
+                res = analyze_from_index(username, since=since, until=until,
+                                         update=update, cancel=job['cancel'])
+                if job['cancel'].is_set():
+                    self.events.put(('cancelled', username))
+                    return
+                if res:
+                    self.events.put(('done', username, True, 'index'))
+                    return
+
+        if not CookieManager.read_cookie():
+            self.events.put(('error', username,
+                             "未找到 Cookie，请先配置 cookies.txt 或使用 --set-cookie 运行命令行设置。"))
+            return
+
+        estimate = estimate_total_pages(username)
+        if estimate is not None and job['max_pages']:
+            estimate = min(estimate, job['max_pages'])
+        self.events.put(('start', username, estimate))
+
+        def progress(page: int, fetched: int, total: int):
+            self.events.put(('page', username, page, fetched, total))
+
+        res = analyze_user_emojis(username, max_pages=job['max_pages'], since=since, until=until,
+                                  progress=progress, cancel=job['cancel'])
+        if job['cancel'].is_set():
+            self.events.put(('cancelled', username))
+        else:
+            self.events.put(('done', username, bool(res), 'fetch'))
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(seconds + 0.5)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def run_gui():
+    root = tk.Tk()
+    root.title("Emoji 统计工具")
+    root.geometry("620x500")
+    try:
+        root.tk.call("tk", "scaling", 1.25)
+    except Exception:
+        pass
+
+    style = ttk.Style()
+    try:
+        style.theme_use('clam')
+    except Exception:
+        pass
+    style.configure('TButton', padding=6)
+    style.configure('TLabel', padding=4)
+    style.configure('TEntry', padding=4)
+
+    main = ttk.Frame(root, padding=20)
+    main.pack(fill=tk.BOTH, expand=True)
+
+    # 用户名（可输入多个，以空格或逗号分隔，依次排队分析）
+    ttk.Label(main, text="用户名:").grid(row=0, column=0, sticky=tk.W)
+    username_var = tk.StringVar()
+    username_entry = ttk.Entry(main, textvariable=username_var, width=32)
+    username_entry.grid(row=0, column=1, columnspan=2, sticky=tk.W)
+
+    # since/until（按天，日历选择器优先）容器
+    date_frame = ttk.Frame(main)
+    date_frame.grid(row=1, column=0, columnspan=3, sticky=tk.W)
+
+    ttk.Label(date_frame, text="开始日期:").grid(row=0, column=0, sticky=tk.W)
+    ttk.Label(date_frame, text="结束日期:").grid(row=1, column=0, sticky=tk.W)
+    since_var = tk.StringVar()
+    until_var = tk.StringVar()
+
+    if _tkcalendar_ok:
+        since_picker = DateEntry(date_frame, date_pattern='yyyy-mm-dd', width=14)
+        until_picker = DateEntry(date_frame, date_pattern='yyyy-mm-dd', width=14)
+        since_picker.grid(row=0, column=1, sticky=tk.W)
+        until_picker.grid(row=1, column=1, sticky=tk.W)
+        since_lbl = ttk.Label(date_frame, text="(可留空)")
+        until_lbl = ttk.Label(date_frame, text="(可留空)")
+        since_lbl.grid(row=0, column=2, sticky=tk.W)
+        until_lbl.grid(row=1, column=2, sticky=tk.W)
+    else:
+        since_entry = ttk.Entry(date_frame, textvariable=since_var, width=16)
+        since_entry.grid(row=0, column=1, sticky=tk.W)
+        until_entry = ttk.Entry(date_frame, textvariable=until_var, width=16)
+        until_entry.grid(row=1, column=1, sticky=tk.W)
+        since_lbl = ttk.Label(date_frame, text="YYYY-MM-DD (可留空)")
+        until_lbl = ttk.Label(date_frame, text="YYYY-MM-DD (可留空)")
+        since_lbl.grid(row=0, column=2, sticky=tk.W)
+        until_lbl.grid(row=1, column=2, sticky=tk.W)
+
+    # 窗口范围选择（全部/自定义）
+    mode_var = tk.StringVar(value='all')
+    ttk.Label(main, text="时间范围:").grid(row=3, column=0, sticky=tk.W)
+    r_all = ttk.Radiobutton(main, text="全部", variable=mode_var, value='all')
+    r_custom = ttk.Radiobutton(main, text="自定义", variable=mode_var, value='custom')
+    r_all.grid(row=3, column=1, sticky=tk.W)
+    r_custom.grid(row=3, column=2, sticky=tk.W)
+
+    def update_date_widgets():
+        if mode_var.get() == 'custom':
+            date_frame.grid()
+            if 'quick_frame' in locals():
+                quick_frame.grid()
+        else:
+            date_frame.grid_remove()
+            if 'quick_frame' in locals():
+                quick_frame.grid_remove()
+
+    mode_var.trace_add('write', lambda *args: update_date_widgets())
+    update_date_widgets()
+
+    # 页数限制
+    ttk.Label(main, text="最大页数 (可选):").grid(row=4, column=0, sticky=tk.W)
+    max_pages_var = tk.StringVar()
+    max_pages_entry = ttk.Entry(main, textvariable=max_pages_var, width=8)
+    max_pages_entry.grid(row=4, column=1, sticky=tk.W)
+
+    # 优先使用本地按天索引（已完整统计过的用户，切换时间范围无需重新获取）
+    use_index_var = tk.BooleanVar(value=True)
+
+    # 状态
+    status_var = tk.StringVar(value="准备就绪…")
+    status_label = ttk.Label(main, textvariable=status_var)
+    status_label.grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=(12,0))
+
+    # 进度（页数 / 吞吐量 / 剩余时间）与排队情况
+    progress_bar = ttk.Progressbar(main, mode='determinate', maximum=100)
+    progress_bar.grid(row=7, column=0, columnspan=3, sticky=tk.EW)
+    progress_var = tk.StringVar(value="")
+    ttk.Label(main, textvariable=progress_var).grid(row=8, column=0, columnspan=3, sticky=tk.W)
+    queue_var = tk.StringVar(value="")
+    ttk.Label(main, textvariable=queue_var).grid(row=9, column=0, columnspan=3, sticky=tk.W)
+
+    worker = AnalysisWorker()
+    # 当前用户的进度状态
+    current = {'username': None, 'estimate': None, 'started': 0.0,
+               'times': deque(maxlen=RATE_WINDOW_PAGES)}
+
+    def to_iso_day(day_str: str, end=False):
+        if not day_str:
+            return None
+        try:
+            # 基础校验：YYYY-MM-DD
+            if not re.match(r'^\d{4}-\d{2}-\d{2}$', day_str):
+                messagebox.showwarning("提示", "日期格式应为 YYYY-MM-DD")
+                return None
+            dt = datetime.strptime(day_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            if end:
+                # 结束日设为当天 23:59:59
+                dt = dt.replace(hour=23, minute=59, second=59)
+            return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        except Exception:
+            messagebox.showwarning("提示", "请输入有效的日期")
+            return None
+
+    def on_run():
+        usernames = [u for u in re.split(r'[\s,，]+', username_var.get()) if u]
+        if not usernames:
+            messagebox.showwarning("提示", "请输入用户名（多个用户名以空格或逗号分隔）")
+            return
+
+        if mode_var.get() == 'all':
+            since_iso, until_iso = None, None
+        else:
+            if _tkcalendar_ok:
+                s = since_picker.get_date() if since_picker.get() else None
+                u = until_picker.get_date() if until_picker.get() else None
+                since_iso = to_iso_day(s.strftime('%Y-%m-%d') if s else '', end=False)
+                until_iso = to_iso_day(u.strftime('%Y-%m-%d') if u else '', end=True)
+            else:
+                since_iso = to_iso_day(since_var.get().strip(), end=False)
+                until_iso = to_iso_day(until_var.get().strip(), end=True)
+
+        max_pages = None
+        mp_raw = max_pages_var.get().strip()
+        if mp_raw:
+            if mp_raw.isdigit():
+                max_pages = int(mp_raw)
+            else:
+                messagebox.showwarning("提示", "最大页数应为正整数，将忽略该值")
+
+        for username in usernames:
+            worker.submit(username, max_pages=max_pages, since=since_iso, until=until_iso,
+                          use_index=use_index_var.get())
+        username_var.set("")
+        update_queue_label()
+
+    def on_cancel():
+        if not worker.pending_usernames():
+            return
+        worker.cancel_all()
+        status_var.set("正在取消…")
+
+    def update_queue_label():
+        names = worker.pending_usernames()
+        waiting = [n for n in names if n != current['username']] if current['username'] else names
+        queue_var.set(f"排队中: {', '.join(waiting)}" if waiting else "")
+        cancel_btn.state(['!disabled'] if names else ['disabled'])
+
+    def show_progress(page: int, fetched: int, total: int):
+        now = time.perf_counter()
+        current['times'].append(now)
+        times = current['times']
+        rate = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else None
+
+        estimate = current['estimate']
+        parts = [f"第 {page} 页" + (f" / 约 {estimate} 页" if estimate else ""),
+                 f"窗口内 {total} 条回复"]
+        if rate:
+            parts.append(f"{rate:.1f} 页/秒")
+        if estimate:
+            progress_bar['value'] = min(100.0, page / estimate * 100)
+            if rate and page < estimate:
+                # 估算页数来自发帖总数，带时间窗口时会提前结束，故为上限
+                parts.append(f"预计剩余 ≤ {_format_seconds((estimate - page) / rate)}")
+        parts.append(f"已用 {_format_seconds(now - current['started'])}")
+        progress_var.set(" | ".join(parts))
+
+    def poll_events():
+        try:
+            while True:
+                event = worker.events.get_nowait()
+                kind, args = event[0], event[1:]
+                if kind == 'start':
+                    username, estimate = args
+                    current.update(username=username, estimate=estimate, started=time.perf_counter())
+                    current['times'].clear()
+                    progress_bar.stop()
+                    if estimate:
+                        progress_bar.configure(mode='determinate', value=0)
+                    else:
+                        # 无法估算总页数（或直接查询索引）时只显示忙碌动画
+                        progress_bar.configure(mode='indeterminate')
+                        progress_bar.start(15)
+                    status_var.set(f"正在分析 @{username}…")
+                    progress_var.set("")
+                elif kind == 'page':
+                    show_progress(*args[1:])
+                elif kind == 'done':
+                    username, ok, source = args
+                    progress_bar.stop()
+                    progress_bar.configure(mode='determinate', value=100 if ok else 0)
+                    if not ok:
+                        status_var.set(f"@{username}: 所选时间范围内没有回复")
+                    elif source == 'index':
+                        status_var.set(f"@{username} 完成（来自本地索引）！点击“打开输出目录”查看结果")
+                    else:
+                        status_var.set(f"@{username} 完成！点击“打开输出目录”查看结果")
+                    current['username'] = None
+                elif kind == 'cancelled':
+                    progress_bar.stop()
+                    progress_bar.configure(mode='determinate', value=0)
+                    status_var.set(f"已取消 @{args[0]}")
+                    current['username'] = None
+                elif kind == 'error':
+                    username, message = args
+                    progress_bar.stop()
+                    progress_bar.configure(mode='determinate', value=0)
+                    status_var.set(f"@{username}: 发生错误")
+                    current['username'] = None
+                    messagebox.showerror("错误", f"@{username}: {message}")
+                update_queue_label()
+        except queue.Empty:
+            pass
+        root.after(POLL_INTERVAL_MS, poll_events)
+
+    def on_close():
+        worker.cancel_all()
+        root.destroy()
+
+    def on_open_dir():
+        try:
+            out_dir = os.path.abspath(OUTPUT_DIR)
+            if os.path.exists(out_dir):
+                webbrowser.open(out_dir)
+            else:
+                messagebox.showinfo("提示", "尚未生成输出目录")
+        except Exception as e:
+            messagebox.showerror("错误", str(e))
+
+    # 快捷时间范围按钮
+    quick_frame = ttk.Frame(main)
+    quick_frame.grid(row=4, column=0, columnspan=3, pady=8, sticky=tk.W)
+
+    def quick_range(days: int = None, mode: str = None):
+        from datetime import timedelta
+        now = datetime.now(timezone.utc)
+        if days is not None:
+            start = (now - timedelta(days=days)).date()
+            end = now.date()
+        elif mode == 'month':
+            start = now.replace(day=1).date()
+            end = now.date()
+        elif mode == 'year':
+            start = now.replace(month=1, day=1).date()
+            end = now.date()
+        else:
+            return
+        if _tkcalendar_ok:
+            since_picker.set_date(start)
+            until_picker.set_date(end)
+        else:
+            since_var.set(start.strftime('%Y-%m-%d'))
+            until_var.set(end.strftime('%Y-%m-%d'))
+
+    ttk.Button(quick_frame, text="最近7天", command=lambda: quick_range(days=7)).grid(row=0, column=0, padx=(0,8))
+    ttk.Button(quick_frame, text="最近30天", command=lambda: quick_range(days=30)).grid(row=0, column=1, padx=(0,8))
+    ttk.Button(quick_frame, text="本月", command=lambda: quick_range(mode='month')).grid(row=0, column=2, padx=(0,8))
+    ttk.Button(quick_frame, text="今年", command=lambda: quick_range(mode='year')).grid(row=0, column=3, padx=(0,8))
+
+    # 操作按钮
+    btn_frame = ttk.Frame(main)
+    btn_frame.grid(row=5, column=0, columnspan=3, pady=8, sticky=tk.W)
+    ttk.Button(btn_frame, text="开始分析", command=on_run).grid(row=0, column=0, padx=(0,8))
+    cancel_btn = ttk.Button(btn_frame, text="取消", command=on_cancel)
+    cancel_btn.grid(row=0, column=1, padx=(0,8))
+    cancel_btn.state(['disabled'])
+    ttk.Button(btn_frame, text="打开输出目录", command=on_open_dir).grid(row=0, column=2)
+    ttk.Checkbutton(btn_frame, text="优先使用本地索引", variable=use_index_var).grid(
+        row=0, column=3, padx=(8,0))
+
+    for i in range(3):
+        main.grid_columnconfigure(i, weight=1)
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.after(POLL_INTERVAL_MS, poll_events)
+    root.mainloop()
@@ -0,0 +1,145 @@
+"""
+HTTP 缓存模块 - 独立实现
+在磁盘上保存响应体及其校验器（ETag / Last-Modified）。再次请求同一 URL 时发送
+If-None-Match / If-Modified-Since，服务端返回 304 时直接使用本地副本，不再重新下载整页。
+
+每个 URL 对应一个文件（文件名为 URL 的 SHA-1）：首行为元数据 JSON，其后为 zlib 压缩的响应体。
+写入使用临时文件 + os.replace，并发写入同一 URL 时也不会读到半个文件。
+只缓存带校验器的 200 响应；总大小超过上限时按最近使用时间（文件 mtime）淘汰。
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_MB
+
+# 每写入这么多条后检查一次总大小
+_PRUNE_EVERY = 500
+
+
+class CacheEntry:
+    """一条缓存：校验器、内容类型与压缩后的响应体"""
+
+    def __init__(self, meta: Dict, payload: bytes):
+        self.meta = meta
+        self.payload = payload
+
+    @property
+    def size(self) -> int:
+        """解压后的响应体字节数"""
+        return self.meta.get('size', 0)
+
+    def validators(self) -> Dict[str, str]:
+        """条件请求头"""
+        headers = {}
+        if self.meta.get('etag'):
+            headers['If-None-Match'] = self.meta['etag']
+        if self.meta.get('last_modified'):
+            headers['If-Modified-Since'] = self.meta['last_modified']
+        return headers
+
+    def body(self) -> bytes:
+        return zlib.decompress(self.payload)
+
+
+class HTTPCache:
+    """以 URL 为键的磁盘缓存（线程安全）"""
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_mb: float = HTTP_CACHE_MAX_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._stores = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.prune()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.bin')
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """读取 URL 的缓存，不存在或损坏时返回 None"""
+        try:
+            with open(self._path(url), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        head, sep, payload = data.partition(b'\n')
+        if not sep:
+            return None
+        try:
+            meta = json.loads(head)
+        except ValueError:
+            return None
+        if meta.get('url') != url:
+            return None
+        return CacheEntry(meta, payload)
+
+    def store(self, url: str, headers, body: bytes) -> bool:
+        """
+        保存 200 响应（headers 为响应头映射）
+
+        Returns:
+            是否已保存（没有 ETag / Last-Modified 的响应无法做条件请求，不保存）
+        """
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': headers.get('Content-Type'),
+            'size': len(body),
+            'stored_at': time.time(),
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+                f.write(b'\n')
+                f.write(zlib.compress(body, 1))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"写入 HTTP 缓存失败: {e}")
+            return False
+
+        with self._lock:
+            self._stores += 1
+            prune = self._stores % _PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return True
+
+    def touch(self, url: str):
+        """304 命中后更新最近使用时间"""
+        try:
+            os.utime(self._path(url))
+        except OSError:
+            pass
+
+    def prune(self):
+        """总大小超过上限时，按最近使用时间从旧到新删除，直到降到上限的 90%"""
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith('.bin')]
+            stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in stats)
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(stats):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -1,14 +1,28 @@
 """
 HTTP 工具模块 - 独立实现
 提供 HTTP 请求和 Cookie 管理功能
+
+requests / urllib3 在创建 HTTPClient 时才导入，--set-cookie 等不联网的路径不承担其导入开销。
+请求显式协商压缩传输（gzip/deflate，安装 brotli 后加上 br），并可带磁盘缓存（见 http_cache）发送条件请求；
+stats() 中记录实际下载、解压后与 304 省去的字节数。
 """
 
 import os
-import requests
-from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
-from typing import Optional
-from config import COOKIE_FILE, USER_AGENT
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Optional
+from config import (COOKIE_FILE, USER_AGENT, RATE_LIMIT_MIN_RPS,
+                    RATE_LIMIT_MAX_RPS, RATE_LIMIT_GROWTH, THROTTLE_MAX_RETRIES,
+                    THROTTLE_BACKOFF, HTTP_CACHE_ENABLED)
+import profiling
+
+if TYPE_CHECKING:
+    import requests
+    from http_cache import CacheEntry, HTTPCache
+
+# 表示服务端限流、需要退避重试的状态码
+THROTTLE_STATUS = (429, 503)
 
 
 class CookieManager:
@@ -37,35 +51,197 @@ class CookieManager:
             print(f"保存 Cookie 失败: {e}")
 
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期），无法解析返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    自适应令牌桶限速器（线程安全）
+    
+    - 收到第一个限流响应之前不限速，请求速率只受并发数约束
+    - acquire() 阻塞直到拿到令牌（限速状态下）或暂停结束，返回拿到令牌的时刻
+    - 遇到限流时速率减半（首次限流时以最近一秒的实际请求数为基准），
+      并在 Retry-After 指定的时间内暂停所有请求；同一次限流中并发请求陆续返回的
+      429（令牌早于上次降速时拿到）只延长暂停，不重复降速
+    - 连续健康响应约一秒的量后，速率乘以 RATE_LIMIT_GROWTH，但不超过上限：
+      上限为被限流之前最后一个验证过健康的速率，不会回到不限速状态
+    """
+    
+    def __init__(self, min_rate: float = RATE_LIMIT_MIN_RPS,
+                 max_rate: float = RATE_LIMIT_MAX_RPS,
+                 growth: float = RATE_LIMIT_GROWTH):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.growth = max(1.0, growth)
+        self.limited = False
+        self.rate = self.max_rate
+        self.ceiling = self.max_rate
+        self._safe_rate = 0.0      # 最近一个完整健康周期的速率
+        self._last_reduction = float('-inf')
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._healthy_streak = 0
+        self._recent = deque()  # 最近一秒内发出请求的时间
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """阻塞直到可以发出下一个请求，返回拿到令牌的时刻（传给 on_throttle）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif not self.limited:
+                    self._recent.append(now)
+                    while self._recent[0] < now - 1.0:
+                        self._recent.popleft()
+                    return now
+                else:
+                    # 桶容量为 1 秒的请求量，避免空闲后瞬间突发
+                    capacity = max(1.0, self.rate)
+                    self._tokens = min(capacity, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        return now
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def on_throttle(self, delay: float, acquired_at: Optional[float] = None):
+        """
+        收到限流响应：暂停 delay 秒；请求在上次降速之后发出时速率减半
+        
+        Args:
+            delay: 暂停秒数
+            acquired_at: 该请求 acquire() 的返回值；None 时总是降速
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + delay)
+            self._tokens = 0.0
+            self._last = now
+            if acquired_at is not None and acquired_at < self._last_reduction:
+                return
+            if not self.limited:
+                self.limited = True
+                self.rate = min(self.max_rate, max(1.0, len(self._recent)))
+                self._recent.clear()
+            throttled_rate = self.rate
+            self.rate = max(self.min_rate, self.rate / 2)
+            # 之后最多提速到被限流前最后一个健康的速率；还没有验证过健康的速率时
+            # （如首次限流），取被限流速率的下一级（除以增长倍数）
+            if 0 < self._safe_rate < throttled_rate:
+                self.ceiling = self._safe_rate
+            else:
+                self.ceiling = max(self.rate, throttled_rate / self.growth)
+            self._safe_rate = 0.0
+            self._healthy_streak = 0
+            self._last_reduction = now
+    
+    def on_success(self):
+        """收到健康响应：限速状态下累计到约一秒的请求量后提速（不超过上限）"""
+        with self._lock:
+            if not self.limited:
+                return
+            self._healthy_streak += 1
+            if self._healthy_streak >= max(1, int(self.rate)):
+                self._healthy_streak = 0
+                self._safe_rate = self.rate
+                self.rate = min(self.ceiling, self.rate * self.growth)
+    
+    def current_rate(self) -> Optional[float]:
+        """当前限速（请求/秒），未限速时为 None"""
+        with self._lock:
+            return round(self.rate, 2) if self.limited else None
+
+
 class HTTPClient:
     """HTTP 客户端 - 带重试和 Session 管理"""
     
-    def __init__(self):
+    def __init__(self, pool_size: int = 10,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 cache: Optional["HTTPCache"] = None):
         self.session = None
+        self.pool_size = max(1, pool_size)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.cache = cache
+        self._stats = {'requests': 0, 'throttled': 0, 'retries': 0, 'not_modified': 0,
+                       'bytes_wire': 0, 'bytes_body': 0, 'bytes_saved': 0}
+        self._stats_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
         self._init_session()
     
     def _init_session(self):
         """初始化 Session"""
+        import requests
+        from urllib3.util.request import ACCEPT_ENCODING
+        
         self.session = requests.Session()
+        # 显式声明可解码的压缩格式（urllib3 按已安装的 brotli / zstandard 生成）
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
         
         # 禁用代理（避免代理导致的连接问题）
         self.session.trust_env = False
         
-        # 配置重试策略
+        adapter = self._make_adapter()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
+    def _make_adapter(self) -> "requests.adapters.HTTPAdapter":
+        """按当前连接池大小创建适配器"""
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # 配置重试策略（429/503 由限速器按 Retry-After 处理）
         retry_strategy = Retry(
             total=3,
             backoff_factor=0.5,
-            status_forcelist=[429, 500, 502, 503, 504]
+            status_forcelist=[500, 502, 504],
+            respect_retry_after_header=False
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # 连接池大小与并发数保持一致，避免并发请求时连接被丢弃重建
+        return HTTPAdapter(max_retries=retry_strategy,
+                           pool_connections=self.pool_size,
+                           pool_maxsize=self.pool_size)
+    
+    def ensure_pool_size(self, pool_size: int):
+        """
+        确保连接池不小于指定大小，不足时换用更大的适配器
         
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+        Session 与旧适配器都不关闭：其他线程进行中的请求继续使用旧适配器的连接，
+        之后的请求改用新适配器，旧适配器在不再被引用后回收。
+        """
+        with self._pool_lock:
+            if pool_size <= self.pool_size:
+                return
+            self.pool_size = pool_size
+            adapter = self._make_adapter()
+            # 直接替换已有前缀的值而不用 Session.mount：mount 会调整前缀顺序，
+            # 与其他线程中 get_adapter 的遍历冲突
+            for prefix in ("http://", "https://"):
+                self.session.adapters[prefix] = adapter
     
-    def get(self, url: str, use_cookie: bool = True) -> Optional[requests.Response]:
+    def get(self, url: str, use_cookie: bool = True) -> Optional["requests.Response"]:
         """
         发送 GET 请求
         
+        带缓存时附加条件请求头；服务端返回 304 时以本地副本构造 200 响应（响应头 X-Cache: revalidated）。
+        
         Args:
             url: 请求 URL
             use_cookie: 是否使用 Cookie
@@ -80,8 +256,24 @@ class HTTPClient:
             if cookie:
                 headers['Cookie'] = cookie
         
+        import requests
+        
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        if entry is not None:
+            headers.update(entry.validators())
+        
         try:
-            response = self.session.get(url, headers=headers, timeout=30)
+            response = self._get_with_backoff(url, headers)
+            self._count_transfer(response)
+            if self.cache is None:
+                return response
+            if response.status_code == 304 and entry is not None:
+                self._count('not_modified')
+                self._count('bytes_saved', entry.size)
+                self.cache.touch(url)
+                return self._from_cache(entry, response)
+            if response.status_code == 200:
+                self.cache.store(url, response.headers, response.content)
             return response
         except requests.exceptions.ProxyError as e:
             print(f"\n❌ 代理错误: {e}")
@@ -108,20 +300,130 @@ class HTTPClient:
             print("💡 请检查网络连接\n")
             return None
     
+    def _get_with_backoff(self, url: str, headers: Dict) -> "requests.Response":
+        """经限速器发送请求，遇到 429/503 时按 Retry-After 或指数退避重试"""
+        for attempt in range(THROTTLE_MAX_RETRIES + 1):
+            with profiling.stage('rate_limit_wait'):
+                acquired_at = self.rate_limiter.acquire()
+            self._count('requests')
+            response = self.session.get(url, headers=headers, timeout=30)
+            if response.status_code not in THROTTLE_STATUS:
+                self.rate_limiter.on_success()
+                return response
+            
+            self._count('throttled')
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+            if delay is None:
+                delay = THROTTLE_BACKOFF * (2 ** attempt)
+            self.rate_limiter.on_throttle(delay, acquired_at)
+            if attempt < THROTTLE_MAX_RETRIES:
+                self._count('retries')
+                print(f"服务器限流 ({response.status_code})，{delay:.1f} 秒后重试，"
+                      f"当前限速 {self.rate_limiter.current_rate()} 请求/秒")
+        return response
+    
+    def _count_transfer(self, response: "requests.Response"):
+        """记录实际下载（压缩后）与解压后的字节数"""
+        body = len(response.content)
+        wire = None
+        try:
+            wire = response.raw.tell()
+        except Exception:
+            pass
+        if not wire:
+            wire = int(response.headers.get('Content-Length') or body)
+        with self._stats_lock:
+            self._stats['bytes_wire'] += wire
+            self._stats['bytes_body'] += body
+    
+    @staticmethod
+    def _from_cache(entry: "CacheEntry", revalidation: "requests.Response") -> "requests.Response":
+        """以缓存的响应体构造 200 响应"""
+        import requests
+        
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response._content = entry.body()
+        response.url = revalidation.url
+        response.request = revalidation.request
+        response.headers = requests.structures.CaseInsensitiveDict(revalidation.headers)
+        if entry.meta.get('content_type'):
+            response.headers['Content-Type'] = entry.meta['content_type']
+        response.headers.pop('Content-Encoding', None)
+        response.headers['Content-Length'] = str(len(response._content))
+        response.headers['X-Cache'] = 'revalidated'
+        return response
+    
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+    
+    def stats(self) -> Dict:
+        """
+        请求计数：requests（实际发出）、throttled（被限流）、retries（重试）、not_modified（304 命中），
+        字节数：bytes_wire（实际下载）、bytes_body（解压后）、bytes_saved（304 省去的响应体），及当前限速
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['rate'] = self.rate_limiter.current_rate()
+        return stats
+    
     def close(self):
         """关闭 Session"""
         if self.session:
             self.session.close()
 
 
+def format_bytes(n: float) -> str:
+    """字节数的可读形式"""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
 # 全局 HTTP 客户端实例
 _http_client = None
+_http_client_lock = threading.Lock()
+# 全局客户端是否使用磁盘缓存（命令行 --no-http-cache 可关闭）
+_cache_enabled = HTTP_CACHE_ENABLED
 
 
-def get_http_client() -> HTTPClient:
-    """获取全局 HTTP 客户端实例"""
+def set_http_cache_enabled(enabled: bool):
+    """开启或关闭全局客户端的条件请求缓存（对已创建的客户端同样生效）"""
+    global _cache_enabled
+    _cache_enabled = enabled
+    if _http_client is not None:
+        _http_client.cache = _open_cache() if enabled else None
+
+
+def _open_cache() -> Optional["HTTPCache"]:
+    from http_cache import HTTPCache
+    
+    try:
+        return HTTPCache()
+    except OSError as e:
+        print(f"无法打开 HTTP 缓存目录，不使用缓存: {e}")
+        return None
+
+
+def get_http_client(pool_size: Optional[int] = None) -> HTTPClient:
+    """
+    获取全局 HTTP 客户端实例
+    
+    Args:
+        pool_size: 所需的连接池大小（通常等于并发数），None 表示使用默认值
+    """
     global _http_client
     if _http_client is None:
-        _http_client = HTTPClient()
+        with _http_client_lock:
+            if _http_client is None:
+                cache = _open_cache() if _cache_enabled else None
+                _http_client = HTTPClient(max(pool_size or 0, 10), cache=cache)
+                return _http_client
+    if pool_size:
+        _http_client.ensure_pool_size(pool_size)
     return _http_client
 
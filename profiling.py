@@ -0,0 +1,188 @@
+"""
+性能剖析模块 - 独立实现
+分阶段计时（HTTP、JSON 解码、emoji 提取、聚合、图表、文件写入）与计数器（请求数、字节数、帖子数、emoji 数），
+通过 --profile 开启后输出摘要并写入 JSON；未开启时各埋点只是一次属性判断，几乎没有开销。
+
+可选的深度模式：
+- cprofile: 记录函数级热点（按累计耗时排序）
+- tracemalloc: 记录内存分配峰值与分配最多的代码行
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+PROFILE_MODES = ("timers", "cprofile", "tracemalloc")
+# 深度模式摘要中显示的条目数
+_TOP_N = 25
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class Profiler:
+    """阶段计时器与计数器（线程安全）"""
+
+    def __init__(self):
+        self.enabled = False
+        self.mode = "timers"
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}  # 名称 -> [调用次数, 累计秒数]
+        self._counters: Dict[str, int] = {}
+        self._started_at: Optional[float] = None
+        self._cprofile = None
+        self._hotspots: List[Dict] = []
+        self._allocations: Dict = {}
+
+    def start(self, mode: str = "timers"):
+        """开始剖析"""
+        self.enabled = True
+        self.mode = mode
+        self._started_at = time.perf_counter()
+        if mode == "cprofile":
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        elif mode == "tracemalloc":
+            import tracemalloc
+
+            tracemalloc.start(10)
+
+    def stop(self):
+        """结束剖析并收集深度模式的结果"""
+        if not self.enabled:
+            return
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._hotspots = self._collect_hotspots(self._cprofile)
+            self._cprofile = None
+        if self.mode == "tracemalloc":
+            import tracemalloc
+
+            if tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                top = snapshot.statistics("lineno")[:_TOP_N]
+                self._allocations = {
+                    "current_mb": round(current / 1024 / 1024, 2),
+                    "peak_mb": round(peak / 1024 / 1024, 2),
+                    "top": [{"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                             "size_kb": round(s.size / 1024, 1), "count": s.count} for s in top],
+                }
+        self.enabled = False
+
+    @staticmethod
+    def _collect_hotspots(profile) -> List[Dict]:
+        import pstats
+
+        stats = pstats.Stats(profile)
+        rows = []
+        for (filename, lineno, func), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({"function": f"{os.path.basename(filename)}:{lineno}({func})",
+                         "calls": nc, "self_s": round(tt, 4), "cumulative_s": round(ct, 4)})
+        rows.sort(key=lambda r: r["cumulative_s"], reverse=True)
+        return rows[:_TOP_N]
+
+    def stage(self, name: str):
+        """阶段计时上下文；未开启时返回空上下文"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                record = self._stages.setdefault(name, [0, 0.0])
+                record[0] += 1
+                record[1] += elapsed
+
+    def count(self, name: str, n: int = 1):
+        """累加计数器"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def report(self) -> Dict:
+        """剖析结果（可直接写为 JSON）"""
+        wall = time.perf_counter() - self._started_at if self._started_at else 0.0
+        with self._lock:
+            stages = {name: {"calls": calls, "seconds": round(total, 4),
+                             "share": round(total / wall, 4) if wall else None}
+                      for name, (calls, total) in sorted(self._stages.items(),
+                                                         key=lambda item: item[1][1], reverse=True)}
+            counters = dict(self._counters)
+        report = {
+            "mode": self.mode,
+            "finished_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "wall_seconds": round(wall, 4),
+            "stages": stages,
+            "counters": counters,
+        }
+        if self._hotspots:
+            report["hotspots"] = self._hotspots
+        if self._allocations:
+            report["allocations"] = self._allocations
+        return report
+
+    def print_summary(self, report: Optional[Dict] = None):
+        """打印剖析摘要"""
+        report = report or self.report()
+        print("\n" + "=" * 60)
+        print(f"性能剖析（总耗时 {report['wall_seconds']:.3f}s）")
+        print("=" * 60)
+        print("阶段耗时（多线程下为各线程累计，嵌套阶段互相包含）:")
+        for name, stage in report["stages"].items():
+            share = f"{stage['share'] * 100:6.1f}%" if stage["share"] is not None else ""
+            print(f"  {name:<16} {stage['seconds']:9.3f}s {share}  ({stage['calls']} 次)")
+        if report["counters"]:
+            print("计数:")
+            for name, value in report["counters"].items():
+                print(f"  {name:<16} {value}")
+        if report.get("hotspots"):
+            print("热点函数（按累计耗时）:")
+            for row in report["hotspots"][:10]:
+                print(f"  {row['cumulative_s']:8.3f}s {row['self_s']:8.3f}s {row['calls']:>8}  {row['function']}")
+        if report.get("allocations"):
+            alloc = report["allocations"]
+            print(f"内存分配: 峰值 {alloc['peak_mb']} MB，结束时 {alloc['current_mb']} MB")
+            for row in alloc["top"][:10]:
+                print(f"  {row['size_kb']:10.1f} KB {row['count']:>8}  {row['where']}")
+        print("=" * 60)
+
+    def dump(self, path: str, report: Optional[Dict] = None) -> str:
+        """写入 JSON 文件"""
+        report = report or self.report()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
+
+
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    """获取全局剖析器"""
+    return _profiler
+
+
+def stage(name: str):
+    """全局剖析器的阶段计时上下文"""
+    return _profiler.stage(name)
+
+
+def count(name: str, n: int = 1):
+    """全局剖析器的计数"""
+    if _profiler.enabled:
+        _profiler.count(name, n)
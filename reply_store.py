@@ -0,0 +1,148 @@
+"""
+本地回复库模块 - 独立实现
+使用 SQLite 持久化用户回复，支持增量刷新
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from config import REPLY_STORE_PATH
+
+# 从 user_actions 中实际用到的字段
+REPLY_FIELDS = ('post_id', 'created_at', 'topic_id', 'title', 'cooked', 'excerpt')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS replies (
+    username   TEXT    NOT NULL,
+    post_id    INTEGER NOT NULL,
+    created_at TEXT,
+    created_ts REAL,
+    topic_id   INTEGER,
+    title      TEXT,
+    cooked     TEXT,
+    excerpt    TEXT,
+    PRIMARY KEY (username, post_id)
+);
+CREATE INDEX IF NOT EXISTS idx_replies_user_time ON replies (username, created_ts);
+CREATE TABLE IF NOT EXISTS sync_state (
+    username   TEXT    PRIMARY KEY,
+    complete   INTEGER NOT NULL,
+    updated_at TEXT
+);
+"""
+
+
+def _to_timestamp(dt: Optional[datetime]) -> Optional[float]:
+    return dt.timestamp() if dt else None
+
+
+class ReplyStore:
+    """用户回复本地库（以 用户名 + post_id 为主键）"""
+
+    def __init__(self, path: str = REPLY_STORE_PATH):
+        self.path = path
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def known_post_ids(self, username: str) -> Set[int]:
+        """获取某用户已存储的全部 post_id"""
+        rows = self.conn.execute(
+            "SELECT post_id FROM replies WHERE username = ?", (username,))
+        return {row[0] for row in rows}
+
+    def is_complete(self, username: str) -> bool:
+        """
+        某用户已存储的历史是否连续完整（最新一条到最早的回复之间没有缺口）
+
+        没有记录（从未获取，或由旧版本写入）时视为不完整。
+        """
+        row = self.conn.execute(
+            "SELECT complete FROM sync_state WHERE username = ?", (username,)).fetchone()
+        return bool(row and row[0])
+
+    def set_complete(self, username: str, complete: bool):
+        """记录某用户已存储的历史是否连续完整"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (username, complete, updated_at) VALUES (?, ?, ?)",
+                (username, int(complete), datetime.now().isoformat(timespec='seconds')))
+
+    def count(self, username: str) -> int:
+        """获取某用户已存储的回复数"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM replies WHERE username = ?", (username,)).fetchone()
+        return row[0]
+
+    def add_replies(self, username: str, replies: Iterable[Dict],
+                    parse_time=None) -> int:
+        """
+        写入回复（已存在的 post_id 会被覆盖）
+
+        Args:
+            username: 用户名
+            replies: user_actions 条目
+            parse_time: created_at 字符串 -> datetime 的解析函数
+
+        Returns:
+            写入条数
+        """
+        rows = []
+        for reply in replies:
+            post_id = reply.get('post_id')
+            if post_id is None:
+                continue
+            created_at = reply.get('created_at')
+            created_dt = parse_time(created_at) if (parse_time and created_at) else None
+            rows.append((username, post_id, created_at, _to_timestamp(created_dt),
+                         reply.get('topic_id'), reply.get('title'),
+                         reply.get('cooked'), reply.get('excerpt')))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO replies "
+                "(username, post_id, created_at, created_ts, topic_id, title, cooked, excerpt) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def iter_replies(self, username: str,
+                     since_dt: Optional[datetime] = None,
+                     until_dt: Optional[datetime] = None) -> Iterator[Dict]:
+        """
+        逐条读取某用户的回复（按时间从新到旧）
+
+        时间无法解析的记录始终保留，与在线获取时的窗口过滤规则一致。
+        """
+        sql = "SELECT " + ", ".join(REPLY_FIELDS) + " FROM replies WHERE username = ?"
+        params: list = [username]
+        if since_dt:
+            sql += " AND (created_ts IS NULL OR created_ts >= ?)"
+            params.append(_to_timestamp(since_dt))
+        if until_dt:
+            sql += " AND (created_ts IS NULL OR created_ts <= ?)"
+            params.append(_to_timestamp(until_dt))
+        sql += " ORDER BY created_ts DESC, post_id DESC"
+        for row in self.conn.execute(sql, params):
+            yield dict(row)
+
+    def load_replies(self, username: str,
+                     since_dt: Optional[datetime] = None,
+                     until_dt: Optional[datetime] = None) -> List[Dict]:
+        """读取某用户的回复列表（参数同 iter_replies）"""
+        return list(self.iter_replies(username, since_dt, until_dt))
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,459 @@
+"""
+抽样估计模块 - 独立实现
+-p 只看最近几页，对发言十年的老账号严重偏向近期。抽样模式在窗口内的全部历史页上做分层随机抽样，
+用固定且很少的请求数给出带置信区间的近似统计：
+
+1. 探测页码范围：按发帖数估算末页，从估算值开始二分查找首个空页（约 log2(页数) 次请求）；
+   指定 --until / --since 时分别定位窗口的首页与末页
+2. 把 [首页, 末页] 等分为 SAMPLE_PAGES / 2 层（每层是一段连续的时间），每层随机抽 2 页
+3. 每个样本页单独统计回复数、含 emoji 的回复数、emoji 总数与各 emoji 次数，用分层估计量外推到全部页面：
+   总量 = Σ N_h · 层均值，方差 = Σ N_h² · (1 - n_h/N_h) · s_h² / n_h
+4. 使用率与各 emoji 占比为比率估计，方差按线性化残差 y - R·x 计算；置信区间取 t 分布分位数
+   （自由度 = 样本页数 - 层数，每层 2 页时用正态分位数会明显偏窄），次数区间的下限不低于样本中实际观察到的次数
+
+窗口内总页数不超过抽样页数时直接获取全部页面，区间退化为精确值。
+样本中没有出现的稀有 emoji 无法估计，不同 emoji 种类数只是下限。
+"""
+
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import (ITEMS_PER_PAGE, FETCH_CONCURRENCY, OUTPUT_DIR, SAMPLE_PAGES,
+                    SAMPLE_CONFIDENCE, SAMPLE_TOP_N)
+from action_pages import (estimate_total_pages, fetch_actions_page, parse_iso_datetime,
+                          safe_filename, search_first_page, seek_until_page, window_suffix)
+from http_utils import get_http_client
+import profiling
+from user_emoji_stats import EmojiAggregator, result_subject
+
+# 每层抽取的页数（至少 2 页才能估计层内方差）
+PAGES_PER_STRATUM = 2
+
+
+def probe_page_range(username: str, since_dt: Optional[datetime] = None,
+                     until_dt: Optional[datetime] = None) -> Optional[Tuple[int, int]]:
+    """
+    确定时间窗口覆盖的页码范围
+
+    Returns:
+        (首页, 末页)，窗口内没有回复时末页小于首页；探测失败返回 None
+    """
+    estimate = estimate_total_pages(username)
+    first = seek_until_page(username, until_dt, estimate) if until_dt else 1
+
+    def past_window(user_actions: List[Dict]) -> bool:
+        if since_dt is None:
+            return False  # 只有空页满足，即查找总页数
+        times = [parse_iso_datetime(ua['created_at']) for ua in user_actions if ua.get('created_at')]
+        times = [t for t in times if t]
+        # 无法解析时间时保守地视为仍在窗口内
+        return bool(times) and max(times) < since_dt
+
+    end, probes = search_first_page(username, past_window, hint=estimate + 1 if estimate else None)
+    if end is None:
+        print("探测总页数失败")
+        return None
+    print(f"探测到窗口末页为第 {end - 1} 页（探测 {probes} 次请求）")
+    return first, end - 1
+
+
+def stratify(first: int, last: int, sample_pages: int,
+             rng: random.Random) -> Tuple[List[int], List[Tuple[int, int]]]:
+    """
+    把 [first, last] 等分为连续的层，每层随机抽 PAGES_PER_STRATUM 页
+
+    总页数不超过 sample_pages 时只有一层且全部抽中。
+
+    Returns:
+        (各层页数, [(页码, 层号)])
+    """
+    total = last - first + 1
+    if total <= sample_pages:
+        return [total], [(page, 0) for page in range(first, last + 1)]
+    strata = max(1, sample_pages // PAGES_PER_STRATUM)
+    bounds = [first + total * h // strata for h in range(strata + 1)]
+    sizes: List[int] = []
+    picks: List[Tuple[int, int]] = []
+    for h in range(strata):
+        lo, hi = bounds[h], bounds[h + 1]
+        sizes.append(hi - lo)
+        picks.extend((page, h) for page in sorted(rng.sample(range(lo, hi), PAGES_PER_STRATUM)))
+    return sizes, picks
+
+
+def fetch_pages(username: str, pages: Sequence[int],
+                concurrency: Optional[int] = None) -> Dict[int, Optional[List[Dict]]]:
+    """并发获取指定页码，失败的页为 None"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    concurrency = max(1, concurrency or FETCH_CONCURRENCY)
+    http_client = get_http_client(pool_size=concurrency)
+
+    def fetch(page: int) -> Optional[List[Dict]]:
+        return fetch_actions_page(http_client, username, (page - 1) * ITEMS_PER_PAGE)
+
+    results: Dict[int, Optional[List[Dict]]] = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for page, user_actions in zip(pages, executor.map(fetch, pages)):
+            results[page] = user_actions
+            print(f"已获取 {len(results)} / {len(pages)} 个样本页", end='\r', flush=True)
+    print()
+    return results
+
+
+def _page_counts(user_actions: List[Dict], since_dt: Optional[datetime],
+                 until_dt: Optional[datetime]) -> Tuple[int, int, List[Tuple[str, int]]]:
+    """单个样本页的 (窗口内回复数, 含 emoji 的回复数, [(emoji, 次数)])"""
+    aggregator = EmojiAggregator(since_dt, until_dt, workers=1)
+    aggregator.add_replies(user_actions)
+    frequency = aggregator.emoji_frequency()
+    return aggregator.total_replies, aggregator.replies_with_emoji, frequency
+
+
+def stratified_totals(values, strata, sizes):
+    """
+    分层随机抽样下各列总量的估计与方差
+
+    Args:
+        values: (样本页数, 列数) 每个样本页的观测值
+        strata: 每个样本页所属的层号
+        sizes: 各层的总页数
+
+    只抽中（成功获取）一页的层借用其余层的平均层内方差；没有样本页的层按页数比例由其余层代表。
+
+    Returns:
+        (总量估计, 方差估计)，均为长度等于列数的数组
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    strata = np.asarray(strata, dtype=np.int64)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    n_h = np.bincount(strata, minlength=len(sizes)).astype(np.float64)
+    covered = n_h > 0
+    weights = np.where(covered, sizes * sizes.sum() / sizes[covered].sum(), 0.0)
+
+    sums = np.zeros((len(sizes), values.shape[1]))
+    np.add.at(sums, strata, values)
+    means = sums / np.maximum(n_h, 1)[:, None]
+    squares = np.zeros_like(sums)
+    np.add.at(squares, strata, (values - means[strata]) ** 2)
+
+    multi = n_h >= 2
+    s2 = np.zeros_like(sums)
+    s2[multi] = squares[multi] / (n_h[multi] - 1)[:, None]
+    single = covered & ~multi
+    if single.any():
+        if multi.any():
+            s2[single] = s2[multi].mean(axis=0)
+        elif len(values) >= 2:
+            s2[single] = values.var(axis=0, ddof=1)
+
+    fpc = np.where(covered, 1 - n_h / sizes, 0.0)
+    totals = (weights[:, None] * means).sum(axis=0)
+    variances = ((weights ** 2 * fpc / np.maximum(n_h, 1))[:, None] * s2).sum(axis=0)
+    return totals, np.maximum(variances, 0.0)
+
+
+def t_quantile(p: float, df: int) -> float:
+    """Student t 分布的 p 分位数（df <= 2 用解析式，其余用 Cornish-Fisher 展开，误差约 1e-4）"""
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def _count_interval(estimate: float, variance: float, observed: int, z: float) -> List[int]:
+    half = z * math.sqrt(variance)
+    # 取整前先舍去浮点误差，全部获取时区间恰好等于精确值
+    return [max(observed, math.floor(round(estimate - half, 6))), math.ceil(round(estimate + half, 6))]
+
+
+def _rate_interval(estimate: float, variance: float, z: float) -> List[float]:
+    half = z * math.sqrt(variance)
+    return [max(0.0, estimate - half), min(1.0, estimate + half)]
+
+
+def estimate_from_sample(rows: List[Tuple[int, int, List[Tuple[str, int]]]], strata: Sequence[int],
+                         sizes: Sequence[int], confidence: float = SAMPLE_CONFIDENCE,
+                         top_n: int = SAMPLE_TOP_N) -> Dict:
+    """
+    由样本页的计数估计全部页面的统计量及置信区间
+
+    Args:
+        rows: 每个样本页的 (窗口内回复数, 含 emoji 的回复数, [(emoji, 次数)])
+        strata / sizes: 样本页所属的层号与各层总页数（见 stratify）
+
+    Returns:
+        估计结果字典；emoji_estimates 按估计次数降序，前 top_n 项带 ahead_of_next
+        （与下一名的差值区间是否在 0 以上，即名次是否可靠）
+    """
+    import numpy as np
+
+    sample_counts: Counter = Counter()
+    for _, _, frequency in rows:
+        for emoji, count in frequency:
+            sample_counts[emoji] += count
+    emojis = [emoji for emoji, _ in sample_counts.most_common()]
+    column = {emoji: i for i, emoji in enumerate(emojis)}
+
+    # 列：回复数、含 emoji 的回复数、emoji 总数、各 emoji 次数
+    y = np.zeros((len(rows), 3 + len(emojis)))
+    for i, (replies, with_emoji, frequency) in enumerate(rows):
+        y[i, 0], y[i, 1] = replies, with_emoji
+        for emoji, count in frequency:
+            y[i, 3 + column[emoji]] = count
+    y[:, 2] = y[:, 3:].sum(axis=1)
+    totals, variances = stratified_totals(y, strata, sizes)
+    replies_hat, with_emoji_hat, emojis_hat = totals[:3]
+    counts = totals[3:]
+
+    rate = with_emoji_hat / replies_hat if replies_hat else 0.0
+    shares = counts / emojis_hat if emojis_hat else np.zeros(len(emojis))
+    order = np.argsort(-counts, kind='stable')
+    ranked = order[:top_n + 1]
+
+    # 比率估计量的方差 ≈ 线性化残差总量的方差 / 分母总量²；相邻名次的次数差是线性量，直接估计
+    residuals = np.column_stack([
+        y[:, 1] - rate * y[:, 0],
+        y[:, 3:] - shares * y[:, [2]],
+        y[:, 3 + ranked[:-1]] - y[:, 3 + ranked[1:]],
+    ])
+    _, residual_var = stratified_totals(residuals, strata, sizes)
+    rate_var = residual_var[0] / replies_hat ** 2 if replies_hat else 0.0
+    share_var = residual_var[1:1 + len(emojis)] / emojis_hat ** 2 if emojis_hat else np.zeros(len(emojis))
+    diff_var = residual_var[1 + len(emojis):]
+
+    df = max(1, len(rows) - len(set(strata)))
+    z = t_quantile(0.5 + confidence / 2, df)
+    sample_replies = int(y[:, 0].sum())
+    sample_with_emoji = int(y[:, 1].sum())
+    sample_emojis = int(y[:, 2].sum())
+
+    estimates = []
+    for rank, k in enumerate(order):
+        share_ci = _rate_interval(shares[k], share_var[k], z)
+        entry = {
+            'emoji': emojis[k],
+            'count': int(round(counts[k])),
+            'count_ci': _count_interval(counts[k], variances[3 + k], sample_counts[emojis[k]], z),
+            'sample_count': sample_counts[emojis[k]],
+            'share': round(shares[k] * 100, 2),
+            'share_ci': [round(v * 100, 2) for v in share_ci],
+        }
+        if rank < top_n:
+            if rank + 1 < len(ranked):
+                diff = counts[k] - counts[ranked[rank + 1]]
+                entry['ahead_of_next'] = bool(diff - z * math.sqrt(diff_var[rank]) > 0)
+            else:
+                entry['ahead_of_next'] = None
+        estimates.append(entry)
+
+    rate_ci = _rate_interval(rate, rate_var, z)
+    return {
+        'confidence': confidence,
+        'degrees_of_freedom': df,
+        'total_replies': int(round(replies_hat)),
+        'total_replies_ci': _count_interval(replies_hat, variances[0], sample_replies, z),
+        'replies_with_emoji': int(round(with_emoji_hat)),
+        'replies_with_emoji_ci': _count_interval(with_emoji_hat, variances[1], sample_with_emoji, z),
+        'emoji_usage_rate': f"{rate * 100:.2f}%",
+        'emoji_usage_rate_ci': [f"{v * 100:.2f}%" for v in rate_ci],
+        'total_emojis': int(round(emojis_hat)),
+        'total_emojis_ci': _count_interval(emojis_hat, variances[2], sample_emojis, z),
+        'unique_emojis_observed': len(emojis),
+        'top_n': top_n,
+        'top_10_emojis': [(e['emoji'], e['count']) for e in estimates[:10]],
+        'emoji_estimates': estimates,
+        'sample_replies': sample_replies,
+        'sample_emojis': sample_emojis,
+    }
+
+
+def analyze_user_sample(username: str, sample_pages: Optional[int] = None,
+                        since: Optional[str] = None, until: Optional[str] = None,
+                        concurrency: Optional[int] = None, seed: Optional[int] = None,
+                        save: bool = True) -> Dict:
+    """
+    抽样估计用户的 emoji 使用情况
+
+    Args:
+        username: 用户名
+        sample_pages: 抽取的页数，None 表示使用 SAMPLE_PAGES
+        since / until: 时间窗口（ISO8601），抽样只在窗口覆盖的页码范围内进行
+        concurrency: 同时在途的样本页请求数，None 表示使用配置默认值
+        seed: 随机种子，None 表示随机生成（记录在结果中，可用于复现）
+        save: 是否写入 JSON / Markdown 报告
+
+    Returns:
+        抽样估计结果字典（sampled 为 True），失败或窗口内没有回复时返回空字典
+    """
+    sample_pages = max(PAGES_PER_STRATUM, sample_pages or SAMPLE_PAGES)
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    since_dt = parse_iso_datetime(since) if since else None
+    until_dt = parse_iso_datetime(until) if until else None
+    http_client = get_http_client(pool_size=max(1, concurrency or FETCH_CONCURRENCY))
+    requests_before = http_client.stats()['requests']
+    start = time.perf_counter()
+
+    print(f"正在探测用户 @{username} 的回复页数...")
+    page_range = probe_page_range(username, since_dt, until_dt)
+    if page_range is None:
+        return {}
+    first, last = page_range
+    if last < first:
+        print(f"窗口内没有用户 @{username} 的回复")
+        return {}
+    total_pages = last - first + 1
+    sizes, picks = stratify(first, last, sample_pages, random.Random(seed))
+    if len(picks) == total_pages:
+        print(f"窗口内共 {total_pages} 页，不超过抽样页数，直接全部获取")
+    else:
+        print(f"窗口内共 {total_pages} 页（第 {first}-{last} 页），分 {len(sizes)} 层随机抽取 "
+              f"{len(picks)} 页（种子 {seed}）")
+
+    fetched = fetch_pages(username, [page for page, _ in picks], concurrency)
+    rows, row_strata, failed = [], [], []
+    with profiling.stage('sample_estimate'):
+        for page, stratum in picks:
+            user_actions = fetched.get(page)
+            if user_actions is None:
+                failed.append(page)
+                continue
+            rows.append(_page_counts(user_actions, since_dt, until_dt))
+            row_strata.append(stratum)
+        if failed:
+            print(f"⚠️  {len(failed)} 个样本页获取失败，已从样本中去除: {failed}")
+        if not rows or not any(replies for replies, _, _ in rows):
+            print(f"样本页中没有窗口内的 @{username} 的回复，无法估计")
+            return {}
+        result = estimate_from_sample(rows, row_strata, sizes)
+
+    result.update({
+        'username': username,
+        'since': since,
+        'until': until,
+        'sampled': True,
+        'exact': not failed and len(picks) == total_pages,
+        'seed': seed,
+        'first_page': first,
+        'last_page': last,
+        'total_pages': total_pages,
+        'strata': len(sizes),
+        'sampled_pages': len(rows),
+        'failed_pages': failed,
+        'requests': http_client.stats()['requests'] - requests_before,
+    })
+    print(f"抽样完成: 共 {result['requests']} 次请求，耗时 {time.perf_counter() - start:.2f} 秒")
+    print_sample_statistics(result)
+    if save:
+        save_sample_results(result)
+    return result
+
+
+def _describe_sample(result: Dict) -> str:
+    if result['exact']:
+        return f"已获取窗口内全部 {result['total_pages']} 页，结果精确"
+    return (f"从第 {result['first_page']}-{result['last_page']} 页（共 {result['total_pages']} 页）中"
+            f"分 {result['strata']} 层抽取 {result['sampled_pages']} 页，随机种子 {result['seed']}，"
+            f"共 {result['requests']} 次请求")
+
+
+def print_sample_statistics(result: Dict):
+    """打印抽样估计摘要"""
+    level = f"{result['confidence'] * 100:g}%"
+    print("\n" + "="*60)
+    print(f"{result_subject(result)} 的 Emoji 使用抽样估计")
+    print("="*60)
+    print(f"抽样: {_describe_sample(result)}")
+    print(f"区间: {level} 置信区间（t 分布，自由度 {result['degrees_of_freedom']}）")
+    print(f"总回复数: {result['total_replies']}  {result['total_replies_ci']}")
+    print(f"包含 Emoji 的回复数: {result['replies_with_emoji']}  {result['replies_with_emoji_ci']}")
+    low, high = result['emoji_usage_rate_ci']
+    print(f"Emoji 使用率: {result['emoji_usage_rate']}  [{low}, {high}]")
+    print(f"Emoji 总数: {result['total_emojis']}  {result['total_emojis_ci']}")
+    print(f"样本中出现的 Emoji 种类: {result['unique_emojis_observed']}（全部历史中的种类数不少于此）")
+
+    print("\n" + "-"*60)
+    print(f"Top {result['top_n']} 最常用 Emoji（估计次数 [区间]，占比 [区间]；≈ 表示与下一名差异不显著）:")
+    print("-"*60)
+    for i, entry in enumerate(result['emoji_estimates'][:result['top_n']], 1):
+        low, high = entry['count_ci']
+        share_low, share_high = entry['share_ci']
+        mark = '≈' if entry.get('ahead_of_next') is False else ' '
+        print(f"{i:2d}.{mark}{entry['emoji']:20s} : {entry['count']:6d} [{low}, {high}] "
+              f"{entry['share']:5.2f}% [{share_low:.2f}%, {share_high:.2f}%]")
+
+    print("="*60 + "\n")
+
+
+def save_sample_results(result: Dict):
+    """保存抽样估计结果（文件名带 _sample，与完整统计的结果区分）"""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    base = f"{OUTPUT_DIR}/{safe_filename(result['username'])}_emoji_sample" \
+           f"{window_suffix(result.get('since'), result.get('until'))}"
+    level = f"{result['confidence'] * 100:g}%"
+
+    json_path = base + '.json'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    md_path = base + '.md'
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {result_subject(result)} 的 Emoji 使用抽样估计\n\n")
+        f.write(f"> 近似结果：{_describe_sample(result)}。区间为 {level} 置信区间（分层估计，t 分布，自由度 {result['degrees_of_freedom']}）。"
+                f"样本中没有出现的稀有 emoji 无法估计。\n\n")
+        if result['failed_pages']:
+            f.write(f"> ⚠️ 样本页 {result['failed_pages']} 获取失败，已从样本中去除。\n\n")
+
+        f.write("## 统计概览\n\n")
+        f.write(f"| 指标 | 估计值 | {level} 置信区间 |\n")
+        f.write("|------|--------|------------------|\n")
+        f.write(f"| 总回复数 | {result['total_replies']} | "
+                f"{result['total_replies_ci'][0]} - {result['total_replies_ci'][1]} |\n")
+        f.write(f"| 包含 Emoji 的回复数 | {result['replies_with_emoji']} | "
+                f"{result['replies_with_emoji_ci'][0]} - {result['replies_with_emoji_ci'][1]} |\n")
+        f.write(f"| Emoji 使用率 | {result['emoji_usage_rate']} | "
+                f"{result['emoji_usage_rate_ci'][0]} - {result['emoji_usage_rate_ci'][1]} |\n")
+        f.write(f"| Emoji 总数 | {result['total_emojis']} | "
+                f"{result['total_emojis_ci'][0]} - {result['total_emojis_ci'][1]} |\n\n")
+        f.write(f"- **样本中出现的 Emoji 种类**: {result['unique_emojis_observed']}（下限）\n")
+        f.write(f"- **样本回复数**: {result['sample_replies']}\n\n")
+        if result.get('since') or result.get('until'):
+            f.write("### 时间窗口\n\n")
+            f.write(f"- since: {result.get('since') or '-'}\n")
+            f.write(f"- until: {result.get('until') or '-'}\n\n")
+
+        f.write(f"## Top {result['top_n']} 最常用 Emoji\n\n")
+        f.write("“名次可靠”表示该 emoji 与下一名的次数差的置信区间在 0 以上。\n\n")
+        f.write("| 排名 | Emoji | 估计次数 | 次数区间 | 占比 | 占比区间 | 名次可靠 |\n")
+        f.write("|------|-------|----------|----------|------|----------|----------|\n")
+        for i, entry in enumerate(result['emoji_estimates'][:result['top_n']], 1):
+            ahead = {True: '是', False: '否', None: '-'}[entry.get('ahead_of_next')]
+            f.write(f"| {i} | {entry['emoji']} | {entry['count']} | "
+                    f"{entry['count_ci'][0]} - {entry['count_ci'][1]} | {entry['share']:.2f}% | "
+                    f"{entry['share_ci'][0]:.2f}% - {entry['share_ci'][1]:.2f}% | {ahead} |\n")
+
+        f.write("\n## 样本中出现的全部 Emoji\n\n")
+        f.write("| Emoji | 样本次数 | 估计次数 | 次数区间 | 占比 |\n")
+        f.write("|-------|----------|----------|----------|------|\n")
+        for entry in result['emoji_estimates']:
+            f.write(f"| {entry['emoji']} | {entry['sample_count']} | {entry['count']} | "
+                    f"{entry['count_ci'][0]} - {entry['count_ci'][1]} | {entry['share']:.2f}% |\n")
+
+    print(f"\n抽样估计结果已保存:")
+    print(f"  - JSON: {json_path}")
+    print(f"  - Markdown: {md_path}")
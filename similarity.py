@@ -0,0 +1,192 @@
+"""
+用户相似度模块 - 独立实现
+由多个用户的统计结果构建稀疏的 用户×emoji 矩阵（CSR：indptr / indices / data），
+用向量化运算计算余弦或 Jaccard 相似度、每个用户最相似的 top-k 用户，以及最能区分各用户的特色 emoji。
+
+已安装 SciPy 时按块做稀疏矩阵乘法，否则退回 NumPy 稠密矩阵乘法；
+两种方式都按行分块，不会一次性生成完整的 用户×用户 矩阵。
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+SIMILARITY_METRICS = ("cosine", "jaccard")
+# 每块计算的用户行数（每块占用 行数 × 用户数 个 float32）
+_BLOCK_ROWS = 512
+# 特色 emoji 打分的加法平滑，避免群体中从未出现的 emoji 得分无穷大
+_SMOOTHING = 0.5
+
+
+def _scipy_sparse():
+    try:
+        import scipy.sparse as sparse
+
+        return sparse
+    except ImportError:
+        return None
+
+
+class UserEmojiMatrix:
+    """用户×emoji 使用次数矩阵（CSR 存储，行按用户、列按 emoji 首次出现顺序）"""
+
+    def __init__(self, usernames: List[str], emojis: List[str],
+                 indptr: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        self.usernames = usernames
+        self.emojis = emojis
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Dict]) -> "UserEmojiMatrix":
+        """由 {用户名: 统计结果} 构建（使用结果中的 emoji_frequency）"""
+        usernames = list(results)
+        vocab: Dict[str, int] = {}
+        indptr = np.zeros(len(usernames) + 1, dtype=np.int64)
+        indices: List[int] = []
+        data: List[int] = []
+        for row, username in enumerate(usernames):
+            for emoji, count in (results[username].get('emoji_frequency') or {}).items():
+                if count > 0:
+                    indices.append(vocab.setdefault(emoji, len(vocab)))
+                    data.append(count)
+            indptr[row + 1] = len(indices)
+        return cls(usernames, list(vocab),
+                   indptr, np.asarray(indices, dtype=np.int64), np.asarray(data, dtype=np.float64))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.usernames), len(self.emojis)
+
+    def row_ids(self) -> np.ndarray:
+        """每个非零元素所在的行"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def row_sums(self) -> np.ndarray:
+        return np.bincount(self.row_ids(), weights=self.data, minlength=self.shape[0])
+
+    def col_sums(self) -> np.ndarray:
+        return np.bincount(self.indices, weights=self.data, minlength=self.shape[1])
+
+    def _operand(self, values: np.ndarray):
+        """以给定的非零值构造参与乘法的矩阵：有 SciPy 时为 CSR，否则为稠密 float32"""
+        sparse = _scipy_sparse()
+        if sparse is not None:
+            return sparse.csr_matrix((values.astype(np.float32), self.indices, self.indptr),
+                                     shape=self.shape)
+        dense = np.zeros(self.shape, dtype=np.float32)
+        dense[self.row_ids(), self.indices] = values
+        return dense
+
+    def similarity_blocks(self, metric: str = "cosine") -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        按行块产出相似度 (起始行, 块)，块形状为 (块行数, 用户数)
+
+        cosine: 使用次数向量的余弦相似度
+        jaccard: 用过的 emoji 集合的 Jaccard 相似度
+        """
+        if metric not in SIMILARITY_METRICS:
+            raise ValueError(f"未知的相似度: {metric}")
+        n = self.shape[0]
+        if metric == "cosine":
+            norms = np.sqrt(np.bincount(self.row_ids(), weights=self.data ** 2, minlength=n))
+            safe = np.where(norms > 0, norms, 1.0)
+            matrix = self._operand(self.data / safe[self.row_ids()])
+        else:
+            sizes = np.diff(self.indptr).astype(np.float32)
+            matrix = self._operand(np.ones_like(self.data))
+        transposed = matrix.T
+        for start in range(0, n, _BLOCK_ROWS):
+            product = matrix[start:start + _BLOCK_ROWS] @ transposed
+            block = np.asarray(product.toarray() if hasattr(product, "toarray") else product,
+                               dtype=np.float32)
+            if metric == "jaccard":
+                union = sizes[start:start + len(block), None] + sizes[None, :] - block
+                block = np.divide(block, union, out=np.zeros_like(block), where=union > 0)
+            yield start, block
+
+    def top_similar(self, k: int = 5, metric: str = "cosine") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        每个用户最相似的 k 个其他用户（相似度降序，相同时按用户顺序）
+
+        Returns:
+            (用户下标, 相似度)，形状均为 (用户数, k)；不足 k 个时以 -1 / 0 填充
+        """
+        n = self.shape[0]
+        k_eff = max(0, min(k, n - 1))
+        neighbours = np.full((n, k), -1, dtype=np.int64)
+        scores = np.zeros((n, k), dtype=np.float32)
+        if k_eff == 0:
+            return neighbours, scores
+        for start, block in self.similarity_blocks(metric):
+            rows_in_block = len(block)
+            block[np.arange(rows_in_block), np.arange(start, start + rows_in_block)] = -np.inf
+            # 第 k 大的值作为门槛，门槛以上（含并列）的候选再精确排序，保证并列时的顺序确定
+            kth = np.partition(block, n - k_eff, axis=1)[:, n - k_eff]
+            rows, cols = np.nonzero(block >= kth[:, None])
+            vals = block[rows, cols]
+            order = np.lexsort((cols, -vals, rows))
+            rows, cols, vals = rows[order], cols[order], vals[order]
+            rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+            keep = rank < k_eff
+            neighbours[start + rows[keep], rank[keep]] = cols[keep]
+            scores[start + rows[keep], rank[keep]] = vals[keep]
+        return neighbours, scores
+
+    def distinctive(self, top_n: int = 5) -> List[List[Tuple[str, int, float]]]:
+        """
+        每个用户的特色 emoji：该用户使用占比远高于群体中其他用户的 emoji
+
+        得分为 p·ln(p/q)（KL 散度中该 emoji 的贡献），p 为该 emoji 在该用户中的占比，
+        q 为在其余用户中的平滑占比；只保留 p > q 的 emoji。
+
+        Returns:
+            每个用户的 [(emoji, 次数, 得分)]，按得分降序
+        """
+        n, v = self.shape
+        if not len(self.data):
+            return [[] for _ in range(n)]
+        rows = self.row_ids()
+        row_total = self.row_sums()[rows]
+        others = self.col_sums()[self.indices] - self.data
+        others_total = self.data.sum() - row_total
+        p = self.data / row_total
+        q = (others + _SMOOTHING) / (others_total + _SMOOTHING * v)
+        score = p * np.log(p / q)
+
+        # 得分相同时保持该用户自身的频率顺序（即 emoji_frequency 中的顺序）
+        order = np.lexsort((np.arange(len(score)), -score, rows))
+        rows, score = rows[order], score[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = np.flatnonzero((rank < top_n) & (score > 0))
+        picked: List[List[Tuple[str, int, float]]] = [[] for _ in range(n)]
+        for i in keep:
+            j = order[i]
+            picked[rows[i]].append((self.emojis[self.indices[j]], int(self.data[j]), float(score[i])))
+        return picked
+
+
+def compare_users(results: Dict[str, Dict], metric: str = "cosine", top_k: int = 5,
+                  distinctive_n: int = 5) -> Dict:
+    """
+    计算用户间相似度与特色 emoji
+
+    Returns:
+        {'metric', 'top_k', 'backend', 'users': {用户名: {'similar': [[用户名, 相似度]],
+                                                       'distinctive': [[emoji, 次数, 得分]]}}}
+        相似度为 0 的用户不列入 similar
+    """
+    matrix = UserEmojiMatrix.from_results(results)
+    neighbours, scores = matrix.top_similar(top_k, metric)
+    distinctive = matrix.distinctive(distinctive_n)
+    users = {}
+    for row, username in enumerate(matrix.usernames):
+        similar = [[matrix.usernames[j], round(float(s), 4)]
+                   for j, s in zip(neighbours[row], scores[row]) if j >= 0 and s > 0]
+        users[username] = {
+            'similar': similar,
+            'distinctive': [[e, c, round(s, 4)] for e, c, s in distinctive[row]],
+        }
+    return {'metric': metric, 'top_k': top_k, 'users': users,
+            'backend': 'scipy' if _scipy_sparse() is not None else 'numpy'}
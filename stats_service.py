@@ -0,0 +1,374 @@
+"""
+统计服务模块 - 独立实现
+常驻进程提供本地 HTTP/JSON 接口，供看板等调用方反复读取用户统计，无需每次启动新进程、重新爬取
+
+- 结果按 (用户名, since, until, max_pages) 缓存在内存中：LRU 淘汰 + TTL 过期
+  （翻页中途失败的不完整结果只使用很短的 SERVICE_PARTIAL_TTL）
+- 同一键的并发请求合并为一次获取（single-flight），其余请求等待同一个结果
+- 过期但未超过 SERVICE_MAX_STALE 的结果立即返回，同时在后台重新获取
+- 后台线程在热点结果过期前主动刷新，看板读取不必等待论坛
+
+接口:
+    GET /stats/{username}?since=&until=&max_pages=&compact=1&wait=秒
+        200 统计结果 JSON（响应头 X-Cache: hit / stale / miss，Age 为结果的秒龄）
+        202 仍在获取（超过 wait 秒），稍后重试即可；404 没有回复；502 获取失败
+    GET /health   服务状态与缓存计数
+    GET /cache    缓存条目列表
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from config import (SERVICE_HOST, SERVICE_PORT, SERVICE_CACHE_SIZE, SERVICE_CACHE_TTL,
+                    SERVICE_PARTIAL_TTL, SERVICE_MAX_STALE, SERVICE_REFRESH_INTERVAL, SERVICE_HOT_WINDOW,
+                    SERVICE_CRAWL_WORKERS, SERVICE_WAIT_TIMEOUT)
+from action_pages import parse_iso_datetime
+from user_emoji_stats import analyze_user_emojis
+
+# 缓存键: (用户名小写, since, until, max_pages)
+CacheKey = Tuple[str, Optional[str], Optional[str], Optional[int]]
+# 热点结果的秒龄达到 TTL 的该比例时开始后台刷新，保证读取时仍在有效期内
+REFRESH_AHEAD = 0.8
+
+
+def make_key(username: str, since: Optional[str] = None, until: Optional[str] = None,
+             max_pages: Optional[int] = None) -> CacheKey:
+    """
+    规范化缓存键（用户名不区分大小写，时间统一为 UTC 秒级 ISO8601）
+
+    Raises:
+        ValueError: 用户名为空或时间无法解析
+    """
+    username = username.strip()
+    if not username:
+        raise ValueError("用户名不能为空")
+
+    def norm(value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        dt = parse_iso_datetime(value)
+        if dt is None:
+            raise ValueError(f"无法解析的时间: {value}")
+        return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    return username.lower(), norm(since), norm(until), max_pages
+
+
+class CacheEntry:
+    """一条缓存结果及其读取统计"""
+
+    def __init__(self, result: Dict, ttl: float):
+        self.result = result
+        self.ttl = ttl
+        self.fetched_at = time.time()
+        self.last_access = self.fetched_at
+        self.hits = 0
+        self._bodies: Dict[bool, bytes] = {}  # compact -> 编码后的响应体
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (now or time.time()) - self.fetched_at
+
+    def body(self, compact: bool = False) -> bytes:
+        """编码后的 JSON（按需编码一次，之后复用）"""
+        if compact not in self._bodies:
+            result = self.result
+            if compact:
+                result = {k: v for k, v in result.items() if k != 'emoji_by_topic'}
+            self._bodies[compact] = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        return self._bodies[compact]
+
+
+class ResultCache:
+    """线程安全的 LRU + TTL 结果缓存"""
+
+    def __init__(self, max_entries: int = SERVICE_CACHE_SIZE, ttl: float = SERVICE_CACHE_TTL,
+                 max_stale: float = SERVICE_MAX_STALE, partial_ttl: float = SERVICE_PARTIAL_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.partial_ttl = min(partial_ttl, ttl)
+        self.max_stale = max_stale
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        """读取并记录访问；超过 max_stale 的条目视为不存在"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.age(now) > self.max_stale:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            entry.last_access = now
+            return entry
+
+    def put(self, key: CacheKey, result: Dict) -> CacheEntry:
+        """
+        写入新结果（保留原条目的读取统计，热点判定不因刷新而中断）
+
+        不完整的结果（partial）只在 partial_ttl 内视为有效，之后的读取会触发重新获取。
+        """
+        entry = CacheEntry(result, self.partial_ttl if result.get('partial') else self.ttl)
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                entry.hits, entry.last_access = old.hits, old.last_access
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age() <= entry.ttl
+
+    def snapshot(self) -> List[Tuple[CacheKey, CacheEntry]]:
+        with self._lock:
+            return list(self._entries.items())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _analyze(key: CacheKey) -> Dict:
+    username, since, until, max_pages = key
+    return analyze_user_emojis(username, max_pages, since=since, until=until, save=False)
+
+
+class StatsService:
+    """缓存、请求合并与后台刷新"""
+
+    def __init__(self, cache: Optional[ResultCache] = None,
+                 compute: Callable[[CacheKey], Dict] = _analyze,
+                 crawl_workers: int = SERVICE_CRAWL_WORKERS,
+                 refresh_interval: float = SERVICE_REFRESH_INTERVAL,
+                 hot_window: float = SERVICE_HOT_WINDOW):
+        self.cache = cache if cache is not None else ResultCache()
+        self.compute = compute
+        self.refresh_interval = refresh_interval
+        self.hot_window = hot_window
+        self._executor = ThreadPoolExecutor(max_workers=max(1, crawl_workers))
+        self._inflight: Dict[CacheKey, Future] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self.started_at = time.time()
+        self.counters = {'hit': 0, 'stale': 0, 'miss': 0, 'coalesced': 0,
+                         'crawls': 0, 'refreshes': 0, 'errors': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _run(self, key: CacheKey) -> Dict:
+        try:
+            result = self.compute(key)
+            self.cache.put(key, result)
+            return result
+        except Exception as e:
+            self._count('errors')
+            print(f"获取 {key} 失败: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def submit(self, key: CacheKey) -> Future:
+        """开始获取（同一键已有进行中的获取时直接复用）"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counters['coalesced'] += 1
+                return future
+            future = self._executor.submit(self._run, key)
+            self._inflight[key] = future
+            self.counters['crawls'] += 1
+            return future
+
+    def get(self, key: CacheKey, wait: Optional[float] = SERVICE_WAIT_TIMEOUT) -> Tuple[Optional[CacheEntry], str]:
+        """
+        读取结果
+
+        Returns:
+            (缓存条目, 'hit' / 'stale' / 'miss')；等待超时时条目为 None，获取继续在后台进行
+
+        Raises:
+            获取失败时抛出 compute 的异常
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            if self.cache.is_fresh(entry):
+                self._count('hit')
+                return entry, 'hit'
+            # 旧结果先返回，后台重新获取
+            self._count('stale')
+            self.submit(key)
+            return entry, 'stale'
+
+        self._count('miss')
+        future = self.submit(key)
+        try:
+            future.result(timeout=wait)
+        except FutureTimeout:
+            return None, 'miss'
+        return self.cache.get(key), 'miss'
+
+    def refresh_hot(self) -> int:
+        """刷新最近被读取、即将过期的结果，返回发起的刷新数"""
+        now = time.time()
+        started = 0
+        for key, entry in self.cache.snapshot():
+            if now - entry.last_access > self.hot_window:
+                continue
+            if entry.age(now) < entry.ttl * REFRESH_AHEAD:
+                continue
+            with self._lock:
+                if key in self._inflight:
+                    continue
+            self.submit(key)
+            self._count('refreshes')
+            started += 1
+        return started
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh_hot()
+            except Exception as e:
+                print(f"后台刷新出错: {e}")
+
+    def start(self):
+        """启动后台刷新线程"""
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            inflight = len(self._inflight)
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'cache_entries': len(self.cache),
+            'cache_capacity': self.cache.max_entries,
+            'ttl_seconds': self.cache.ttl,
+            'partial_ttl_seconds': self.cache.partial_ttl,
+            'inflight': inflight,
+            'evictions': self.cache.evictions,
+            **counters,
+        }
+
+    def entries(self) -> List[Dict]:
+        now = time.time()
+        return [{
+            'username': key[0], 'since': key[1], 'until': key[2], 'max_pages': key[3],
+            'age_seconds': round(entry.age(now), 1),
+            'idle_seconds': round(now - entry.last_access, 1),
+            'hits': entry.hits,
+            'total_replies': entry.result.get('total_replies', 0),
+            'partial': bool(entry.result.get('partial')),
+        } for key, entry in self.cache.snapshot()]
+
+
+def make_handler(service: StatsService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {self.address_string()} {format % args}")
+
+        def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, data, headers: Optional[Dict[str, str]] = None):
+            self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), headers)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            path = parsed.path.rstrip('/')
+            query = parse_qs(parsed.query)
+            if path == '/health':
+                self._send_json(200, service.status())
+            elif path == '/cache':
+                self._send_json(200, service.entries())
+            elif path.startswith('/stats/'):
+                self._get_stats(unquote(path[len('/stats/'):]), query)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def _get_stats(self, username: str, query: Dict[str, List[str]]):
+            def param(name: str) -> Optional[str]:
+                return query.get(name, [None])[0] or None
+
+            try:
+                max_pages = int(param('max_pages')) if param('max_pages') else None
+                wait = float(param('wait')) if param('wait') is not None else SERVICE_WAIT_TIMEOUT
+                key = make_key(username, param('since'), param('until'), max_pages)
+            except ValueError as e:
+                self._send_json(400, {'error': str(e)})
+                return
+
+            try:
+                entry, state = service.get(key, wait=wait)
+            except Exception as e:
+                self._send_json(502, {'error': f"获取失败: {e}"})
+                return
+            if entry is None:
+                self._send_json(202, {'status': 'pending', 'retry_after': 5}, {'Retry-After': '5'})
+                return
+
+            headers = {
+                'X-Cache': state,
+                'Age': str(int(entry.age())),
+                'Last-Modified': formatdate(entry.fetched_at, usegmt=True),
+            }
+            if not entry.result:
+                self._send_json(404, {'error': f"未找到用户 @{key[0]} 的回复"}, headers)
+                return
+            self._send(200, entry.body(compact=param('compact') in ('1', 'true')), headers)
+
+    return Handler
+
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT,
+          service: Optional[StatsService] = None):
+    """启动服务（阻塞，Ctrl+C 退出）"""
+    service = service or StatsService()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    service.start()
+    print(f"统计服务已启动: http://{host}:{server.server_address[1]}/stats/<用户名> （Ctrl+C 退出）")
+    print(f"缓存: 最多 {service.cache.max_entries} 条，有效期 {service.cache.ttl:g}s，"
+          f"热点结果每 {service.refresh_interval:g}s 检查一次并在过期前刷新")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        print(f"服务已停止: {service.status()}")
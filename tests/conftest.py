@@ -0,0 +1,40 @@
+"""
+测试公共配置
+- 把项目根目录与 benchmarks/ 加入 sys.path（合成数据生成器在 benchmarks/synthetic.py）
+- emoji 目录的磁盘缓存写到临时目录，测试不在项目中留下 emoji_stats_output/
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _isolated_catalog_cache(tmp_path_factory):
+    import emoji_catalog
+
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    patch = pytest.MonkeyPatch()
+    patch.chdir(ROOT)  # emojis.json 与 emoji/ 按相对路径读取
+    patch.setattr(emoji_catalog, "CACHE_DIR", cache_dir)
+    patch.setattr(emoji_catalog, "_CACHE_PATH", os.path.join(cache_dir, "emoji_catalog.pickle"))
+    yield
+    patch.undo()
+
+
+@pytest.fixture(scope="session")
+def forum():
+    from synthetic import SyntheticForum
+
+    return SyntheticForum(users=1, posts_per_user=1500, topics=40, seed=11, page_size=30)
+
+
+@pytest.fixture(scope="session")
+def records(forum):
+    """合成账号的全部回复（按时间倒序，与 user_actions 分页顺序一致）"""
+    return forum.actions(forum.usernames[0])
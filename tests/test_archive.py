@@ -0,0 +1,44 @@
+"""ArchiveWriter 丢弃最后一次索引提交之后的数据"""
+
+import os
+
+from archive import ArchiveReader, ArchiveWriter
+
+
+def _replayed(reader, **window):
+    return [record for block in reader.iter_records(**window) for record in block]
+
+
+def test_reopen_truncates_uncommitted_tail(tmp_path, records):
+    first, second = records[:250], records[250:400]
+    with ArchiveWriter('alice', directory=str(tmp_path), block_records=100) as writer:
+        writer.add(first)
+    shard = writer.index['shards'][-1]
+    path = os.path.join(writer.directory, shard['file'])
+    # 模拟写块过程中被中断：分片文件已追加、索引尚未更新
+    with open(path, 'ab') as f:
+        f.write(b'\x1f\x8b\x08 not a complete gzip member')
+
+    with ArchiveWriter('alice', directory=str(tmp_path), block_records=100) as writer:
+        assert os.path.getsize(path) == shard['bytes']
+        writer.add(second)
+
+    reader = ArchiveReader('alice', directory=str(tmp_path))
+    assert _replayed(reader) == first + second
+    assert reader.summary()['records'] == len(first) + len(second)
+
+
+def test_uncommitted_buffer_is_not_archived(tmp_path, records):
+    writer = ArchiveWriter('alice', directory=str(tmp_path), block_records=100)
+    writer.add(records[:150])  # 后 50 条仍在缓冲区，进程退出时丢失
+    reader = ArchiveReader('alice', directory=str(tmp_path))
+    assert _replayed(reader) == records[:100]
+
+
+def test_duplicates_are_dropped_on_replay(tmp_path, records):
+    with ArchiveWriter('alice', directory=str(tmp_path), block_records=50) as writer:
+        writer.add(records[:120])
+        writer.add(records[60:180])  # 重叠的翻页
+    reader = ArchiveReader('alice', directory=str(tmp_path))
+    assert _replayed(reader) == records[:180]
+    assert reader.duplicates == 60
@@ -0,0 +1,74 @@
+"""CrawlCheckpoint 的截断与续爬"""
+
+import json
+import os
+
+import pytest
+
+from checkpoint import CrawlCheckpoint
+
+
+def _page(page, size=3):
+    return [{'post_id': page * 100 + i, 'created_at': '2024-05-01T00:00:00.000Z', 'cooked': ''}
+            for i in range(size)]
+
+
+def _replayed(checkpoint):
+    return [reply for batch in checkpoint.iter_records() for reply in batch]
+
+
+@pytest.fixture
+def interrupted(tmp_path):
+    """每 2 页提交一次，完成 3 页后中断：第 3 页只在缓冲区中，回复文件末尾残留半行"""
+    checkpoint = CrawlCheckpoint('alice', until='2024-12-31T23:59:59Z', every=2, directory=str(tmp_path))
+    for page in (1, 2, 3):
+        checkpoint.page_done(page, _page(page))
+    with open(checkpoint.records_path, 'ab') as f:
+        f.write(b'{"post_id": 301, "crea')
+    return tmp_path
+
+
+def test_resume_truncates_to_last_commit(interrupted):
+    checkpoint = CrawlCheckpoint('alice', until='2024-12-31T23:59:59Z', every=2, directory=str(interrupted))
+    committed = json.load(open(checkpoint.state_path, encoding='utf-8'))['records_bytes']
+    assert os.path.getsize(checkpoint.records_path) > committed
+
+    assert checkpoint.load()
+    assert os.path.getsize(checkpoint.records_path) == committed
+    assert (checkpoint.next_page, checkpoint.pages_done, checkpoint.replies) == (3, 2, 6)
+    assert _replayed(checkpoint) == _page(1) + _page(2)
+
+
+def test_resume_skips_replayed_replies_and_completes(interrupted):
+    checkpoint = CrawlCheckpoint('alice', until='2024-12-31T23:59:59Z', every=2, directory=str(interrupted))
+    assert checkpoint.load()
+    _replayed(checkpoint)
+    # 两次运行之间有新回复时，翻页会与已获取的内容重叠
+    assert checkpoint.new_replies(_page(2) + _page(3)) == _page(3)
+
+    checkpoint.page_done(3, _page(3))
+    checkpoint.close(False)
+    again = CrawlCheckpoint('alice', until='2024-12-31T23:59:59Z', every=2, directory=str(interrupted))
+    assert again.load()
+    assert _replayed(again) == _page(1) + _page(2) + _page(3)
+    assert again.next_page == 4
+
+    again.close(True)
+    assert not os.path.exists(again.state_path)
+    assert not os.path.exists(again.records_path)
+
+
+def test_mismatched_parameters_do_not_resume(interrupted):
+    other_window = CrawlCheckpoint('alice', until='2024-06-30T23:59:59Z', every=2, directory=str(interrupted))
+    assert not other_window.exists()
+    other_pages = CrawlCheckpoint('alice', until='2024-12-31T23:59:59Z', max_pages=5,
+                                  every=2, directory=str(interrupted))
+    assert not other_pages.load()
+
+
+def test_in_memory_checkpoint_writes_nothing(tmp_path):
+    checkpoint = CrawlCheckpoint('alice', every=0, directory=str(tmp_path))
+    checkpoint.page_done(1, _page(1))
+    checkpoint.close(False)
+    assert checkpoint.pages_done == 1 and not checkpoint.complete
+    assert os.listdir(tmp_path) == []
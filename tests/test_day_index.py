@@ -0,0 +1,105 @@
+"""DayIndex.query 与在线统计（EmojiAggregator 按窗口过滤）的一致性"""
+
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+from action_pages import parse_iso_datetime
+from day_index import DayIndex, day_aligned
+from user_emoji_stats import EmojiAggregator
+
+KEYS = ('total_replies', 'replies_with_emoji', 'emoji_usage_rate', 'total_emojis',
+        'unique_emojis', 'top_10_emojis')
+
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ') if dt else None
+
+
+def _day_window(records, newer, older):
+    """以两条回复所在日期为两端的整日窗口（UTC）"""
+    until_day = parse_iso_datetime(records[newer]['created_at']).date()
+    since_day = parse_iso_datetime(records[older]['created_at']).date()
+    since_dt = datetime.combine(since_day, time.min, timezone.utc)
+    until_dt = datetime.combine(until_day, time.min, timezone.utc) + timedelta(days=1, seconds=-1)
+    return since_dt, until_dt
+
+
+def _live(records, since_dt, until_dt):
+    aggregator = EmojiAggregator(since_dt, until_dt, workers=1)
+    aggregator.add_replies(records)
+    return aggregator.to_result('u', _iso(since_dt), _iso(until_dt))
+
+
+@pytest.fixture(scope='module')
+def index(records):
+    aggregator = EmojiAggregator(workers=1)
+    aggregator.add_replies(records)
+    return DayIndex.from_aggregator('u', aggregator)
+
+
+@pytest.mark.parametrize('newer, older', [(100, 900), (0, 1499), (700, 720), (1200, 1201)])
+def test_query_matches_live_window(records, index, newer, older):
+    since_dt, until_dt = _day_window(records, newer, older)
+    assert day_aligned(since_dt, until_dt)
+    expected = _live(records, since_dt, until_dt)
+    result = index.query(since_dt, until_dt, _iso(since_dt), _iso(until_dt))
+    assert expected['total_replies'] > 0
+    for key in KEYS:
+        assert result[key] == expected[key], key
+    # 次数相同的 emoji 顺序也须与 Counter.most_common 一致
+    assert list(result['emoji_frequency'].items()) == list(expected['emoji_frequency'].items())
+    assert result['from_index'] is True
+
+
+def test_open_ended_windows(records, index):
+    since_dt, until_dt = _day_window(records, 300, 600)
+    for window in ((since_dt, None), (None, until_dt), (None, None)):
+        expected = _live(records, *window)
+        result = index.query(*window)
+        assert list(result['emoji_frequency'].items()) == list(expected['emoji_frequency'].items())
+        assert result['total_replies'] == expected['total_replies']
+
+
+def test_empty_window(records, index):
+    newest = parse_iso_datetime(records[0]['created_at'])
+    since_dt = datetime.combine(newest.date(), time.min, timezone.utc) + timedelta(days=30)
+    result = index.query(since_dt, since_dt + timedelta(days=1, seconds=-1))
+    assert result['total_replies'] == 0
+    assert result['emoji_frequency'] == {}
+
+
+def test_serves_only_day_aligned_windows_before_build(index):
+    built_at = parse_iso_datetime(index.meta['built_at'])
+    day = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    assert index.serves(day, day + timedelta(days=1, seconds=-1))
+    assert not index.serves(day + timedelta(hours=3), day + timedelta(days=1, seconds=-1))
+    later = datetime.combine(built_at.date(), time.min, timezone.utc) + timedelta(days=2)
+    assert not index.serves(day, later + timedelta(days=1, seconds=-1))
+
+
+def test_update_adds_only_newer_replies(forum, records, index, tmp_path, monkeypatch):
+    from synthetic import SyntheticClient
+
+    import day_index
+    import http_utils
+    from user_emoji_stats import update_day_index
+
+    monkeypatch.setattr(day_index, 'OUTPUT_DIR', str(tmp_path))
+    monkeypatch.setattr(http_utils, '_http_client', SyntheticClient(forum))
+    # 索引生成时只有较早的回复；在同一天内切分，新旧回复要合并进同一天
+    day = lambda i: parse_iso_datetime(records[i]['created_at']).date()
+    split = next(i for i in range(400, len(records)) if day(i - 1) == day(i))
+    older = EmojiAggregator(workers=1)
+    older.add_replies(records[split:])
+    stale = DayIndex.from_aggregator('u', older)
+    assert stale.can_update() and not stale.covers(None, None)
+
+    updated = update_day_index(forum.usernames[0], stale)
+    assert updated is not None and updated.covers(None, None, up_to_date=True)
+    for window in ((None, None), _day_window(records, 100, 900), _day_window(records, split - 1, split)):
+        expected = index.query(*window)
+        result = updated.query(*window)
+        for key in KEYS:
+            assert result[key] == expected[key], key
+        assert list(result['emoji_frequency'].items()) == list(expected['emoji_frequency'].items())
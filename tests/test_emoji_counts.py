@@ -0,0 +1,49 @@
+"""SparseCounts / most_common_order 与 Counter.most_common 的一致性"""
+
+import random
+from collections import Counter
+
+from emoji_counts import SparseCounts, most_common_order
+
+
+def _most_common(counts: SparseCounts):
+    keys, values, first = counts.arrays()
+    order = most_common_order(values, first)
+    return list(zip(keys[order].tolist(), values[order].tolist()))
+
+
+def test_add_many_matches_counter_across_compactions():
+    rng = random.Random(3)
+    # 键少、次数多，制造大量同次数的并列；compact_every 很小，跨多次归并
+    counts = SparseCounts(compact_every=7)
+    counter = Counter()
+    pos = 0
+    for _ in range(300):
+        keys = [rng.choice(range(25)) << 32 | rng.randrange(3) for _ in range(rng.randrange(1, 6))]
+        counts.add_many(keys, pos)
+        pos += len(keys)
+        counter.update(keys)
+    assert _most_common(counts) == counter.most_common()
+    assert len(counts) == len(counter)
+
+
+def test_weighted_add_matches_counter_update():
+    rng = random.Random(5)
+    counts = SparseCounts(compact_every=4)
+    counter = Counter()
+    for pos in range(200):
+        key, weight = rng.randrange(12), rng.randrange(1, 4)
+        counts.add(key, weight, pos)
+        counter[key] += weight
+    assert _most_common(counts) == counter.most_common()
+
+
+def test_ties_keep_first_occurrence_order():
+    counts = SparseCounts()
+    sequence = [9, 4, 7, 4, 9, 7, 1]
+    counts.add_many(sequence, 0)
+    assert _most_common(counts) == Counter(sequence).most_common() == [(9, 2), (4, 2), (7, 2), (1, 1)]
+
+
+def test_empty():
+    assert _most_common(SparseCounts()) == []
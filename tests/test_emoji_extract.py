@@ -0,0 +1,28 @@
+"""fast 引擎与 bs4 引擎在 cooked 语料上的输出逐帖一致（golden）"""
+
+import json
+
+import pytest
+
+from emoji_extract import extract_emoji_bs4, extract_emoji_fast
+from extract_bench import FIXTURE_CORPUS
+
+pytest.importorskip("bs4")
+
+with open(FIXTURE_CORPUS, "r", encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+@pytest.mark.parametrize("cooked", [item["cooked"] for item in CORPUS],
+                         ids=[item["name"] for item in CORPUS])
+def test_fast_matches_bs4(cooked):
+    assert extract_emoji_fast(cooked) == extract_emoji_bs4(cooked)
+
+
+def test_skips_img_that_html_parser_does_not_see_as_tag():
+    img = '<img class="emoji" title=":smile:" alt=":smile:">'
+    # 属性与全文短代码各两次，再加 img 标签一次
+    assert extract_emoji_fast(img).count("smile") == 5
+    for html in (f"<script>'{img}'</script>", f"<![CDATA[{img}]]>", f"<!-- {img}",
+                 f"<!DOCTYPE html {img}", f"<div {img}>"):
+        assert extract_emoji_fast(html).count("smile") == 4, html
@@ -0,0 +1,40 @@
+"""AdaptiveRateLimiter：每次限流只降速一次，提速不超过被限流前的健康速率"""
+
+from http_utils import AdaptiveRateLimiter
+
+
+def _healthy_second(limiter):
+    for _ in range(max(1, int(limiter.rate))):
+        limiter.on_success()
+
+
+def test_concurrent_throttles_reduce_once():
+    limiter = AdaptiveRateLimiter(min_rate=0.5, max_rate=20.0)
+    tickets = [limiter.acquire() for _ in range(8)]
+    for ticket in tickets:
+        limiter.on_throttle(0.0, ticket)
+    assert limiter.current_rate() == 4.0
+
+    # 降速之后发出的请求再被限流，属于新一次限流
+    limiter.on_throttle(0.0, limiter.acquire())
+    assert limiter.current_rate() == 2.0
+
+
+def test_growth_stops_at_last_safe_rate():
+    limiter = AdaptiveRateLimiter(min_rate=0.5, max_rate=40.0, growth=2.0)
+    for _ in range(16):
+        limiter.acquire()
+    limiter.on_throttle(0.0)                 # 16 请求/秒被限流 -> 8，最多回到 16 / 2
+    for _ in range(5):
+        _healthy_second(limiter)
+    assert limiter.current_rate() == 8.0
+
+    limiter.ceiling = 32.0                   # 假设服务端放宽后继续提速：8 -> 16 -> 32
+    _healthy_second(limiter)
+    _healthy_second(limiter)
+    limiter.on_throttle(0.0)                 # 32 被限流：最后健康的速率是 16
+    assert limiter.current_rate() == 16.0 and limiter.ceiling == 16.0
+    for _ in range(5):
+        _healthy_second(limiter)
+    assert limiter.current_rate() == 16.0
+    assert limiter.limited
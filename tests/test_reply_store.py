@@ -0,0 +1,35 @@
+"""ReplyStore 增量刷新：历史不完整时翻过已存储的回复补齐缺口"""
+
+import pytest
+
+import http_utils
+from reply_store import ReplyStore
+from user_emoji_stats import refresh_user_replies
+
+
+@pytest.fixture
+def client(forum, monkeypatch):
+    from synthetic import SyntheticClient
+
+    client = SyntheticClient(forum)
+    monkeypatch.setattr(http_utils, "_http_client", client)
+    return client
+
+
+def test_refresh_fills_gap_left_by_page_limit(forum, records, client, tmp_path, capsys):
+    username = forum.usernames[0]
+    with ReplyStore(str(tmp_path / "replies.sqlite3")) as store:
+        refresh_user_replies(store, username, max_pages=3)
+        assert store.count(username) == 90
+        assert not store.is_complete(username)
+
+        # 上次受页数限制，本次不能在已存储的回复处停止
+        refresh_user_replies(store, username)
+        assert store.count(username) == len(records)
+        assert store.is_complete(username)
+
+        # 历史已完整：遇到已存储的回复即停止
+        before = client.requests
+        assert refresh_user_replies(store, username) == 0
+        assert client.requests - before == 1
+    capsys.readouterr()
@@ -0,0 +1,36 @@
+"""stratified_totals：全部页面都抽中（普查）时方差为 0、总量精确"""
+
+import random
+
+import numpy as np
+import pytest
+
+from sampling import stratified_totals
+
+
+def _pages(sizes, seed=1):
+    rng = random.Random(seed)
+    values, strata = [], []
+    for h, size in enumerate(sizes):
+        for _ in range(size):
+            values.append([rng.randrange(30), rng.randrange(80)])
+            strata.append(h)
+    return np.array(values, dtype=np.float64), strata
+
+
+@pytest.mark.parametrize('sizes', [[12], [5, 5, 6], [1, 4, 1, 7]])
+def test_census_is_exact(sizes):
+    values, strata = _pages(sizes)
+    totals, variances = stratified_totals(values, strata, sizes)
+    assert np.allclose(totals, values.sum(axis=0))
+    assert np.allclose(variances, 0.0)
+
+
+def test_sample_has_positive_variance():
+    sizes = [10, 10]
+    values, strata = _pages(sizes)
+    picked = [0, 3, 10, 15]
+    totals, variances = stratified_totals(values[picked], [strata[i] for i in picked], sizes)
+    assert (variances > 0).all()
+    expected = 10 * values[[0, 3]].mean(axis=0) + 10 * values[[10, 15]].mean(axis=0)
+    assert np.allclose(totals, expected)
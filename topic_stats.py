@@ -0,0 +1,269 @@
+"""
+话题统计模块 - 独立实现
+统计单个话题（含数万楼的大水楼）中全部帖子的 emoji 使用情况，并按参与者分组
+
+1. /t/{id}.json 获取话题标题与帖子流（全部帖子 id，首批帖子已附带正文）
+2. 其余帖子按 id 分批（每批 TOPIC_POST_CHUNK_SIZE 个）从 /t/{id}/posts.json 获取，
+   有界线程池预取，按帖子流顺序消费
+3. 正文交给 EmojiAggregator 即时提取后丢弃，只按顺序保留 emoji id（每个 4 字节）
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from config import TOPIC_API, TOPIC_POSTS_API, TOPIC_POST_CHUNK_SIZE, FETCH_CONCURRENCY
+from action_decode import loads
+from action_pages import parse_iso_datetime
+from emoji_counts import KEY_SHIFT, split_keys
+from http_utils import get_http_client
+import profiling
+from user_emoji_stats import EmojiAggregator, print_statistics, save_results
+
+# 统计用到的帖子字段，其余字段随响应一起丢弃
+POST_FIELDS = ('id', 'post_number', 'username', 'created_at', 'cooked')
+
+_topic_url = re.compile(r'/t/(?:[^/?#]+/)?(\d+)')
+
+
+def parse_topic_id(text: str) -> Optional[int]:
+    """解析话题 id，支持纯数字与话题链接（如 https://shuiyuan.sjtu.edu.cn/t/topic/123/45）"""
+    text = text.strip()
+    if text.isdigit():
+        return int(text)
+    match = _topic_url.search(text)
+    return int(match.group(1)) if match else None
+
+
+def _project_posts(posts: List[Dict]) -> List[Dict]:
+    return [{k: post[k] for k in POST_FIELDS if k in post} for post in posts]
+
+
+def fetch_topic(topic_id: int) -> Optional[Dict]:
+    """
+    获取话题元信息与帖子流
+
+    Returns:
+        {'id', 'title', 'posts_count', 'stream': [帖子 id], 'posts': [已附带的帖子]}，失败返回 None
+    """
+    try:
+        with profiling.stage('http'):
+            response = get_http_client().get(TOPIC_API.format(topic_id=topic_id))
+        profiling.count('requests')
+        if not response or response.status_code != 200:
+            print(f"获取话题 {topic_id} 失败: {response.status_code if response else 'Network Error'}")
+            return None
+        profiling.count('bytes', len(response.content))
+        with profiling.stage('json_decode'):
+            data = loads(response.content)
+    except Exception as e:
+        print(f"获取话题 {topic_id} 时出错: {e}")
+        return None
+
+    post_stream = data.get('post_stream') or {}
+    return {
+        'id': data.get('id', topic_id),
+        'title': data.get('title') or f'Topic {topic_id}',
+        'posts_count': data.get('posts_count'),
+        'stream': post_stream.get('stream') or [],
+        'posts': _project_posts(post_stream.get('posts') or []),
+    }
+
+
+def _fetch_posts_chunk(http_client, topic_id: int, post_ids: List[int]) -> Optional[List[Dict]]:
+    """
+    按 id 获取一批帖子
+
+    Returns:
+        帖子列表（已删除或无权查看的帖子不会返回），失败返回 None
+    """
+    query = "&".join(f"post_ids[]={post_id}" for post_id in post_ids)
+    url = f"{TOPIC_POSTS_API.format(topic_id=topic_id)}?{query}"
+    try:
+        with profiling.stage('http'):
+            response = http_client.get(url)
+        profiling.count('requests')
+        if not response or response.status_code != 200:
+            print(f"请求失败: {response.status_code if response else 'Network Error'}")
+            return None
+        profiling.count('bytes', len(response.content))
+        with profiling.stage('json_decode'):
+            posts = _project_posts((loads(response.content).get('post_stream') or {}).get('posts') or [])
+        profiling.count('pages')
+        return posts
+    except Exception as e:
+        print(f"获取帖子 {post_ids[0]}..{post_ids[-1]} 时出错: {e}")
+        return None
+
+
+def iter_topic_posts(topic: Dict, concurrency: Optional[int] = None) -> Iterator[List[Dict]]:
+    """
+    按帖子流顺序逐批产出话题中的帖子（生成器）
+
+    首批已附带正文的帖子直接产出，其余按 TOPIC_POST_CHUNK_SIZE 分批获取；
+    concurrency > 1 时用有界线程池预取后续批次，调用方停止迭代时未开始的请求会被取消，并等待已发出的请求结束。
+    某一批获取失败时跳过该批并继续。
+    """
+    concurrency = max(1, concurrency or FETCH_CONCURRENCY)
+    http_client = get_http_client(pool_size=concurrency)
+    topic_id = topic['id']
+
+    included = {post['id'] for post in topic['posts'] if 'id' in post}
+    if topic['posts']:
+        yield topic['posts']
+    remaining = [post_id for post_id in topic['stream'] if post_id not in included]
+    chunks = (remaining[i:i + TOPIC_POST_CHUNK_SIZE]
+              for i in range(0, len(remaining), TOPIC_POST_CHUNK_SIZE))
+
+    if concurrency == 1:
+        for chunk in chunks:
+            posts = _fetch_posts_chunk(http_client, topic_id, chunk)
+            if posts is not None:
+                yield posts
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = deque()
+    try:
+        for chunk in chunks:
+            pending.append(executor.submit(_fetch_posts_chunk, http_client, topic_id, chunk))
+            if len(pending) >= concurrency:
+                posts = pending.popleft().result()
+                if posts is not None:
+                    yield posts
+        while pending:
+            posts = pending.popleft().result()
+            if posts is not None:
+                yield posts
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class TopicAggregator(EmojiAggregator):
+    """
+    单话题的流式统计器
+
+    复用 EmojiAggregator 的提取、计数与并行逻辑，把其中“按话题”的分组维度用作“按参与者”，
+    话题本身的统计即全局统计。
+    """
+
+    def __init__(self, topic_id: int, title: str, **kwargs):
+        super().__init__(**kwargs)
+        self.topic_id = topic_id
+        self.title = title
+        self.participant_posts: Dict[str, int] = {}  # 参与者 -> 时间窗口内的帖子数
+
+    def add_post(self, post: Dict):
+        """统计单个帖子"""
+        username = post.get('username') or '(unknown)'
+        before = self.total_replies
+        self.add_reply({'created_at': post.get('created_at'), 'cooked': post.get('cooked', ''),
+                        'topic_id': username, 'title': username})
+        if self.total_replies > before:
+            self.participant_posts[username] = self.participant_posts.get(username, 0) + 1
+
+    def add_posts(self, posts: List[Dict]):
+        for post in posts:
+            self.add_post(post)
+
+    def emoji_by_topic(self) -> Dict:
+        """与用户统计相同的按话题格式（只有本话题一项，按帖子中的出现顺序）"""
+        _, ids = self.sequence_arrays()
+        return {self.topic_id: {'title': self.title, 'emojis': self.vocab.names(ids.tolist())}}
+
+    def emoji_by_participant(self) -> Dict:
+        """
+        按参与者的统计，参与者按 emoji 总数、帖子数降序
+
+        Returns:
+            {参与者: {'posts', 'total_emojis', 'unique_emojis', 'emoji_frequency'}}，
+            emoji_frequency 顺序同 Counter.most_common()
+        """
+        import numpy as np
+
+        topic_idx, ids = self.sequence_arrays()
+        keys, first, counts = np.unique((topic_idx << KEY_SHIFT) | ids, return_index=True, return_counts=True)
+        group, ids = split_keys(keys)
+        order = np.lexsort((first, -counts, group))
+        frequency: Dict[int, Dict[str, int]] = {}
+        for g, name, c in zip(group[order].tolist(), self.vocab.names(ids[order].tolist()),
+                              counts[order].tolist()):
+            frequency.setdefault(g, {})[name] = c
+
+        participants = {}
+        for username, posts in self.participant_posts.items():
+            entry = self.topics.get(username)
+            freq = frequency.get(entry[0], {}) if entry else {}
+            participants[username] = {
+                'posts': posts,
+                'total_emojis': sum(freq.values()),
+                'unique_emojis': len(freq),
+                'emoji_frequency': freq,
+            }
+        ranked = sorted(participants.items(), key=lambda item: (-item[1]['total_emojis'], -item[1]['posts']))
+        return dict(ranked)
+
+    def _build_result(self, username: str, since: Optional[str], until: Optional[str]) -> Dict:
+        result = super()._build_result(username, since, until)
+        result.update({
+            'topic_id': self.topic_id,
+            'title': self.title,
+            'participants': len(self.participant_posts),
+            'emoji_by_participant': self.emoji_by_participant(),
+        })
+        return result
+
+
+def topic_label(topic_id: int) -> str:
+    """话题结果的名称（用于输出文件名）"""
+    return f"topic_{topic_id}"
+
+
+def analyze_topic_emojis(topic_id: int, since: Optional[str] = None, until: Optional[str] = None,
+                         concurrency: Optional[int] = None,
+                         workers: Optional[int] = None) -> Dict:
+    """
+    分析单个话题的 emoji 使用情况
+
+    Args:
+        topic_id: 话题 id
+        since / until: 时间窗口（ISO8601），只统计窗口内的帖子
+        concurrency: 同时在途的帖子批量请求数，None 表示使用配置默认值
+        workers: emoji 提取进程数，None 表示使用配置默认值，0 表示 CPU 核数
+
+    Returns:
+        统计结果字典（在用户统计格式基础上增加 topic_id / title / participants / emoji_by_participant），
+        失败或无帖子时返回空字典
+    """
+    print(f"正在获取话题 {topic_id} 的帖子流...")
+    topic = fetch_topic(topic_id)
+    if topic is None:
+        return {}
+    stream_len = len(topic['stream'])
+    print(f"话题《{topic['title']}》: 共 {stream_len} 个帖子")
+    if topic['posts_count'] and stream_len < topic['posts_count']:
+        print(f"⚠️  帖子流只包含 {stream_len} / {topic['posts_count']} 个帖子，结果可能偏少")
+
+    aggregator = TopicAggregator(topic['id'], topic['title'],
+                                 since_dt=parse_iso_datetime(since) if since else None,
+                                 until_dt=parse_iso_datetime(until) if until else None,
+                                 workers=workers)
+    fetched = 0
+    for posts in iter_topic_posts(topic, concurrency=concurrency):
+        fetched += len(posts)
+        aggregator.add_posts(posts)
+        print(f"已获取 {fetched} / {stream_len} 个帖子", end='\r', flush=True)
+    print()
+    if fetched < stream_len:
+        print(f"⚠️  有 {stream_len - fetched} 个帖子未能获取（已删除、无权查看或请求失败）")
+
+    result = aggregator.to_result(topic_label(topic['id']), since, until)
+    if not result['total_replies']:
+        print(f"话题 {topic_id} 中没有符合条件的帖子")
+        return {}
+
+    print_statistics(result)
+    save_results(result)
+    return result
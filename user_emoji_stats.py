@@ -4,265 +4,593 @@
 """
 
 import json
-import re
 import os
-from typing import Dict, List, Optional
+import threading
+import time
+from array import array
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
-from collections import Counter
-from bs4 import BeautifulSoup
+from collections import Counter, deque
 
-from config import USER_ACTIONS_API, SHUIYUAN_BASE, OUTPUT_DIR, ITEMS_PER_PAGE
+from config import (SHUIYUAN_BASE, OUTPUT_DIR, FETCH_CONCURRENCY, BATCH_CONCURRENCY,
+                    EMOJI_EXTRACTOR, EXTRACT_WORKERS, EXTRACT_CHUNK_SIZE, PARALLEL_EXTRACT_MIN_POSTS,
+                    SIMILARITY_METRIC, SIMILARITY_TOP_K, DISTINCTIVE_EMOJIS,
+                    TOPIC_REPORT_PARTICIPANTS, SERVICE_HOST, SERVICE_PORT, SAMPLE_PAGES)
+from action_pages import (filter_actions_by_window, iter_action_pages, parse_iso_datetime,
+                          safe_filename, seek_until_page, window_suffix)
+from checkpoint import CrawlCheckpoint
+from emoji_catalog import get_catalog
+from emoji_counts import (KEY_SHIFT, UNDATED_DAY, SparseCounts, day_ordinal, get_vocabulary,
+                          most_common_order)
+from emoji_extract import EXTRACTORS
 from http_utils import get_http_client
+import profiling
+from reply_store import ReplyStore
 
-_invalid_fname = re.compile(r"[^A-Za-z0-9._-]+")
-
-def safe_filename(name: str) -> str:
-    return _invalid_fname.sub("_", name.strip()) or "user"
-
-def window_suffix(since: Optional[str], until: Optional[str]) -> str:
-    def fmt(d: Optional[str]) -> Optional[str]:
-        if not d:
-            return None
-        dt = parse_iso_datetime(d)
-        if not dt:
-            return None
-        # 输出到日级即可
-        return dt.strftime('%Y%m%d')
-    s, u = fmt(since), fmt(until)
-    if s and u:
-        return f"_{s}_to_{u}"
-    if s:
-        return f"_{s}_to_"
-    if u:
-        return f"__to_{u}"
-    return ""
-
-
-def parse_iso_datetime(dt_str: str) -> Optional[datetime]:
-    try:
-        # Discourse 返回类似 2024-05-12T03:14:15.000Z
-        return datetime.strptime(dt_str.replace('Z', '+0000'), '%Y-%m-%dT%H:%M:%S.%f%z')
-    except Exception:
-        try:
-            return datetime.strptime(dt_str.replace('Z', '+0000'), '%Y-%m-%dT%H:%M:%S%z')
-        except Exception:
-            return None
+if TYPE_CHECKING:
+    from archive import ArchiveWriter
+    from day_index import DayIndex
 
 
-def get_user_replies(username: str, max_pages: int = None,
-                     since_dt: Optional[datetime] = None,
-                     until_dt: Optional[datetime] = None) -> List[Dict]:
+def iter_user_replies(username: str, max_pages: int = None,
+                      since_dt: Optional[datetime] = None,
+                      until_dt: Optional[datetime] = None,
+                      concurrency: Optional[int] = None,
+                      known_post_ids: Optional[Set[int]] = None,
+                      progress: Optional[Callable[[int, int, int], None]] = None,
+                      cancel: Optional[threading.Event] = None,
+                      start_page: Optional[int] = None,
+                      checkpoint: Optional[CrawlCheckpoint] = None,
+                      archive: Optional["ArchiveWriter"] = None) -> Iterator[List[Dict]]:
     """
-    获取指定用户的所有回复
+    逐页获取指定用户的回复（生成器）
+    
+    每次产出一页中落在时间窗口内的回复，调用方可以边获取边处理，
+    无需在内存中保留完整的历史记录。
     
     Args:
         username: 用户名
         max_pages: 最大页数，None 表示获取所有
+        since_dt: 窗口起点，翻到整页都早于该时间时停止
+        until_dt: 窗口终点
+        concurrency: 同时在途的分页请求数，None 表示使用 FETCH_CONCURRENCY
+        known_post_ids: 已存储的 post_id，遇到其中任意一条即停止（增量刷新）
+        progress: 每处理完一页回调 progress(页码, 本页条数, 窗口内累计条数)
+        cancel: 取消事件，被设置后在下一页开始前停止翻页（未开始的预取请求随之取消）
+        start_page: 起始页码（断点续爬），None 表示从第一页或 until_dt 对应的页面开始
+        checkpoint: 断点记录，每页完成后更新，结束时记录是否完整、是否已无更多内容；
+                    某页获取失败时停止翻页并在其中记录失败原因
+        archive: 归档写入器，每页的原始记录（时间窗口过滤前）追加写入其中
         
-    Returns:
-        回复列表
+    Yields:
+        每页窗口内的回复列表（按 offset 顺序）
     """
     print(f'正在获取用户 @{username} 的回复...')
     
-    http_client = get_http_client()
-    all_replies = []
-    offset = 0
-    page = 1
+    total = 0
+    # 指定了结束时间时，先跳过全部晚于窗口的前缀页面（增量刷新需要从最新一页开始，不跳过）
+    if start_page is None:
+        start_page = seek_until_page(username, until_dt) if (until_dt and not known_post_ids) else 1
+    complete = exhausted = False
+    pages = iter_action_pages(username, max_pages,
+                               concurrency=concurrency or FETCH_CONCURRENCY,
+                               start_page=start_page)
     
-    while True:
-        if max_pages and page > max_pages:
-            break
-            
-        # filter=5 表示 replies (回复)
-        url = f"{USER_ACTIONS_API}?username={username}&filter=5&offset={offset}"
-        
-        try:
-            response = http_client.get(url)
+    try:
+        for page, user_actions in pages:
+            if cancel is not None and cancel.is_set():
+                print("已取消，停止翻页。")
+                break
             
-            if not response or response.status_code != 200:
-                print(f"请求失败: {response.status_code if response else 'Network Error'}")
+            if user_actions is None:
+                print(f"⚠️  第 {page} 页获取失败，停止翻页（已获取的结果不完整）")
+                if checkpoint is not None:
+                    checkpoint.fail(page, '请求失败')
                 break
-                
-            data = json.loads(response.text)
-            user_actions = data.get('user_actions', [])
             
             if not user_actions:
-                print(f"已获取所有回复，共 {len(all_replies)} 条")
+                print(f"已获取所有回复，共 {total} 条")
+                complete = exhausted = True
                 break
-                
-            # 过滤时间窗口（within-page）
-            filtered_actions: List[Dict] = []
-            page_times: List[datetime] = []
-            for ua in user_actions:
-                c = ua.get('created_at')
-                cdt = parse_iso_datetime(c) if c else None
-                if cdt:
-                    page_times.append(cdt)
-                # 应用窗口：since <= cdt <= until
-                if cdt:
-                    if since_dt and cdt < since_dt:
-                        continue
-                    if until_dt and cdt > until_dt:
-                        continue
-                filtered_actions.append(ua)
-
-            all_replies.extend(filtered_actions)
-            print(f"第 {page} 页: 获取了 {len(user_actions)} 条，窗口内 {len(filtered_actions)} 条 (累计 {len(all_replies)} 条)")
-
+            
+            reached_known = False
+            if known_post_ids:
+                # user_actions 按时间倒序，首条已存储回复之后的内容都已在库中
+                for i, ua in enumerate(user_actions):
+                    if ua.get('post_id') in known_post_ids:
+                        user_actions = user_actions[:i]
+                        reached_known = True
+                        break
+            
+            if archive is not None:
+                archive.add(user_actions)
+            filtered_actions, page_times = filter_actions_by_window(user_actions, since_dt, until_dt)
+            if checkpoint is not None:
+                filtered_actions = checkpoint.new_replies(filtered_actions)
+            total += len(filtered_actions)
+            print(f"第 {page} 页: 获取了 {len(user_actions)} 条，窗口内 {len(filtered_actions)} 条 (累计 {total} 条)")
+            if progress is not None:
+                progress(page, len(user_actions), total)
+            if checkpoint is not None:
+                checkpoint.page_done(page, filtered_actions)
+            yield filtered_actions
+            
+            if reached_known:
+                print("已到达本地库中的回复，停止翻页。")
+                complete = exhausted = True
+                break
+            
             # 提前停止条件：页面最老时间 < since_dt（后续只会更老）。
             # 边界：若 since_dt 远早于最老内容，则不触发停止条件，正常拉完。
             if since_dt and page_times:
-                oldest_on_page = min(page_times)
                 newest_on_page = max(page_times)
-                # 只有当本页全部时间都早于窗口起点，且上一页已经包含了与窗口交集时，才停止。
+                # 只有当本页全部时间都早于窗口起点时才停止。
                 if newest_on_page < since_dt:
                     print("达到开始时间阈值，停止翻页。")
+                    complete = exhausted = True
                     break
-            
-            offset += ITEMS_PER_PAGE
-            page += 1
-            
-        except Exception as e:
-            print(f"获取第 {page} 页时出错: {e}")
-            break
+        else:
+            # 达到页数上限
+            complete = True
+    finally:
+        pages.close()
+        if checkpoint is not None:
+            checkpoint.close(complete, exhausted)
+
+
+def get_user_replies(username: str, max_pages: int = None,
+                     since_dt: Optional[datetime] = None,
+                     until_dt: Optional[datetime] = None,
+                     concurrency: Optional[int] = None,
+                     known_post_ids: Optional[Set[int]] = None) -> List[Dict]:
+    """
+    获取指定用户的所有回复（参数同 iter_user_replies）
     
+    Returns:
+        回复列表（按 offset 顺序）
+    """
+    all_replies = []
+    for replies in iter_user_replies(username, max_pages, since_dt, until_dt,
+                                     concurrency=concurrency,
+                                     known_post_ids=known_post_ids):
+        all_replies.extend(replies)
     return all_replies
 
 
-def extract_emoji_from_html(html_content: str) -> List[str]:
+def refresh_user_replies(store: ReplyStore, username: str, max_pages: int = None,
+                         concurrency: Optional[int] = None,
+                         progress: Optional[Callable[[int, int, int], None]] = None,
+                         cancel: Optional[threading.Event] = None,
+                         archive: Optional["ArchiveWriter"] = None,
+                         checkpoint: Optional[CrawlCheckpoint] = None) -> int:
+    """
+    增量刷新本地回复库
+    
+    库中记录了每个用户已存储的历史是否连续完整（从最新一条直到最早的回复）：
+    - 完整时从 offset 0 开始翻页，遇到库中已有的回复即停止；
+    - 不完整（从未获取、上次获取受 max_pages 限制、被取消或中途失败）时翻过已有回复继续，
+      直到末页，补齐中间缺失的部分。
+    只有翻到末页或接上完整的已存储历史时，库才标记为完整。
+    
+    Args:
+        checkpoint: 记录本次翻页是否完成，None 表示内部新建（只在内存中记录）
+        
+    Returns:
+        新增回复数
+    """
+    if checkpoint is None:
+        checkpoint = CrawlCheckpoint(username, max_pages=max_pages, every=0)
+    complete = store.is_complete(username)
+    count = store.count(username)
+    known = None
+    if complete:
+        known = store.known_post_ids(username)
+        print(f"本地库中已有 @{username} 的 {count} 条回复，开始增量刷新")
+    elif count:
+        print(f"本地库中 @{username} 的 {count} 条回复不连续（上次获取未完成或受页数限制），翻页补齐")
+    before = count
+    for replies in iter_user_replies(username, max_pages,
+                                     concurrency=concurrency,
+                                     known_post_ids=known,
+                                     progress=progress, cancel=cancel,
+                                     checkpoint=checkpoint, archive=archive):
+        store.add_replies(username, replies, parse_time=parse_iso_datetime)
+    # 已存储的历史是否仍然连续：本次需翻到末页，或接上此前完整的历史
+    store.set_complete(username, checkpoint.exhausted)
+    count = store.count(username)
+    if not checkpoint.exhausted:
+        print(f"⚠️  本次未翻到末页，本地库中 @{username} 的历史不完整，下次刷新会继续补齐")
+    print(f"新增 {count - before} 条回复，本地库共 {count} 条")
+    return count - before
+
+
+def extract_emoji_from_html(html_content: str, engine: Optional[str] = None) -> List[str]:
     """
     从 HTML 内容中提取所有 emoji
-    支持: Unicode emoji、Discourse 短代码、HTML img 标签
+    支持: Discourse 短代码、HTML img 标签
     
     Args:
         html_content: HTML 内容
+        engine: 提取引擎（'fast' 或 'bs4'），None 表示使用 EMOJI_EXTRACTOR 配置
         
     Returns:
         emoji 列表
     """
-    emojis = []
-    
-    if not html_content:
-        return emojis
-    
-    # 1.（禁用）不再提取 Unicode emoji，严格限定为 :lowercase_with_underscores: 短代码
-    
-    # 2. 提取 Discourse 短代码 :emoji_name:
-    # 严格匹配：只包含小写英文字母和下划线
-    # 从 HTML 标签的 title 或 alt 属性中提取
-    # 例如：title=":yaoming:" 或 alt=":smiling_face_with_three_hearts:"
-    img_emoji_pattern = re.compile(r'(?:title|alt)="(:([a-z_]+):)"')
-    img_emojis = img_emoji_pattern.findall(html_content)
-    # 提取匹配到的 emoji 短代码（带冒号的完整形式）
-    # 只保留长度在 2-50 之间的
-    emoji_shortcodes = [match[0] for match in img_emojis if 2 <= len(match[1]) <= 50]
-    emojis.extend(emoji_shortcodes)
-
-    # 2.1 直接从文本中严格匹配形如 :lowercase_with_underscores: 的短代码
-    text_shortcode_pattern = re.compile(r':([a-z_]{2,50}):')
-    text_shortcodes = [f':{code}:' for code in text_shortcode_pattern.findall(html_content)]
-    emojis.extend(text_shortcodes)
-    
-    # 3. 提取 HTML img 标签中的 emoji（作为补充）
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        emoji_imgs = soup.find_all('img', class_='emoji')
-        for img in emoji_imgs:
-            emoji_name = img.get('title') or img.get('alt')
-            if emoji_name:
-                # 去掉冒号，提取 emoji 名称
-                emoji_clean = emoji_name.strip(':')
-                # 严格过滤：只保留小写字母和下划线组成的名称
-                if emoji_clean and re.match(r'^[a-z_]+$', emoji_clean) and 2 <= len(emoji_clean) <= 50:
-                    emojis.append(f':{emoji_clean}:')
-    except Exception as e:
-        pass  # HTML 解析失败不影响整体
+    with profiling.stage('extract'):
+        return EXTRACTORS[engine or EMOJI_EXTRACTOR](html_content)
+
+
+class EmojiAggregator:
+    """
+    流式 Emoji 统计器
+    
+    逐条消费回复，提取 emoji 后立即丢弃 HTML。
+    
+    短代码驻留为全局词表中的整数 id。每条回复只把 emoji id 追加到按出现顺序的紧凑数组
+    （每个 emoji 4 字节，另加每条含 emoji 的回复 12 字节的话题 / 日期 / 长度），
+    按话题的 emoji 列表由它按顺序分组得到；结果本身列出全部 emoji，因此这部分内存与
+    emoji 总数成正比。全局与按天的计数在读取前用 NumPy 批量归并进 SparseCounts，
+    排序规则与 Counter.most_common 完全一致。
+    
+    workers > 1 时，帖子按块分发到进程池并行提取，每块返回部分计数后按提交顺序合并，
+    结果与串行完全一致；帖子数不足 PARALLEL_EXTRACT_MIN_POSTS 时自动回退为串行。
+    """
+    
+    def __init__(self, since_dt: Optional[datetime] = None,
+                 until_dt: Optional[datetime] = None,
+                 workers: Optional[int] = None,
+                 engine: Optional[str] = None):
+        self.since_dt = since_dt
+        self.until_dt = until_dt
+        self.workers = resolve_workers(workers)
+        self.engine = engine
+        self.vocab = get_vocabulary()
+        self.total_replies = 0
+        self.replies_with_emoji = 0
+        self.emoji_counts = SparseCounts()        # 键: emoji id
+        self.day_emoji_counts = SparseCounts()    # 键: 日期序号 << 32 | emoji id
+        self.sequence_ids = array('I')            # 按出现顺序的 emoji id
+        # 每条含 emoji 的回复一项（按顺序）：话题序号、日期序号、emoji 个数
+        self.sequence_topics = array('I')
+        self.sequence_days = array('i')
+        self.sequence_lens = array('I')
+        # topic_id -> (话题序号, 标题)，按首次出现 emoji 的顺序
+        self.topics: Dict = {}
+        # 日期序号（无时间戳为 UNDATED_DAY）-> [回复数, 含 emoji 的回复数]
+        self.day_replies: Dict[int, List[int]] = {}
+        self._counted_posts = 0  # 已归并进计数的回复数（序列的前缀）
+        self.newest_dt: Optional[datetime] = None  # 计入的回复中最新的时间（按天索引增量更新用）
+        # 并行模式下待提取的 (content, topic_id, title, day)
+        self._pending_posts: List[Tuple] = []
+        self._executor = None
+        self._futures = deque()
+    
+    def add_reply(self, reply: Dict):
+        """统计单条回复"""
+        # 时间过滤
+        created_at = reply.get('created_at')
+        created_dt = parse_iso_datetime(created_at) if created_at else None
+        if self.since_dt and created_dt and created_dt < self.since_dt:
+            return
+        if self.until_dt and created_dt and created_dt > self.until_dt:
+            return
+        self.total_replies += 1
+        profiling.count('posts')
+        if created_dt and (self.newest_dt is None or created_dt > self.newest_dt):
+            self.newest_dt = created_dt
+        day = day_ordinal(created_dt) if created_dt else UNDATED_DAY
+        self.day_replies.setdefault(day, [0, 0])[0] += 1
+        
+        # 如果 cooked 为空，尝试使用 excerpt
+        content = reply.get('cooked', '') or reply.get('excerpt', '')
+        topic_id = reply.get('topic_id')
+        title = reply.get('title', f'Topic {topic_id}')
+        
+        if self.workers <= 1:
+            self._count_post(content, topic_id, title, day)
+            return
+        
+        self._pending_posts.append((content, topic_id, title, day))
+        if self._executor is None:
+            if len(self._pending_posts) >= PARALLEL_EXTRACT_MIN_POSTS:
+                from concurrent.futures import ProcessPoolExecutor
+                
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._submit_pending()
+        elif len(self._pending_posts) >= EXTRACT_CHUNK_SIZE:
+            self._submit_pending()
+    
+    def add_replies(self, replies: Iterable[Dict]):
+        """统计一批回复"""
+        for reply in replies:
+            self.add_reply(reply)
+    
+    def _topic_index(self, topic_id, title: str) -> int:
+        if topic_id not in self.topics:
+            self.topics[topic_id] = (len(self.topics), title)
+        return self.topics[topic_id][0]
+    
+    def _count_post(self, content: str, topic_id, title: str, day: int):
+        """提取单帖 emoji 并计数"""
+        emojis_in_post = extract_emoji_from_html(content, self.engine)
+        if not emojis_in_post:
+            return
+        
+        profiling.count('emojis', len(emojis_in_post))
+        with profiling.stage('aggregate'):
+            self._add_post_emojis(emojis_in_post, topic_id, title, day)
+    
+    def _add_post_emojis(self, emojis_in_post: List[str], topic_id, title: str, day: int):
+        """记录一条含 emoji 的回复（计数在读取前由 _sync_counts 批量归并）"""
+        self.replies_with_emoji += 1
+        self.day_replies[day][1] += 1
+        self.sequence_ids.extend(self.vocab.intern_all(emojis_in_post))
+        self.sequence_topics.append(self._topic_index(topic_id, title))
+        self.sequence_days.append(day)
+        self.sequence_lens.append(len(emojis_in_post))
+    
+    def _merge(self, posts: List[Tuple]):
+        """合并 worker 返回的 (topic_id, 标题, 日期序号, emoji 列表)（须按提交顺序调用，保证与串行结果一致）"""
+        profiling.count('emojis', sum(len(post[3]) for post in posts))
+        with profiling.stage('aggregate'):
+            for topic_id, title, day, emojis_in_post in posts:
+                self._add_post_emojis(emojis_in_post, topic_id, title, day)
+    
+    def _sync_counts(self):
+        """把序列中尚未归并的部分批量计入全局 / 按天计数，首次出现序号即在序列中的位置"""
+        if self._counted_posts == len(self.sequence_lens):
+            return
+        import numpy as np
+        
+        with profiling.stage('aggregate'):
+            start = self._counted_posts
+            lens = np.frombuffer(self.sequence_lens[start:], dtype=np.uint32).astype(np.int64)
+            days = np.frombuffer(self.sequence_days[start:], dtype=np.int32).astype(np.int64)
+            first = len(self.sequence_ids) - int(lens.sum())
+            ids = np.frombuffer(self.sequence_ids[first:], dtype=np.uint32).astype(np.int64)
+            pos = np.arange(first, first + len(ids), dtype=np.int64)
+            self.emoji_counts.add_arrays(ids, pos)
+            self.day_emoji_counts.add_arrays((np.repeat(days, lens) << KEY_SHIFT) | ids, pos)
+            self._counted_posts = len(self.sequence_lens)
+    
+    def sequence_arrays(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """按出现顺序的 (话题序号, emoji id)，每个 emoji 一项"""
+        import numpy as np
+        
+        self.finish()
+        lens = np.frombuffer(self.sequence_lens, dtype=np.uint32)
+        topic_idx = np.repeat(np.frombuffer(self.sequence_topics, dtype=np.uint32).astype(np.int64), lens)
+        return topic_idx, np.frombuffer(self.sequence_ids, dtype=np.uint32).astype(np.int64)
+    
+    def _submit_pending(self):
+        """把待提取帖子按块提交到进程池，在途块数超过上限时先合并最早的结果"""
+        posts, self._pending_posts = self._pending_posts, []
+        for i in range(0, len(posts), EXTRACT_CHUNK_SIZE):
+            chunk = posts[i:i + EXTRACT_CHUNK_SIZE]
+            self._futures.append(self._executor.submit(_count_posts_chunk, chunk, self.engine))
+            while len(self._futures) > 2 * self.workers:
+                self._merge(self._futures.popleft().result())
+    
+    def finish(self):
+        """处理剩余帖子并关闭进程池"""
+        if self._executor is None:
+            # 帖子数太少，进程池开销得不偿失，直接串行
+            for post in self._pending_posts:
+                self._count_post(*post)
+            self._pending_posts = []
+            self._sync_counts()
+            return
+        try:
+            self._submit_pending()
+            while self._futures:
+                self._merge(self._futures.popleft().result())
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._sync_counts()
+    
+    def emoji_frequency(self) -> List[Tuple[str, int]]:
+        """全部 emoji 的 (名称, 次数)，顺序同 Counter.most_common()"""
+        self.finish()
+        ids, counts, first = self.emoji_counts.arrays()
+        order = most_common_order(counts, first)
+        return list(zip(self.vocab.names(ids[order].tolist()), counts[order].tolist()))
+    
+    def emoji_by_topic(self) -> Dict:
+        """按话题的 emoji 列表（话题按首次出现 emoji 的顺序，话题内按回复中的出现顺序）"""
+        import numpy as np
+        
+        topic_idx, ids = self.sequence_arrays()
+        # 稳定排序只按话题分组，组内保持出现顺序
+        order = np.argsort(topic_idx, kind='stable')
+        names = self.vocab.names(ids[order].tolist())
+        ends = np.cumsum(np.bincount(topic_idx, minlength=len(self.topics))).tolist()
+        return {
+            topic_id: {'title': title, 'emojis': names[ends[idx - 1] if idx else 0:ends[idx]]}
+            for topic_id, (idx, title) in self.topics.items()
+        }
+    
+    def to_result(self, username: str, since: Optional[str] = None,
+                  until: Optional[str] = None) -> Dict:
+        """生成统计结果字典"""
+        with profiling.stage('to_result'):
+            return self._build_result(username, since, until)
     
-    # 最终统一严格过滤，避免任何非规范内容混入
-    final_filter = re.compile(r'^:[a-z_]{2,50}:$')
-    return [e[1:-1] for e in emojis if final_filter.match(e)]
+    def _build_result(self, username: str, since: Optional[str], until: Optional[str]) -> Dict:
+        frequency = self.emoji_frequency()
+        total_emojis = sum(c for _, c in frequency)
+        return {
+            'username': username,
+            'total_replies': self.total_replies,
+            'replies_with_emoji': self.replies_with_emoji,
+            'emoji_usage_rate': f"{self.replies_with_emoji / self.total_replies * 100:.2f}%" if self.total_replies else "0%",
+            'total_emojis': total_emojis,
+            'unique_emojis': len(frequency),
+            'emoji_frequency': dict(frequency),
+            'top_10_emojis': frequency[:10],
+            'emoji_by_topic': self.emoji_by_topic(),
+            'since': since,
+            'until': until
+        }
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """解析提取进程数：None 表示使用 EXTRACT_WORKERS 配置，0 表示 CPU 核数"""
+    if workers is None:
+        workers = EXTRACT_WORKERS
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    return max(1, workers)
+
+
+def _count_posts_chunk(posts: List[Tuple], engine: Optional[str] = None) -> List[Tuple]:
+    """
+    进程池 worker：提取一块帖子的 emoji
+    
+    各进程的词表 id 不一定一致，因此按短代码返回，由主进程驻留并计数。
+    
+    Returns:
+        含 emoji 的帖子按顺序的 (topic_id, 标题, 日期序号, emoji 列表)
+    """
+    extracted = []
+    for content, topic_id, title, day in posts:
+        emojis_in_post = extract_emoji_from_html(content, engine)
+        if emojis_in_post:
+            extracted.append((topic_id, title, day, emojis_in_post))
+    return extracted
+
+
+def open_checkpoint(username: str, since: Optional[str], until: Optional[str],
+                    max_pages: Optional[int], resume: bool, save: bool = True) -> CrawlCheckpoint:
+    """
+    准备本次翻页的断点记录
+    
+    resume 为 True 时尝试读取上次保存的进度，否则（或读取失败时）丢弃旧进度从头开始。
+    save 为 False 时只在内存中记录进度，不读取、不改动磁盘上的断点。
+    """
+    checkpoint = CrawlCheckpoint(username, since, until, max_pages, every=None if save else 0)
+    if not save:
+        return checkpoint
+    if resume and checkpoint.load():
+        if checkpoint.pages_done:
+            print(f"@{username} 从断点继续：已完成 {checkpoint.pages_done} 页（窗口内 {checkpoint.replies} 条），"
+                  f"从第 {checkpoint.next_page} 页开始")
+        else:
+            print(f"@{username} 的断点尚未完成任何页，重新开始翻页")
+        return checkpoint
+    if resume:
+        print(f"没有找到 @{username} 在该时间窗口下可继续的断点，从头开始")
+    elif checkpoint.exists():
+        print(f"发现 @{username} 未完成的断点（可用 --resume 继续），本次从头开始")
+    checkpoint.reset()
+    return checkpoint
 
 
 def analyze_user_emojis(username: str, max_pages: int = None, 
-                        since: Optional[str] = None, until: Optional[str] = None) -> Dict:
+                        since: Optional[str] = None, until: Optional[str] = None,
+                        concurrency: Optional[int] = None,
+                        refresh: bool = False,
+                        workers: Optional[int] = None,
+                        progress: Optional[Callable[[int, int, int], None]] = None,
+                        cancel: Optional[threading.Event] = None,
+                        save: bool = True,
+                        resume: bool = False,
+                        archive: bool = False) -> Dict:
     """
     分析指定用户的 emoji 使用情况
     
+    回复按页流式获取并即时统计，不在内存中保留完整的回复列表。
+    
     Args:
         username: 用户名
         max_pages: 最大页数
+        concurrency: 分页请求并发数，None 表示使用配置默认值
+        refresh: 为 True 时增量刷新本地回复库，并基于库中数据分析
+        workers: emoji 提取进程数，None 表示使用配置默认值，0 表示 CPU 核数
+        progress: 翻页进度回调，见 iter_user_replies
+        cancel: 取消事件，被设置后停止翻页，不保存任何结果
+        save: 为 False 时不打印摘要、不写任何文件（报告、断点、按天索引），供服务模式使用
+        resume: 为 True 时从上次中断保存的断点继续翻页（见 checkpoint 模块）
+        archive: 为 True 时把获取到的原始记录追加写入离线归档（见 archive 模块）
         
     Returns:
-        统计结果字典
+        统计结果字典，被取消时返回空字典；翻页中途失败时结果中带有 partial 标记
     """
-    # 获取用户所有回复（带窗口的翻页优化）
-    replies = get_user_replies(username, max_pages,
-                               since_dt=parse_iso_datetime(since) if since else None,
-                               until_dt=parse_iso_datetime(until) if until else None)
+    # 时间窗口解析
+    since_dt = parse_iso_datetime(since) if since else None
+    until_dt = parse_iso_datetime(until) if until else None
+    aggregator = EmojiAggregator(since_dt, until_dt, workers=workers)
+    checkpoint = None
+    writer = None
+    if archive:
+        from archive import ArchiveWriter
+        
+        writer = ArchiveWriter(username)
+    
+    try:
+        if refresh:
+            # 刷新不做断点续爬，只在内存中记录翻页是否完成
+            checkpoint = CrawlCheckpoint(username, max_pages=max_pages, every=0)
+            with ReplyStore() as store:
+                refresh_user_replies(store, username, max_pages, concurrency=concurrency,
+                                     progress=progress, cancel=cancel, archive=writer,
+                                     checkpoint=checkpoint)
+                aggregator.add_replies(store.iter_replies(username, since_dt=since_dt, until_dt=until_dt))
+        else:
+            checkpoint = open_checkpoint(username, since, until, max_pages, resume, save)
+            start_page, remaining = None, max_pages
+            if checkpoint.resumed:
+                for replies in checkpoint.iter_records():
+                    aggregator.add_replies(replies)
+                # 尚未完成任何页时（如第一页就失败）按结束时间重新定位起始页
+                start_page = checkpoint.next_page if checkpoint.pages_done else None
+                if max_pages:
+                    remaining = max_pages - checkpoint.pages_done
+        
+            if remaining is not None and remaining <= 0:
+                checkpoint.close(True)
+            else:
+                # 边获取边统计（带窗口的翻页优化）
+                for replies in iter_user_replies(username, remaining,
+                                                 since_dt=since_dt, until_dt=until_dt,
+                                                 concurrency=concurrency,
+                                                 progress=progress, cancel=cancel,
+                                                 start_page=start_page, checkpoint=checkpoint,
+                                                 archive=writer):
+                    aggregator.add_replies(replies)
+    finally:
+        if writer is not None:
+            writer.close()
+            print(f"已归档 {writer.records_written} 条原始记录到 {writer.directory}")
     
-    if not replies:
+    if cancel is not None and cancel.is_set():
+        aggregator.finish()
+        print(f"已取消对用户 @{username} 的分析，未保存结果")
+        if checkpoint is not None and checkpoint.every:
+            print("已获取的进度已保存，可用 --resume 继续")
+        return {}
+    
+    result = aggregator.to_result(username, since, until)
+    partial = checkpoint is not None and not checkpoint.complete
+    if partial:
+        result.update(checkpoint.partial_info())
+        if refresh:
+            print(f"⚠️  刷新未完成（{result['partial_reason']}），结果基于本地库中已有的回复")
+        else:
+            print(f"⚠️  翻页未完成（{result['partial_reason']}），结果只包含前 {checkpoint.pages_done} 页")
+        if checkpoint.every:
+            print(f"进度已保存到 {checkpoint.state_path}，可用 --resume 从第 {checkpoint.next_page} 页继续")
+    if not result['total_replies']:
         print(f"未找到用户 @{username} 的回复")
         return {}
     
-    print(f'\n开始分析 emoji...')
+    if not save:
+        return result
     
-    # 统计数据
-    all_emojis = []
-    post_with_emoji = 0
-    emoji_by_topic = {}
+    # 保存按天索引，之后任意时间窗口都可以直接从索引查询
+    from day_index import save_day_index
     
-    # 时间窗口解析
-    since_dt = parse_iso_datetime(since) if since else None
-    until_dt = parse_iso_datetime(until) if until else None
-
-    for i, reply in enumerate(replies):
-        # 时间过滤
-        created_at = reply.get('created_at')
-        created_dt = parse_iso_datetime(created_at) if created_at else None
-        if since_dt and created_dt and created_dt < since_dt:
-            continue
-        if until_dt and created_dt and created_dt > until_dt:
-            continue
-        # 尝试多个可能包含内容的字段
-        cooked = reply.get('cooked', '')
-        excerpt = reply.get('excerpt', '')
-        
-        # 如果 cooked 为空，尝试使用 excerpt
-        content = cooked if cooked else excerpt
-        
-        emojis_in_post = extract_emoji_from_html(content)
-        
-        if emojis_in_post:
-            post_with_emoji += 1
-            all_emojis.extend(emojis_in_post)
-            
-            # 按话题分类
-            topic_id = reply.get('topic_id')
-            topic_title = reply.get('title', f'Topic {topic_id}')
-            if topic_id not in emoji_by_topic:
-                emoji_by_topic[topic_id] = {
-                    'title': topic_title,
-                    'emojis': []
-                }
-            emoji_by_topic[topic_id]['emojis'].extend(emojis_in_post)
-    
-    # 统计频率
-    emoji_counter = Counter(all_emojis)
-    
-    # 生成结果
-    result = {
-        'username': username,
-        'total_replies': len(replies),
-        'replies_with_emoji': post_with_emoji,
-        'emoji_usage_rate': f"{post_with_emoji / len(replies) * 100:.2f}%" if replies else "0%",
-        'total_emojis': len(all_emojis),
-        'unique_emojis': len(emoji_counter),
-        'emoji_frequency': dict(emoji_counter.most_common()),
-        'top_10_emojis': emoji_counter.most_common(10),
-        'emoji_by_topic': emoji_by_topic,
-        'since': since,
-        'until': until
-    }
+    save_day_index(username, aggregator, since, until, complete=max_pages is None and not partial)
     
     # 打印统计摘要
     print_statistics(result)
@@ -273,11 +601,160 @@ def analyze_user_emojis(username: str, max_pages: int = None,
     return result
 
 
+def update_day_index(username: str, index: Optional["DayIndex"] = None,
+                     cancel: Optional[threading.Event] = None) -> Optional["DayIndex"]:
+    """
+    把索引生成之后的新回复补进按天索引（与增量刷新一样，只翻比索引中最新回复更新的页）
+    
+    只适用于完整且不限结束时间的索引（见 DayIndex.can_update）。
+    
+    Returns:
+        更新并保存后的索引；无法更新、翻页失败或被取消时返回 None
+    """
+    from datetime import timedelta
+    
+    from day_index import DayIndex
+    
+    index = index or DayIndex.load(username)
+    if index is None or not index.can_update():
+        return None
+    print(f"正在获取 @{username} 在索引中最新回复（{index.meta['newest']}）之后的回复...")
+    since_dt = index.newest() + timedelta(microseconds=1)
+    aggregator = EmojiAggregator(since_dt=since_dt, workers=1)
+    checkpoint = CrawlCheckpoint(username, every=0)
+    for replies in iter_user_replies(username, since_dt=since_dt, cancel=cancel, checkpoint=checkpoint):
+        # 没有时间戳的回复无法判断是否已在索引中，不重复计入
+        aggregator.add_replies(r for r in replies if r.get('created_at'))
+    if not checkpoint.complete:
+        print("获取新回复未完成，索引未更新")
+        return None
+    updated = index.merged(DayIndex.from_aggregator(username, aggregator, since=index.meta.get('since')))
+    try:
+        updated.save()
+    except Exception as e:
+        print(f"保存按天索引失败: {e}")
+        return None
+    print(f"按天索引已更新：新增 {aggregator.total_replies} 条回复")
+    return updated
+
+
+def analyze_from_index(username: str, since: Optional[str] = None,
+                       until: Optional[str] = None, fallback: bool = False,
+                       update: bool = False,
+                       cancel: Optional[threading.Event] = None) -> Dict:
+    """
+    从本地按天索引查询时间窗口的统计结果（不解析 HTML）
+    
+    索引由之前的完整统计自动生成，时间粒度为 UTC 自然日，结果中不含按话题统计。
+    只有索引覆盖该窗口（截至索引生成时间）且窗口两端落在日界上时才从索引查询，
+    此时结果与在线统计一致；否则 fallback 为 True 时改为在线统计。
+    update 为 True 时，窗口晚于索引生成时间的不限结束时间的完整索引先增量更新到现在
+    （只获取新回复），再从索引查询。
+    
+    Returns:
+        统计结果字典，无法从索引查询且不回退（或被取消）时返回空字典
+    """
+    from day_index import DayIndex, day_aligned
+    
+    since_dt = parse_iso_datetime(since) if since else None
+    until_dt = parse_iso_datetime(until) if until else None
+    index = DayIndex.load(username)
+    up_to_date = False
+    if (update and index is not None and not index.covers(since_dt, until_dt)
+            and index.can_update(since_dt) and day_aligned(since_dt, until_dt)):
+        updated = update_day_index(username, index, cancel=cancel)
+        if updated is not None:
+            index, up_to_date = updated, True
+        elif cancel is not None and cancel.is_set():
+            return {}
+    if index is None:
+        reason = f"未找到用户 @{username} 的按天索引"
+    elif not index.covers(since_dt, until_dt, up_to_date):
+        reason = (f"用户 @{username} 的索引覆盖范围 (since={index.meta.get('since') or '-'}, "
+                  f"until={index.meta.get('until') or '-'}, 生成于 {index.meta.get('built_at')}, "
+                  f"完整={index.meta.get('complete')}) 不包含所选窗口")
+    elif not day_aligned(since_dt, until_dt):
+        reason = "索引按 UTC 整日统计，窗口两端须为 00:00:00 与 23:59:59"
+    else:
+        reason = None
+    if reason:
+        if not fallback:
+            print(f"{reason}，无法从索引查询")
+            return {}
+        print(f"{reason}，改为在线统计")
+        return analyze_user_emojis(username, since=since, until=until)
+    
+    start = time.perf_counter()
+    result = index.query(since_dt, until_dt, since=since, until=until)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"索引查询完成（索引生成于 {index.meta.get('built_at')}，耗时 {elapsed_ms:.1f} ms）")
+    if not result['total_replies']:
+        print(f"所选窗口内没有用户 @{username} 的回复")
+        return {}
+    
+    print_statistics(result)
+    save_results(result)
+    return result
+
+
+def analyze_from_archive(username: str, since: Optional[str] = None,
+                         until: Optional[str] = None,
+                         workers: Optional[int] = None) -> Dict:
+    """
+    从离线归档重放原始记录做统计（不联网，不需要 Cookie）
+    
+    归档由 --archive 获取时写入；统计结果与在线获取相同记录时一致，含按话题统计。
+    
+    Returns:
+        统计结果字典，归档不存在或窗口内没有回复时返回空字典
+    """
+    from archive import ArchiveReader
+    
+    reader = ArchiveReader(username)
+    if not reader.exists():
+        print(f"未找到用户 @{username} 的归档，请先使用 --archive 获取一次")
+        return {}
+    summary = reader.summary()
+    print(f"正在读取 @{username} 的归档: {summary['records']} 条记录，{summary['blocks']} 个块，"
+          f"{summary['shards']} 个分片（更新于 {summary['updated_at']}）")
+    
+    since_dt = parse_iso_datetime(since) if since else None
+    until_dt = parse_iso_datetime(until) if until else None
+    aggregator = EmojiAggregator(since_dt, until_dt, workers=workers)
+    start = time.perf_counter()
+    for records in reader.iter_records(since_dt, until_dt):
+        aggregator.add_replies(records)
+    result = aggregator.to_result(username, since, until)
+    elapsed = time.perf_counter() - start
+    print(f"归档重放完成: 读取 {reader.blocks_read} 个块，按时间跳过 {reader.blocks_skipped} 个，"
+          f"去除重复 {reader.duplicates} 条，耗时 {elapsed:.2f} 秒")
+    if not result['total_replies']:
+        print(f"归档中没有符合条件的 @{username} 的回复")
+        return {}
+    
+    print_statistics(result)
+    save_results(result)
+    return result
+
+
+def result_subject(result: Dict) -> str:
+    """统计对象的显示名称：用户或话题"""
+    if result.get('topic_id') is not None:
+        return f"话题《{result['title']}》"
+    return f"用户 @{result['username']}"
+
+
 def print_statistics(result: Dict):
     """打印统计结果摘要"""
     print("\n" + "="*60)
-    print(f"用户 @{result['username']} 的 Emoji 使用统计")
+    print(f"{result_subject(result)} 的 Emoji 使用统计")
     print("="*60)
+    if result.get('partial'):
+        print(f"⚠️  结果不完整: {result['partial_reason']}（只包含前 {result['pages_done']} 页）")
+    if result.get('from_index'):
+        print(f"来自按天索引（生成于 {result['index_built_at']}），不含按话题统计")
+    if result.get('topic_id') is not None:
+        print(f"参与者: {result['participants']}")
     print(f"总回复数: {result['total_replies']}")
     print(f"包含 Emoji 的回复数: {result['replies_with_emoji']}")
     print(f"Emoji 使用率: {result['emoji_usage_rate']}")
@@ -295,110 +772,51 @@ def print_statistics(result: Dict):
 
 
 def get_emoji_path(emoji:str)->str:
-    """根据 emoji 名称获取本地图片路径"""
-    from itertools import chain 
-    default_path = f"emoji/{emoji}.png"
-    if os.path.exists(default_path):
-        return default_path
-    with open("emojis.json","r",encoding="UTF-8") as file:
-        data = json.load(file)
-    
-    for i in chain(data.get("公司",[]),data.get("软件服务",[]),data.get("default",[]),data.get("游戏",[]),data.get("学校",[]),data.get("编程语言",[])):
-        if i.get("name") == emoji:
-            candidate = "emoji/"+str(i.get("url",""))[32:]
-            return candidate
-    # 未找到则返回空字符串，调用方用 exists 校验
-    return ""
+    """根据 emoji 名称获取本地图片路径，未找到返回空字符串"""
+    return get_catalog().image_path(emoji)
 
 def save_results(result: Dict):
     """保存统计结果到文件"""
     username = result['username']
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    # 生成 Top10 柱状图
+    # 生成 Top10 柱状图（非交互式后端，复用 Figure 与缩略图缓存）
+    from chart_render import get_chart_renderer
+    
+    fname_user = safe_filename(username)
+    # 索引查询的结果单独保存，不覆盖在线统计的结果文件
+    suffix = window_suffix(result.get('since'), result.get('until')) + ('_from_index' if result.get('from_index') else '')
+    chart_path = f"{OUTPUT_DIR}/{fname_user}_top10{suffix}.png"
     try:
-        from matplotlib import pyplot as plt
-        from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-        import matplotlib.image as mpimg
-        import numpy as np
-
-
-        plt.rcParams["font.sans-serif"] = ["Microsoft YaHei"]
-        plt.rcParams["axes.unicode_minus"]=False
-        top10 = result['top_10_emojis']
-        if top10:
-            emojis = [e for e,_ in top10]
-            counts = [c for _,c in top10]
-            emoji_paths=[]
-            for i in emojis:
-                emoji_paths.append(get_emoji_path(i))
-
-            fig, ax = plt.subplots(figsize=(16, 9))
-            x_pos = np.arange(len(emojis))
-            bars = ax.bar(x_pos, counts, 
-                        color='#1DA1F2',
-                        alpha=0.75)
-            
-            ax.set_ylabel('Counts')
-            ax.set_title(f'Top 10 Emojis for @{username}')
-            ax.set_ylim(0, max(counts)*1.1)
-            ax.set_xticks([])
-            
-            for i, (emoji, count) in enumerate(zip(emojis, counts)):
-                if os.path.exists(emoji_paths[i]):
-                    try:
-                        from PIL import Image
-
-                        #预处理图片：调整大小、背景透明等
-                        img = Image.open(emoji_paths[i])
-                        img=img.convert("RGBA")
-                        original_width, original_height = img.size
-                        ratio = 100 / original_height
-                        new_width = int(original_width * ratio)
-                        img = img.resize((new_width,100),Image.Resampling.LANCZOS)
-                        # 使用imshow显示图片，需要计算合适的位置和大小
-                        imagebox = OffsetImage(img, zoom=0.25)
-                        ab = AnnotationBbox(imagebox, (i, 0),
-                                        xycoords='data',
-                                        frameon=False,
-                                        box_alignment=(0.5, 1))
-                        ax.add_artist(ab)
-                    except Exception as e:
-                        print(f"无法加载logo {emoji_paths[i]}: {e}")
-                
-                # 添加两行文字
-                # 第一行：表情符号
-                ax.text(i,  -0.07*max(counts), emoji, 
-                    ha='center', va='top', fontsize=8)
-                
-                # 第二行：计数
-                ax.text(i,  -0.1*max(counts), f"{count}", 
-                    ha='center', va='top', fontsize=11, color='gray')
-                        
-            fname_user = safe_filename(username)
-            chart_path = f"{OUTPUT_DIR}/{fname_user}_top10{window_suffix(result.get('since'), result.get('until'))}.png"
-
-            plt.show()
-            plt.savefig(chart_path, dpi=150)
-            plt.close()
-        else:
+        with profiling.stage('chart'):
+            rendered = get_chart_renderer().render_top10(
+                username, result['top_10_emojis'], chart_path,
+                title=f"Top 10 Emojis in topic {result['topic_id']}" if result.get('topic_id') is not None else None)
+        if not rendered:
             chart_path = None
     except Exception as e:
         chart_path = None
         print(e)
 
     # 保存 JSON
-    fname_user = safe_filename(username)
-    json_path = f"{OUTPUT_DIR}/{fname_user}_emoji_stats{window_suffix(result.get('since'), result.get('until'))}.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
+    json_path = f"{OUTPUT_DIR}/{fname_user}_emoji_stats{suffix}.json"
+    with profiling.stage('write_json'), open(json_path, 'w', encoding='utf-8') as f:
         json.dump(result, f, ensure_ascii=False, indent=2)
     
     # 保存 Markdown 报告
-    md_path = f"{OUTPUT_DIR}/{fname_user}_emoji_report{window_suffix(result.get('since'), result.get('until'))}.md"
-    with open(md_path, 'w', encoding='utf-8') as f:
-        f.write(f"# 用户 @{username} 的 Emoji 使用报告\n\n")
+    md_path = f"{OUTPUT_DIR}/{fname_user}_emoji_report{suffix}.md"
+    with profiling.stage('write_markdown'), open(md_path, 'w', encoding='utf-8') as f:
+        f.write(f"# {result_subject(result)} 的 Emoji 使用报告\n\n")
+        if result.get('partial'):
+            f.write(f"> ⚠️ **结果不完整**：{result['partial_reason']}，只包含前 {result['pages_done']} 页的回复。"
+                    f"使用 `--resume` 可从第 {result['resume_from_page']} 页继续。\n\n")
+        if result.get('from_index'):
+            f.write(f"> 由按天索引生成（索引生成于 {result['index_built_at']}），不含按话题统计。\n\n")
         
         f.write("## 统计概览\n\n")
+        if result.get('topic_id') is not None:
+            f.write(f"- **话题**: [{result['title']}]({SHUIYUAN_BASE}t/topic/{result['topic_id']})\n")
+            f.write(f"- **参与者**: {result['participants']}\n")
         f.write(f"- **总回复数**: {result['total_replies']}\n")
         f.write(f"- **包含 Emoji 的回复数**: {result['replies_with_emoji']}\n")
         f.write(f"- **Emoji 使用率**: {result['emoji_usage_rate']}\n")
@@ -418,6 +836,16 @@ def save_results(result: Dict):
         if chart_path:
             f.write("\n![Top 10 Emojis](" + chart_path.replace('\\\\', '/') + ")\n\n")
         
+        if result.get('emoji_by_participant'):
+            participants = list(result['emoji_by_participant'].items())
+            f.write(f"\n## 按参与者统计（前 {min(len(participants), TOPIC_REPORT_PARTICIPANTS)} / {len(participants)} 位）\n\n")
+            f.write("| 参与者 | 帖子数 | Emoji总数 | 不同种类 | Top 5 |\n")
+            f.write("|--------|--------|-----------|----------|-------|\n")
+            for name, data in participants[:TOPIC_REPORT_PARTICIPANTS]:
+                top5 = ', '.join(f"{e}({c})" for e, c in list(data['emoji_frequency'].items())[:5])
+                f.write(f"| @{name} | {data['posts']} | {data['total_emojis']} | "
+                        f"{data['unique_emojis']} | {top5 or '-'} |\n")
+        
         f.write("\n## 完整 Emoji 使用频率\n\n")
         f.write("| Emoji | 使用次数 | 占比 |\n")
         f.write("|-------|----------|------|\n")
@@ -441,33 +869,112 @@ def save_results(result: Dict):
     print(f"  - Markdown: {md_path}")
 
 
-def batch_analyze_users(usernames: List[str], max_pages: int = None):
-    """批量分析多个用户"""
+def batch_analyze_users(usernames: List[str], max_pages: int = None,
+                        concurrency: Optional[int] = None, refresh: bool = False,
+                        workers: Optional[int] = None,
+                        since: Optional[str] = None, until: Optional[str] = None,
+                        metric: Optional[str] = None, top_k: Optional[int] = None,
+                        resume: bool = False, archive: bool = False):
+    """
+    批量分析多个用户
+    
+    默认由 BatchScheduler 在同一个全局请求预算（concurrency，None 表示 BATCH_CONCURRENCY）下
+    并发、轮转地爬取所有用户，全部完成后再逐个输出结果并生成对比报告（某个用户出错时跳过该用户）；
+    refresh 模式下逐个用户增量刷新本地库。
+    metric / top_k 传给 generate_comparison_report；resume 为 True 时各用户从各自的断点继续；
+    archive 为 True 时把各用户的原始记录写入离线归档。
+    """
     results = {}
     
-    for i, username in enumerate(usernames, 1):
-        print(f"\n{'='*60}")
-        print(f"[{i}/{len(usernames)}] 正在分析用户: @{username}")
-        print(f"{'='*60}\n")
+    if refresh:
+        for i, username in enumerate(usernames, 1):
+            print(f"\n{'='*60}")
+            print(f"[{i}/{len(usernames)}] 正在分析用户: @{username}")
+            print(f"{'='*60}\n")
+            
+            try:
+                result = analyze_user_emojis(username, max_pages, since=since, until=until,
+                                             concurrency=concurrency, refresh=True,
+                                             workers=workers, archive=archive)
+                if result:
+                    results[username] = result
+            except Exception as e:
+                print(f"分析用户 @{username} 时出错: {e}")
+                continue
+    else:
+        from batch_scheduler import BatchScheduler
+        from day_index import save_day_index
         
+        checkpoints = {username: open_checkpoint(username, since, until, max_pages, resume)
+                       for username in dict.fromkeys(usernames)}
+        writers = {}
+        if archive:
+            from archive import ArchiveWriter
+            
+            writers = {username: ArchiveWriter(username) for username in checkpoints}
+        print(f"正在并发获取 {len(usernames)} 个用户的回复...")
+        scheduler = BatchScheduler(usernames, max_pages,
+                                   since_dt=parse_iso_datetime(since) if since else None,
+                                   until_dt=parse_iso_datetime(until) if until else None,
+                                   budget=concurrency, checkpoints=checkpoints, archives=writers)
         try:
-            result = analyze_user_emojis(username, max_pages)
+            aggregators = scheduler.run()
+        finally:
+            for writer in writers.values():
+                writer.close()
+        if writers:
+            print(f"已归档 {sum(w.records_written for w in writers.values())} 条原始记录")
+        for username, aggregator in aggregators.items():
+            try:
+                result = aggregator.to_result(username, since, until)
+                checkpoint = checkpoints[username]
+                if not checkpoint.complete:
+                    result.update(checkpoint.partial_info())
+                if not result['total_replies']:
+                    print(f"未找到用户 @{username} 的回复")
+                    continue
+                save_day_index(username, aggregator, since, until,
+                               complete=max_pages is None and checkpoint.complete)
+                print_statistics(result)
+                save_results(result)
+            except Exception as e:
+                print(f"分析用户 @{username} 时出错: {e}")
+                continue
             results[username] = result
-        except Exception as e:
-            print(f"分析用户 @{username} 时出错: {e}")
-            continue
     
     # 生成对比报告
     if len(results) > 1:
-        generate_comparison_report(results)
+        generate_comparison_report(results, metric=metric, top_k=top_k)
     
     return results
 
 
-def generate_comparison_report(results: Dict[str, Dict]):
-    """生成多用户对比报告"""
+def generate_comparison_report(results: Dict[str, Dict], metric: Optional[str] = None,
+                               top_k: Optional[int] = None):
+    """
+    生成多用户对比报告
+    
+    除概览与各用户 Top 5 外，基于稀疏 用户×emoji 矩阵给出每个用户最相似的用户与特色 emoji，
+    并把相似度结果另存为 JSON。
+    
+    Args:
+        results: {用户名: 统计结果}
+        metric: 相似度 cosine / jaccard，None 表示使用配置默认值
+        top_k: 每个用户列出的相似用户数，None 表示使用配置默认值
+    """
+    from similarity import compare_users
+    
+    metric = metric or SIMILARITY_METRIC
+    top_k = top_k or SIMILARITY_TOP_K
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
+    start = time.perf_counter()
+    with profiling.stage('similarity'):
+        comparison = compare_users(results, metric=metric, top_k=top_k,
+                                   distinctive_n=DISTINCTIVE_EMOJIS)
+    print(f"相似度计算完成（{len(results)} 个用户，{metric}，"
+          f"{comparison['backend']}，耗时 {time.perf_counter() - start:.2f}s）")
+    
     md_path = f"{OUTPUT_DIR}/comparison_report.md"
     with open(md_path, 'w', encoding='utf-8') as f:
         f.write("# 多用户 Emoji 使用对比报告\n\n")
@@ -481,6 +988,21 @@ def generate_comparison_report(results: Dict[str, Dict]):
                    f"{result['replies_with_emoji']} | {result['emoji_usage_rate']} | "
                    f"{result['total_emojis']} | {result['unique_emojis']} |\n")
         
+        metric_name = "余弦相似度" if metric == "cosine" else "Jaccard 相似度"
+        f.write(f"\n## 最相似的用户（{metric_name}，Top {top_k}）\n\n")
+        f.write("| 用户名 | 相似用户 |\n")
+        f.write("|--------|----------|\n")
+        for username, entry in comparison['users'].items():
+            similar = ', '.join(f"@{other} ({score:.3f})" for other, score in entry['similar']) or '-'
+            f.write(f"| @{username} | {similar} |\n")
+        
+        f.write("\n## 特色 Emoji（相对其他用户明显偏爱）\n\n")
+        f.write("| 用户名 | 特色 Emoji |\n")
+        f.write("|--------|------------|\n")
+        for username, entry in comparison['users'].items():
+            distinctive = ', '.join(f"{emoji}({count})" for emoji, count, _ in entry['distinctive']) or '-'
+            f.write(f"| @{username} | {distinctive} |\n")
+        
         f.write("\n## 各用户 Top 5 Emoji\n\n")
         for username, result in results.items():
             f.write(f"### @{username}\n\n")
@@ -488,22 +1010,22 @@ def generate_comparison_report(results: Dict[str, Dict]):
                 f.write(f"{i}. {emoji} ({count}次)  \n")
             f.write("\n")
     
+    json_path = f"{OUTPUT_DIR}/comparison_similarity.json"
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(comparison, f, ensure_ascii=False, indent=2)
+    
     print(f"\n对比报告已保存: {md_path}")
+    print(f"相似度结果已保存: {json_path}")
 
 
 if __name__ == "__main__":
     import argparse
+    import sys
     from http_utils import CookieManager
-    import os
-    import webbrowser
-    import tkinter as tk
-    from tkinter import ttk, messagebox, filedialog
-    try:
-        from tkcalendar import DateEntry
-        _tkcalendar_ok = True
-    except Exception:
-        _tkcalendar_ok = False
-    from datetime import timezone
+    
+    # 批量、话题、抽样、服务与 GUI 模块从 user_emoji_stats 导入统计器和报告函数，
+    # 让它们拿到正在运行的这份模块，而不是以新名字再加载一次
+    sys.modules.setdefault('user_emoji_stats', sys.modules[__name__])
     
     parser = argparse.ArgumentParser(
         description="统计水源社区用户的 Emoji 使用情况"
@@ -520,12 +1042,30 @@ if __name__ == "__main__":
         type=str,
         help='批量分析多个用户'
     )
+    parser.add_argument(
+        '-t', '--topic',
+        nargs='+',
+        type=str,
+        help='统计话题中全部帖子的 emoji（话题 id 或链接），并按参与者分组'
+    )
     parser.add_argument(
         '-p', '--max-pages',
         type=int,
         default=None,
         help='最大分析页数（默认: 全部）'
     )
+    parser.add_argument(
+        '-c', '--concurrency',
+        type=int,
+        default=None,
+        help=f'分页请求并发数（默认: {FETCH_CONCURRENCY}；批量模式下为所有用户共享的预算，默认: {BATCH_CONCURRENCY}）'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help=f'emoji 提取进程数，0 表示 CPU 核数（默认: {EXTRACT_WORKERS}）'
+    )
     parser.add_argument(
         '--since',
         type=str,
@@ -538,6 +1078,87 @@ if __name__ == "__main__":
         default=None,
         help='结束时间 (ISO8601, 如 2024-12-31T23:59:59Z)'
     )
+    parser.add_argument(
+        '--sample',
+        nargs='?',
+        type=int,
+        const=0,
+        default=None,
+        metavar='PAGES',
+        help=f'抽样估计：在全部历史页中分层随机抽取 PAGES 页，给出带置信区间的近似统计'
+             f'（默认: {SAMPLE_PAGES} 页；-p/--refresh/--resume/--archive 不生效）'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='抽样的随机种子（默认随机，结果中会记录，用于复现）'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='增量刷新本地回复库后再分析（只获取新回复）'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='从上次中断（失败、取消或进程退出）时保存的断点继续翻页'
+    )
+    parser.add_argument(
+        '--archive',
+        action='store_true',
+        help='获取时把原始记录追加写入离线归档（压缩 JSONL 分片），供 --from-archive 使用'
+    )
+    parser.add_argument(
+        '--from-archive',
+        action='store_true',
+        help='完全从离线归档重放统计（不联网，不需要 Cookie；-p 不生效）'
+    )
+    parser.add_argument(
+        '--no-http-cache',
+        action='store_true',
+        help='不使用 HTTP 条件请求缓存（每页都完整下载）'
+    )
+    parser.add_argument(
+        '--from-index',
+        action='store_true',
+        help='直接从本地按天索引查询 --since/--until 窗口（不联网，需先完整统计一次；窗口不在 UTC 日界上或晚于索引生成时间时改为在线统计）'
+    )
+    parser.add_argument(
+        '--similarity',
+        choices=['cosine', 'jaccard'],
+        default=None,
+        help=f'对比报告中用户相似度的计算方式（默认: {SIMILARITY_METRIC}）'
+    )
+    parser.add_argument(
+        '--top-k',
+        type=int,
+        default=None,
+        help=f'对比报告中每个用户列出的相似用户数（默认: {SIMILARITY_TOP_K}）'
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='',
+        default=None,
+        metavar='PATH',
+        help='记录各阶段耗时与计数，结束时打印摘要并写入 JSON（默认: 输出目录下的 profile_<时间>.json）'
+    )
+    parser.add_argument(
+        '--profile-mode',
+        choices=profiling.PROFILE_MODES,
+        default='timers',
+        help='剖析模式：timers 仅阶段计时 / cprofile 函数热点 / tracemalloc 内存分配（默认: timers）'
+    )
+    parser.add_argument(
+        '--serve',
+        nargs='?',
+        type=int,
+        const=0,
+        default=None,
+        metavar='PORT',
+        help=f'以本地 HTTP/JSON 服务运行，结果缓存在内存中并在后台刷新（默认端口: {SERVICE_PORT}）'
+    )
     parser.add_argument(
         '--set-cookie',
         type=str,
@@ -552,12 +1173,66 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
+    # 性能剖析：进程退出（含 exit()）时打印摘要并写入 JSON
+    if args.profile is not None:
+        import atexit
+        
+        def _finish_profile():
+            profiler = profiling.get_profiler()
+            profiler.stop()
+            report = profiler.report()
+            profiler.print_summary(report)
+            path = args.profile or os.path.join(
+                OUTPUT_DIR, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            print(f"剖析结果已保存: {profiler.dump(path, report)}")
+        
+        profiling.get_profiler().start(args.profile_mode)
+        atexit.register(_finish_profile)
+    
     # 设置 Cookie
     if args.set_cookie:
         CookieManager.save_cookie(args.set_cookie)
         print("Cookie 已保存")
         exit(0)
     
+    # 从按天索引查询，不需要 Cookie；索引无法给出一致结果时，有 Cookie 则改为在线统计
+    if args.from_index:
+        usernames = args.batch or ([args.username] if args.username else [])
+        if not usernames:
+            print("请指定用户名")
+            exit(1)
+        index_results = {}
+        for username in usernames:
+            has_cookie = bool(CookieManager.read_cookie())
+            result = analyze_from_index(username, since=args.since, until=args.until,
+                                        fallback=has_cookie, update=has_cookie)
+            if result:
+                index_results[username] = result
+        if len(index_results) > 1:
+            generate_comparison_report(index_results, metric=args.similarity, top_k=args.top_k)
+        exit(0)
+    
+    # 从离线归档重放，不需要 Cookie
+    if args.from_archive:
+        usernames = args.batch or ([args.username] if args.username else [])
+        if not usernames:
+            print("请指定用户名")
+            exit(1)
+        archive_results = {}
+        for username in usernames:
+            result = analyze_from_archive(username, since=args.since, until=args.until,
+                                          workers=args.workers)
+            if result:
+                archive_results[username] = result
+        if len(archive_results) > 1:
+            generate_comparison_report(archive_results, metric=args.similarity, top_k=args.top_k)
+        exit(0)
+    
+    if args.no_http_cache:
+        from http_utils import set_http_cache_enabled
+        
+        set_http_cache_enabled(False)
+    
     # 检查 Cookie
     cookie_string = CookieManager.read_cookie()
     if not cookie_string and not args.gui:
@@ -567,212 +1242,51 @@ if __name__ == "__main__":
         exit(1)
     
     # 执行分析
+    if args.serve is not None:
+        # 服务模式：常驻进程，结果缓存在内存中
+        from stats_service import serve
+        
+        serve(SERVICE_HOST, args.serve or SERVICE_PORT)
+        exit(0)
+    
     if args.gui:
-        # 简单 GUI（按天选择）
-        def run_gui():
-            root = tk.Tk()
-            root.title("Emoji 统计工具")
-            root.geometry("620x420")
-            try:
-                root.tk.call("tk", "scaling", 1.25)
-            except Exception:
-                pass
-
-            style = ttk.Style()
-            try:
-                style.theme_use('clam')
-            except Exception:
-                pass
-            style.configure('TButton', padding=6)
-            style.configure('TLabel', padding=4)
-            style.configure('TEntry', padding=4)
-
-            main = ttk.Frame(root, padding=20)
-            main.pack(fill=tk.BOTH, expand=True)
-
-            # 用户名
-            ttk.Label(main, text="用户名:").grid(row=0, column=0, sticky=tk.W)
-            username_var = tk.StringVar()
-            username_entry = ttk.Entry(main, textvariable=username_var, width=32)
-            username_entry.grid(row=0, column=1, columnspan=2, sticky=tk.W)
-
-            # since/until（按天，日历选择器优先）容器
-            date_frame = ttk.Frame(main)
-            date_frame.grid(row=1, column=0, columnspan=3, sticky=tk.W)
-
-            ttk.Label(date_frame, text="开始日期:").grid(row=0, column=0, sticky=tk.W)
-            ttk.Label(date_frame, text="结束日期:").grid(row=1, column=0, sticky=tk.W)
-            since_var = tk.StringVar()
-            until_var = tk.StringVar()
-
-            if _tkcalendar_ok:
-                since_picker = DateEntry(date_frame, date_pattern='yyyy-mm-dd', width=14)
-                until_picker = DateEntry(date_frame, date_pattern='yyyy-mm-dd', width=14)
-                since_picker.grid(row=0, column=1, sticky=tk.W)
-                until_picker.grid(row=1, column=1, sticky=tk.W)
-                since_lbl = ttk.Label(date_frame, text="(可留空)")
-                until_lbl = ttk.Label(date_frame, text="(可留空)")
-                since_lbl.grid(row=0, column=2, sticky=tk.W)
-                until_lbl.grid(row=1, column=2, sticky=tk.W)
-            else:
-                since_entry = ttk.Entry(date_frame, textvariable=since_var, width=16)
-                since_entry.grid(row=0, column=1, sticky=tk.W)
-                until_entry = ttk.Entry(date_frame, textvariable=until_var, width=16)
-                until_entry.grid(row=1, column=1, sticky=tk.W)
-                since_lbl = ttk.Label(date_frame, text="YYYY-MM-DD (可留空)")
-                until_lbl = ttk.Label(date_frame, text="YYYY-MM-DD (可留空)")
-                since_lbl.grid(row=0, column=2, sticky=tk.W)
-                until_lbl.grid(row=1, column=2, sticky=tk.W)
-
-            # 窗口范围选择（全部/自定义）
-            mode_var = tk.StringVar(value='all')
-            ttk.Label(main, text="时间范围:").grid(row=3, column=0, sticky=tk.W)
-            r_all = ttk.Radiobutton(main, text="全部", variable=mode_var, value='all')
-            r_custom = ttk.Radiobutton(main, text="自定义", variable=mode_var, value='custom')
-            r_all.grid(row=3, column=1, sticky=tk.W)
-            r_custom.grid(row=3, column=2, sticky=tk.W)
-
-            def update_date_widgets():
-                if mode_var.get() == 'custom':
-                    date_frame.grid()
-                    if 'quick_frame' in locals():
-                        quick_frame.grid()
-                else:
-                    date_frame.grid_remove()
-                    if 'quick_frame' in locals():
-                        quick_frame.grid_remove()
-
-            mode_var.trace_add('write', lambda *args: update_date_widgets())
-            update_date_widgets()
-
-            # 页数限制
-            ttk.Label(main, text="最大页数 (可选):").grid(row=4, column=0, sticky=tk.W)
-            max_pages_var = tk.StringVar()
-            max_pages_entry = ttk.Entry(main, textvariable=max_pages_var, width=8)
-            max_pages_entry.grid(row=4, column=1, sticky=tk.W)
-
-            # 状态
-            status_var = tk.StringVar(value="准备就绪…")
-            status_label = ttk.Label(main, textvariable=status_var)
-            status_label.grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=(12,0))
-
-            def to_iso_day(day_str: str, end=False):
-                if not day_str:
-                    return None
-                try:
-                    # 基础校验：YYYY-MM-DD
-                    if not re.match(r'^\d{4}-\d{2}-\d{2}$', day_str):
-                        messagebox.showwarning("提示", "日期格式应为 YYYY-MM-DD")
-                        return None
-                    dt = datetime.strptime(day_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    if end:
-                        # 结束日设为当天 23:59:59
-                        dt = dt.replace(hour=23, minute=59, second=59)
-                    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
-                except Exception:
-                    messagebox.showwarning("提示", "请输入有效的日期")
-                    return None
-
-            def on_run():
-                username = username_var.get().strip()
-                if not username:
-                    messagebox.showwarning("提示", "请输入用户名")
-                    return
-
-                if mode_var.get() == 'all':
-                    since_iso, until_iso = None, None
-                else:
-                    if _tkcalendar_ok:
-                        s = since_picker.get_date() if since_picker.get() else None
-                        u = until_picker.get_date() if until_picker.get() else None
-                        since_iso = to_iso_day(s.strftime('%Y-%m-%d') if s else '', end=False)
-                        until_iso = to_iso_day(u.strftime('%Y-%m-%d') if u else '', end=True)
-                    else:
-                        since_iso = to_iso_day(since_var.get().strip(), end=False)
-                        until_iso = to_iso_day(until_var.get().strip(), end=True)
-
-                max_pages = None
-                mp_raw = max_pages_var.get().strip()
-                if mp_raw:
-                    if mp_raw.isdigit():
-                        max_pages = int(mp_raw)
-                    else:
-                        messagebox.showwarning("提示", "最大页数应为正整数，将忽略该值")
-
-                # 若无 cookie，引导设置
-                if not CookieManager.read_cookie():
-                    messagebox.showwarning("提示", "未找到 Cookie，请先配置 cookies.txt 或使用 --set-cookie 运行命令行设置。")
-                    return
-
-                status_var.set("正在分析… 这可能需要一些时间")
-                root.update_idletasks()
-                try:
-                    res = analyze_user_emojis(username, max_pages=max_pages,
-                                              since=since_iso, until=until_iso)
-                    status_var.set("完成！点击“打开输出目录”查看结果")
-                except Exception as e:
-                    messagebox.showerror("错误", str(e))
-                    status_var.set("发生错误")
-
-            def on_open_dir():
-                try:
-                    out_dir = os.path.abspath(OUTPUT_DIR)
-                    if os.path.exists(out_dir):
-                        webbrowser.open(out_dir)
-                    else:
-                        messagebox.showinfo("提示", "尚未生成输出目录")
-                except Exception as e:
-                    messagebox.showerror("错误", str(e))
-
-            # 快捷时间范围按钮
-            quick_frame = ttk.Frame(main)
-            quick_frame.grid(row=4, column=0, columnspan=3, pady=8, sticky=tk.W)
-
-            def quick_range(days: int = None, mode: str = None):
-                from datetime import timedelta
-                now = datetime.now(timezone.utc)
-                if days is not None:
-                    start = (now - timedelta(days=days)).date()
-                    end = now.date()
-                elif mode == 'month':
-                    start = now.replace(day=1).date()
-                    end = now.date()
-                elif mode == 'year':
-                    start = now.replace(month=1, day=1).date()
-                    end = now.date()
-                else:
-                    return
-                if _tkcalendar_ok:
-                    since_picker.set_date(start)
-                    until_picker.set_date(end)
-                else:
-                    since_var.set(start.strftime('%Y-%m-%d'))
-                    until_var.set(end.strftime('%Y-%m-%d'))
-
-            ttk.Button(quick_frame, text="最近7天", command=lambda: quick_range(days=7)).grid(row=0, column=0, padx=(0,8))
-            ttk.Button(quick_frame, text="最近30天", command=lambda: quick_range(days=30)).grid(row=0, column=1, padx=(0,8))
-            ttk.Button(quick_frame, text="本月", command=lambda: quick_range(mode='month')).grid(row=0, column=2, padx=(0,8))
-            ttk.Button(quick_frame, text="今年", command=lambda: quick_range(mode='year')).grid(row=0, column=3, padx=(0,8))
-
-            # 操作按钮
-            btn_frame = ttk.Frame(main)
-            btn_frame.grid(row=5, column=0, columnspan=3, pady=8, sticky=tk.W)
-            ttk.Button(btn_frame, text="开始分析", command=on_run).grid(row=0, column=0, padx=(0,8))
-            ttk.Button(btn_frame, text="打开输出目录", command=on_open_dir).grid(row=0, column=1)
-
-            for i in range(3):
-                main.grid_columnconfigure(i, weight=1)
-
-            root.mainloop()
+        # 图形界面依赖（tkinter 等）只在这里加载
+        from gui import run_gui
 
         run_gui()
         exit(0)
 
-    if args.batch:
-        batch_analyze_users(args.batch, args.max_pages)
+    if args.topic:
+        from topic_stats import analyze_topic_emojis, parse_topic_id
+        
+        for raw in args.topic:
+            topic_id = parse_topic_id(raw)
+            if topic_id is None:
+                print(f"无法识别的话题: {raw}")
+                continue
+            analyze_topic_emojis(topic_id, since=args.since, until=args.until,
+                                 concurrency=args.concurrency, workers=args.workers)
+    elif args.sample is not None:
+        from sampling import analyze_user_sample
+        
+        usernames = args.batch or ([args.username] if args.username else [])
+        if not usernames:
+            print("请指定用户名")
+            exit(1)
+        for username in usernames:
+            analyze_user_sample(username, args.sample, since=args.since, until=args.until,
+                                concurrency=args.concurrency, seed=args.seed)
+    elif args.batch:
+        batch_analyze_users(args.batch, args.max_pages, concurrency=args.concurrency,
+                            refresh=args.refresh, workers=args.workers,
+                            since=args.since, until=args.until,
+                            metric=args.similarity, top_k=args.top_k, resume=args.resume,
+                            archive=args.archive)
     elif args.username:
         analyze_user_emojis(args.username, args.max_pages,
-                            since=args.since, until=args.until)
+                            since=args.since, until=args.until,
+                            concurrency=args.concurrency, refresh=args.refresh,
+                            workers=args.workers, resume=args.resume, archive=args.archive)
     else:
         # 交互模式
         print("="*60)
@@ -785,3 +1299,13 @@ if __name__ == "__main__":
             analyze_user_emojis(username, since=since, until=until)
         else:
             print("未输入用户名，退出。")
+
+    stats = get_http_client().stats()
+    if stats['requests']:
+        rate = '不限' if stats['rate'] is None else f"{stats['rate']} 请求/秒"
+        print(f"请求统计: 共 {stats['requests']} 次，被限流 {stats['throttled']} 次，"
+              f"重试 {stats['retries']} 次，最终限速 {rate}")
+        from http_utils import format_bytes
+        
+        print(f"传输统计: 实际下载 {format_bytes(stats['bytes_wire'])}（解压后 {format_bytes(stats['bytes_body'])}），"
+              f"304 未变化 {stats['not_modified']} 次，省去下载 {format_bytes(stats['bytes_saved'])}")